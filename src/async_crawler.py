@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Асинхронный движок обхода сайтов для rss_crawler.
+
+Вместо WORKERS потоков с блокирующим requests.get здесь один цикл событий
+asyncio и ASYNC_CONCURRENCY корутин, которые держат в полёте сотни запросов
+через aiohttp. Семантика совпадает с SiteCrawl.process_url/check_rss:
+ограничение глубины, остановка по MAX_FEEDS, BLOCKED_WORDS и фильтр домена.
+Корутины берут URL из очередей сайтов через RssCrawler.next_task(), а найденные
+фиды регистрируются через SiteCrawl.add_feed(), как и в потоковом движке.
+Краулер передаётся параметром, поэтому модуль не импортирует rss_crawler:
+при запуске как скрипта тот называется __main__.
+"""
+
+import asyncio
+import contextlib
+import functools
+from urllib.parse import urljoin
+
+import aiohttp
+
+import http_client
+import content_sniffer
+import feed_probe
+import memory_budget
+import metrics
+import parse_pool
+import reporter
+from link_extractor import extract_links, extract_sitemap_locs
+from politeness import host_of
+from url_normalizer import canonical_link, normalize_url
+
+REQUEST_TIMEOUT = 10  # Таймаут запроса в секундах, как у requests.get в rss_crawler
+
+
+async def fetch(session, url, wanted=content_sniffer.PAGE_KINDS, scheduler=None):
+    """
+    Потоковая загрузка, аналог content_sniffer.fetch. Возвращает кортеж (kind, text);
+    text равен None, если тип ответа не входит в wanted.
+    Исключения aiohttp пробрасываются вызывающему коду.
+    """
+    await memory_budget.admit_async()
+    for attempt in range(content_sniffer.THROTTLE_RETRIES + 1):
+        async with scheduler.slot_async(url) if scheduler else contextlib.nullcontext():
+            with metrics.request():
+                with metrics.stage("request"):
+                    response = await session.get(url)
+                async with response:
+                    metrics.record_status(response.status)
+                    if scheduler:
+                        retry = scheduler.report(url, response.status, response.headers.get("Retry-After"))
+                        if retry and attempt < content_sniffer.THROTTLE_RETRIES:
+                            continue
+                    response.raise_for_status()
+                    with metrics.stage("download"):
+                        return await read_body(response, wanted)
+
+
+async def read_body(response, wanted):
+    """
+    Читает тело ответа aiohttp с определением типа по первым байтам.
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if content_sniffer.is_binary_content_type(content_type):
+        content_sniffer.count("aborted")
+        return "other", None
+
+    body = bytearray()
+    while len(body) < content_sniffer.SNIFF_BYTES:
+        chunk = await response.content.read(content_sniffer.CHUNK_SIZE)
+        if not chunk:
+            break
+        body += chunk
+    content_sniffer.count("bytes_read", len(body))
+
+    kind = content_sniffer.classify(bytes(body[:content_sniffer.SNIFF_BYTES]).decode("latin-1"), content_type)
+    if kind not in wanted:
+        content_sniffer.count("aborted")
+        return kind, None
+
+    while True:
+        chunk = await response.content.read(content_sniffer.CHUNK_SIZE)
+        if not chunk:
+            break
+        body += chunk
+        content_sniffer.count("bytes_read", len(chunk))
+        if len(body) >= content_sniffer.MAX_BODY_BYTES:
+            content_sniffer.count("truncated")
+            del body[content_sniffer.MAX_BODY_BYTES:]
+            break
+
+    memory_budget.hold(len(body))
+    encoding = content_sniffer.detect_encoding(content_type, bytes(body[:content_sniffer.SNIFF_BYTES]))
+    return kind, content_sniffer.decode(bytes(body), encoding)
+
+
+async def fetch_robots(session, url):
+    """
+    Загружает robots.txt для планировщика вежливости. None, если файла нет.
+    """
+    try:
+        async with session.get(url) as response:
+            if response.status != 200:
+                return None
+            return await response.text(errors="replace")
+    except Exception:
+        return None
+
+
+async def check_rss(site, session, url, content=None):
+    """
+    Асинхронный аналог SiteCrawl.check_rss.
+    Все корутины работают в одном потоке, поэтому блокировки сайта не конкурируют.
+    """
+    crawler = site.crawler
+    if crawler.is_url_blocked(url):
+        return False
+
+    if site.should_stop():
+        return False
+
+    if site.is_duplicate_feed(url):
+        return False
+
+    with metrics.trace(url, "feed") if content is None else contextlib.nullcontext():
+        try:
+            if content is None:
+                site.count_fetch()
+                _, content = await fetch(session, url, wanted=content_sniffer.FEED_KINDS,
+                                         scheduler=crawler.scheduler)
+            if content is not None and crawler.is_rss_content(content):
+                with metrics.stage("parse_title"):
+                    title, fingerprint = await parse_pool.run_async(crawler.extract_feed_info, content.strip())
+                # Фид разобран: его содержимое больше не держим
+                content = None
+                memory_budget.release()
+                # Пока ждали ответ, этот же фид могла найти другая корутина - add_feed это учтёт
+                return site.add_feed(title, url, fingerprint)
+        except Exception as e:
+            metrics.record_error("check_rss", e)
+    # Ответ не фид или не загрузился: прочитанное начало тоже не держим
+    memory_budget.release()
+    return False
+
+
+async def process_url(site, session, url_depth_pair):
+    """
+    Асинхронный аналог SiteCrawl.process_url: загружает страницу,
+    проверяет её на RSS и добавляет ссылки того же домена в очередь сайта.
+    """
+    if site.should_stop():
+        return
+
+    url, depth, domain = url_depth_pair
+
+    if depth < 0:
+        return
+
+    if not site.frontier.visit(url, leaf=depth == 0):
+        return
+
+    crawler = site.crawler
+    if crawler.is_url_blocked(url):
+        return
+
+    reporter.say(f"Обход: {url} (глубина: {depth})")
+
+    with metrics.trace(url, "page"):
+        try:
+            site.count_fetch()
+            kind, content = await fetch(session, url, scheduler=crawler.scheduler)
+        except Exception as e:
+            metrics.record_error("process_url", e)
+            return
+
+        if site.should_stop():
+            return
+
+        if kind in content_sniffer.FEED_KINDS:
+            await check_rss(site, session, url, content)
+            return
+
+        if kind == "html":
+            with metrics.stage("parse_links"):
+                feed_links, anchors = await parse_pool.run_async(extract_links, content)
+            # Страница разобрана: ее содержимое больше не держим
+            content = None
+            memory_budget.release()
+
+            # 1. Проверяем <link> теги в <head>
+            for href in feed_links:
+                if site.should_stop():
+                    return
+                await check_rss(site, session, normalize_url(urljoin(url, href)))
+
+            # 2. Добавляем ссылки <a> в очередь для обработки
+            for href in anchors:
+                if site.should_stop():
+                    return
+                full_url, rewritten = canonical_link(url, href)
+                if not crawler.url_filter.in_scope(full_url, domain) or crawler.is_url_blocked(full_url):
+                    continue
+
+                if "feed" in full_url.lower() or "rss" in full_url.lower():
+                    await check_rss(site, session, full_url)
+
+                # Ссылки со страниц последнего уровня в очередь не ставим: они были бы отброшены по глубине
+                if depth == 0 or site.is_already_visited(full_url, rewritten, leaf=depth == 1):
+                    continue
+
+                site.frontier.put(full_url, depth - 1, domain)
+
+
+async def probe(site, session, kind, url):
+    """
+    Асинхронный аналог SiteCrawl.probe: одна проверка известного адреса фида.
+    """
+    if site.should_stop():
+        return
+    if kind == feed_probe.FEED:
+        await check_rss(site, session, url)
+        return
+
+    scheduler = site.crawler.scheduler
+    with metrics.trace(url, kind):
+        try:
+            if kind == feed_probe.ROBOTS:
+                # robots.txt загружаем сами и отдаем планировщику, чтобы он не загружал его второй раз
+                claimed = scheduler is not None and scheduler.take_robots(url)
+                text = None
+                try:
+                    site.count_fetch()
+                    _, text = await fetch(session, url, wanted=content_sniffer.TEXT_KINDS)
+                finally:
+                    if claimed:
+                        scheduler.set_robots(host_of(url), text)
+                site.handle_robots(text)
+            elif kind == feed_probe.HOME:
+                site.count_fetch()
+                page_kind, content = await fetch(session, url, scheduler=scheduler)
+                if page_kind in content_sniffer.FEED_KINDS:
+                    site.home_anchors = []
+                    await check_rss(site, session, url, content)
+                elif page_kind == "html":
+                    with metrics.stage("parse_links"):
+                        feed_links, anchors = await parse_pool.run_async(extract_links, content)
+                    content = None
+                    memory_budget.release()
+                    site.handle_home_links(url, feed_links)
+                    site.handle_home_anchors(url, anchors)
+                else:
+                    site.home_anchors = []
+            elif kind == feed_probe.SITEMAP:
+                site.count_fetch()
+                _, content = await fetch(session, url, wanted=content_sniffer.SITEMAP_KINDS, scheduler=scheduler)
+                if content is not None:
+                    with metrics.stage("parse_sitemap"):
+                        is_index, locs = await parse_pool.run_async(extract_sitemap_locs, content)
+                    content = None
+                    memory_budget.release()
+                    site.handle_sitemap(is_index, locs)
+        except Exception as e:
+            # Большинства известных адресов на сайте нет - это не ошибка, только учитываем в метриках
+            metrics.record_error("probe", e)
+
+
+async def worker(crawler, session):
+    """
+    Корутина-воркер: берёт URL из очередей сайтов, пока обход не завершится.
+    next_task() не блокируется, поэтому при пустых очередях корутина ненадолго засыпает.
+    """
+    while not crawler.exit_flag.is_set():
+        task = crawler.next_task()
+        if task is None:
+            if crawler.finished():
+                return
+            await asyncio.sleep(0.05)
+            continue
+        site, task_id, url_depth_pair = task
+        try:
+            with metrics.busy("crawl"), crawler.memory_budget.task():
+                if task_id == crawler.PROBE:
+                    await probe(site, session, *url_depth_pair)
+                else:
+                    await process_url(site, session, url_depth_pair)
+        except Exception as e:
+            metrics.record_error("worker", e)
+            reporter.say(f"Ошибка в воркере: {e}")
+        finally:
+            crawler.task_done(site, task_id)
+
+
+async def wait_finished(crawler):
+    """
+    Ждёт, пока все сайты будут обработаны или обход прерван.
+    """
+    while not crawler.finished():
+        await asyncio.sleep(0.1)
+
+
+async def crawl_async(crawler):
+    """
+    Обходит сайты ASYNC_CONCURRENCY корутинами в одном цикле событий.
+    Завершается, когда все сайты обработаны или установлен exit_flag.
+    """
+    concurrency = crawler.async_concurrency
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    trace_configs = [http_client.aiohttp_trace_config()]
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs) as session:
+        if crawler.scheduler:
+            crawler.scheduler.robots_fetcher_async = functools.partial(fetch_robots, session)
+        workers = [asyncio.create_task(worker(crawler, session)) for _ in range(concurrency)]
+        try:
+            await wait_finished(crawler)
+        finally:
+            # Все сайты обработаны или обход прерван - останавливаем все корутины
+            crawler.exit_flag.set()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,1294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки краулера на локальном сайте-заглушке (fake_site.py).
+
+Примеры:
+    python benchmark.py engines --pages 500 --latency 0.05
+    python benchmark.py links --fixtures saved_pages/
+    python benchmark.py verify --feeds 1000 --items 50 --processes 1 4 16
+    python benchmark.py politeness --rate-limit 50
+    python benchmark.py sites --sites 20 --engine async
+    python benchmark.py probe --pages 500
+    python benchmark.py output --count 500000
+    python benchmark.py dates --fixtures saved_feeds/
+    python benchmark.py recheck --feeds 1000 --days 7
+    python benchmark.py daemon --jobs 500 --clients 16
+    python benchmark.py filter --words 5000
+    python benchmark.py scaling --workers 6 32 128
+    python benchmark.py suite --save baseline.json
+    python benchmark.py suite --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
+import os
+import queue
+import random
+import re
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import requests
+from bs4 import BeautifulSoup
+
+import content_sniffer
+import fake_site
+import feed_daemon
+import feed_dates
+import http_client
+import metrics
+import reporter
+import rss_crawler
+import url_filter
+import verify_rss_feeds
+from dns_cache import DnsResolver
+from feed_state import FeedStateStore
+from link_extractor import extract_links
+from url_filter import UrlFilter
+
+
+@contextlib.contextmanager
+def quiet(stream=None):
+    """
+    Подавляет консольный вывод краулера на время замера (или перенаправляет его в stream).
+    """
+    with contextlib.redirect_stdout(stream or io.StringIO()), contextlib.redirect_stderr(stream or io.StringIO()):
+        yield
+
+
+def run_crawl(base_url, engine, max_depth, workers, concurrency, politeness=True, discovery="crawl",
+              parse_processes=rss_crawler.PARSE_PROCESSES, stream=None, url_filter=None,
+              dedup_feeds=rss_crawler.DEDUP_FEEDS, **options):
+    """
+    Выполняет один обход сайта-заглушки заданным движком (options - прочие параметры RssCrawler).
+    Возвращает словарь с количеством страниц, фидов и временем работы.
+    """
+    http_client.reset_stats()
+    content_sniffer.reset_stats()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rss_crawler.CSV_FILE = os.path.join(tmp, "rss_feeds.csv")
+        with quiet(stream):
+            start = time.perf_counter()
+            crawler, _ = rss_crawler.crawl_for_rss(
+                base_url + "/", max_depth, engine=engine, workers=workers, async_concurrency=concurrency,
+                max_feeds=10 ** 6, blocked_words=[], politeness=politeness, discovery=discovery,
+                parse_processes=parse_processes, url_filter=url_filter, dedup_feeds=dedup_feeds, **options)
+            elapsed = time.perf_counter() - start
+
+    return {
+        "pages": crawler.visited,
+        "feeds": crawler.feeds_found,
+        "seconds": elapsed,
+        "connections": http_client.stats()["connections_opened"],
+        "kbytes": content_sniffer.stats()["bytes_read"] / 1024,
+        "normalized": crawler.normalized_duplicates,
+        "fetches": crawler.fetches,
+        "aliases": crawler.feed_aliases,
+        "peak_body_mb": crawler.memory_budget.peak / 1024 / 1024,
+        "memory_waits": crawler.memory_budget.waits,
+        "deferred": crawler.deferred,
+    }
+
+
+def bench_engines(args):
+    """
+    Сравнивает скорость обхода потокового и асинхронного движков.
+    """
+    server, base_url = fake_site.start_server(
+        pages=args.pages, fanout=args.fanout, feeds=args.feeds, latency=args.latency,
+        media_bytes=args.media_bytes, tracking=args.tracking_links)
+    print(f"Сайт-заглушка: {base_url}, страниц: {args.pages}, задержка: {args.latency * 1000:.0f} мс")
+    try:
+        print(f"{'Движок':<10}{'Страниц':>10}{'Фидов':>8}{'Секунд':>10}{'Стр/сек':>10}{'Соединений':>12}{'КБ':>10}{'Нормализ.':>11}")
+        for engine in args.engines:
+            result = run_crawl(base_url, engine, args.depth, args.workers, args.concurrency,
+                               politeness=not args.no_politeness)
+            rate = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+            print(f"{engine:<10}{result['pages']:>10}{result['feeds']:>8}{result['seconds']:>10.2f}{rate:>10.1f}{result['connections']:>12}{result['kbytes']:>10.0f}{result['normalized']:>11}")
+    finally:
+        server.shutdown()
+
+
+def bench_politeness(args):
+    """
+    Обход сайта с ограничением частоты (429 + Retry-After) с планировщиком вежливости и без него.
+    Без планировщика страницы, получившие 429, теряются вместе со ссылками на них.
+    """
+    print(f"Лимит сайта: {args.rate_limit} запросов/сек, Crawl-delay: {args.crawl_delay}, страниц: {args.pages}")
+    print(f"{'Движок':<10}{'Вежливость':>12}{'Страниц':>10}{'Фидов':>8}{'Секунд':>10}{'Стр/сек':>10}{'429 сервера':>13}")
+    for engine in args.engines:
+        for politeness in (False, True):
+            # Новый сервер на каждый прогон, чтобы лимит начинался с полного ведра
+            server, base_url = fake_site.start_server(
+                pages=args.pages, fanout=args.fanout, feeds=args.feeds, latency=args.latency,
+                rate_limit=args.rate_limit, crawl_delay=args.crawl_delay)
+            try:
+                result = run_crawl(base_url, engine, args.depth, args.workers, args.concurrency, politeness)
+            finally:
+                server.shutdown()
+            rate = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+            label = "да" if politeness else "нет"
+            print(f"{engine:<10}{label:>12}{result['pages']:>10}{result['feeds']:>8}{result['seconds']:>10.2f}{rate:>10.1f}{server.rejected:>13}")
+
+
+def bench_sites(args):
+    """
+    Обход нескольких сайтов: по одному запуску на сайт против пакетного режима с общим пулом.
+    Каждый сайт-заглушка слушает свой порт, поэтому для краулера это разные домены.
+    """
+    servers = [fake_site.start_server(pages=args.pages, fanout=args.fanout, feeds=args.feeds,
+                                      latency=args.latency, seed=i)
+               for i in range(args.sites)]
+    start_urls = [base_url + "/" for _, base_url in servers]
+    options = dict(engine=args.engine, workers=args.workers, async_concurrency=args.concurrency,
+                   max_depth=args.depth, max_feeds=10 ** 6, blocked_words=[], discovery="crawl")
+    print(f"Сайтов: {args.sites}, страниц на сайт: {args.pages}, задержка: {args.latency * 1000:.0f} мс, движок: {args.engine}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            rss_crawler.CSV_FILE = os.path.join(tmp, "rss_feeds.csv")
+            with quiet():
+                start = time.perf_counter()
+                sequential_pages = sequential_feeds = 0
+                for url in start_urls:
+                    crawler, _ = rss_crawler.crawl_for_rss(url, **options)
+                    sequential_pages += crawler.visited
+                    sequential_feeds += crawler.feeds_found
+                sequential = time.perf_counter() - start
+
+                start = time.perf_counter()
+                crawler = rss_crawler.crawl_sites(start_urls, os.path.join(tmp, "batch.csv"),
+                                                  max_active_sites=args.active, **options)
+                batch = time.perf_counter() - start
+
+        print(f"{'Режим':<22}{'Страниц':>10}{'Фидов':>8}{'Секунд':>10}{'Стр/сек':>10}")
+        print(f"{'по одному сайту':<22}{sequential_pages:>10}{sequential_feeds:>8}{sequential:>10.2f}{sequential_pages / sequential:>10.1f}")
+        print(f"{'пакетный (--sites)':<22}{crawler.visited:>10}{crawler.feeds_found:>8}{batch:>10.2f}{crawler.visited / batch:>10.1f}")
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+
+def bench_probe(args):
+    """
+    Сравнивает число загрузок на найденный фид: только обход ссылок против
+    проверки известных адресов (robots.txt, карты сайта, <link> на главной).
+    """
+    print(f"Страниц: {args.pages}, фидов: {args.feeds}, карты сайта: {'да' if args.sitemaps else 'нет'}")
+    print(f"{'Режим':<14}{'Загрузок':>10}{'Фидов':>8}{'Загр./фид':>11}{'Секунд':>10}")
+    for discovery in args.modes:
+        server, base_url = fake_site.start_server(pages=args.pages, fanout=args.fanout, feeds=args.feeds,
+                                                  latency=args.latency, sitemaps=args.sitemaps)
+        try:
+            result = run_crawl(base_url, args.engine, args.depth, args.workers, args.concurrency,
+                               discovery=discovery)
+        finally:
+            server.shutdown()
+        per_feed = result["fetches"] / result["feeds"] if result["feeds"] else float("inf")
+        print(f"{discovery:<14}{result['fetches']:>10}{result['feeds']:>8}{per_feed:>11.1f}{result['seconds']:>10.2f}")
+
+
+def bench_output(args):
+    """
+    Запись и чтение args.count результатов: список в памяти с записью в конце
+    против потоковой записи ResultWriter и ленивого чтения iter_feeds.
+    """
+    from result_writer import ResultWriter
+
+    rows = ((f"Фид {i}", f"https://site{i % 1000}.example.com/rss/{i}.xml") for i in range(args.count))
+    print(f"Строк: {args.count}")
+    print(f"{'Способ':<24}{'Секунд':>10}{'Пик памяти, МБ':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feeds.csv")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        feeds = list(rows)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Название", "URL"])
+            writer.writerows(feeds)
+        del feeds
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{'список + запись в конце':<24}{elapsed:>10.2f}{peak / 2 ** 20:>16.1f}")
+
+        for extension in ("csv", "jsonl"):
+            path = os.path.join(tmp, "feeds." + extension)
+            rows = ((f"Фид {i}", f"https://site{i % 1000}.example.com/rss/{i}.xml") for i in range(args.count))
+            tracemalloc.start()
+            start = time.perf_counter()
+            with ResultWriter(path, ("title", "url"), ["Название", "URL"]) as writer:
+                for row in rows:
+                    writer.write(row)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{'ResultWriter ' + extension:<24}{elapsed:>10.2f}{peak / 2 ** 20:>16.1f}")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in verify_rss_feeds.iter_feeds(path):
+            pass
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{'iter_feeds (чтение)':<24}{elapsed:>10.2f}{peak / 2 ** 20:>16.1f}")
+
+
+def feed_corpus(count, items):
+    """
+    Синтетический корпус фидов: RSS, Atom и RDF с описаниями записей, разными
+    часовыми поясами, записями без дат и долей битых фидов (их разбирает feedparser).
+    """
+    rng = random.Random(fake_site.SEED)
+    now = datetime.now(timezone.utc)
+    description = "<description><![CDATA[" + fake_site.PARAGRAPH * 3 + "]]></description>"
+    corpus = []
+    for i in range(count):
+        kind = ("rss", "atom", "rdf")[i % 3]
+        published = now - timedelta(minutes=rng.randrange(60 * 72))
+        text = fake_site.render_feed(i % 48, items, now=published, kind=kind)
+        if kind == "atom":
+            text = text.replace("</id><updated>", "</id><content type=\"html\">описание</content><updated>")
+        else:
+            text = text.replace("</link><", "</link>" + description + "<")
+        variant = i % 10
+        if variant == 1:
+            text = text.replace("+0000", "-0500").replace("+00:00", "+03:00")
+        elif variant == 2:
+            text = text.replace("+0000", "GMT")
+        elif variant == 3:
+            # Часть записей без даты
+            text = text.replace("<pubDate>", "<comments>", items // 2).replace("</pubDate>", "</comments>", items // 2)
+        elif variant == 9:
+            # Неэкранированный & - XML битый, такой фид разбирает только feedparser
+            text = text.replace("Раздел", "Раздел & Ко", 1)
+        corpus.append(text.encode("utf-8"))
+    return corpus
+
+
+def bench_dates(args):
+    """
+    Оценка свежести: полный разбор feedparser против потокового извлечения дат (feed_dates).
+    Проверяет, что даты и оценки (is_fresh, fresh, total, percent) совпадают.
+    """
+    if args.fixtures:
+        corpus = []
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*.xml"))):
+            with open(path, "rb") as f:
+                corpus.append(f.read())
+    else:
+        corpus = feed_corpus(args.count, args.items)
+    if not corpus:
+        print("Не найдено фидов для бенчмарка")
+        return
+    fallbacks = sum(1 for content in corpus if feed_dates.feed_timestamps(content) is None)
+    print(f"Фидов: {len(corpus)}, средний размер: {sum(map(len, corpus)) / len(corpus) / 1024:.1f} КБ, "
+          f"разобрано feedparser как запасной вариант: {fallbacks}")
+
+    results = {}
+    print(f"{'Способ':<14}{'Секунд':>10}{'Фидов/сек':>12}")
+    for name, func in (("feedparser", verify_rss_feeds.parse_feed_timestamps),
+                       ("feed_dates", verify_rss_feeds.fast_feed_timestamps)):
+        feed_dates.parse_date.cache_clear()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results[name] = [func(content) for content in corpus]
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14}{elapsed:>10.2f}{len(corpus) * args.repeat / elapsed:>12.1f}")
+
+    dates_differ = sum(1 for a, b in zip(results["feedparser"], results["feed_dates"]) if a != b)
+    scores_differ = sum(1 for a, b in zip(results["feedparser"], results["feed_dates"])
+                        if verify_rss_feeds.score_timestamps(a) != verify_rss_feeds.score_timestamps(b))
+    print(f"Расхождений: даты - {dates_differ}, оценки свежести - {scores_differ}")
+
+
+def publishing_schedules(count, days):
+    """
+    Моменты публикаций синтетических фидов за days дней до текущего момента:
+    четверть фидов пишет каждый час, четверть - раз в сутки, четверть - раз в неделю,
+    остальные замолчали месяц назад. Интервалы между записями случайные (экспоненциальные).
+    """
+    rng = random.Random(fake_site.SEED)
+    now = time.time()
+    start = now - 40 * 86400
+    schedules = []
+    for i in range(count):
+        mean_gap = (3600, 86400, 7 * 86400, 30 * 86400)[i % 4]
+        end = now - 30 * 86400 if i % 4 == 3 else now + days * 86400
+        times, moment = [], start
+        while True:
+            moment += rng.expovariate(1 / mean_gap)
+            if moment > end:
+                break
+            times.append(moment)
+        schedules.append(times)
+    return now, schedules
+
+
+def bench_recheck(args):
+    """
+    Почасовые запуски проверки фидов в течение --days дней (время моделируется):
+    полная проверка всех фидов против перепроверки по расписанию (feed_state).
+    Считает загрузки и запуски, в которых оценка по сохраненному состоянию
+    разошлась бы с оценкой по свежезагруженному фиду.
+    """
+    now, schedules = publishing_schedules(args.feeds, args.days)
+    sweeps = args.days * 24
+    fetches = mismatches = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FeedStateStore(os.path.join(tmp, "feed_state.sqlite"))
+        start = time.perf_counter()
+        for sweep in range(sweeps):
+            # Запуск по расписанию стартует с небольшим разбросом
+            moment = now + sweep * 3600 + random.Random(sweep).uniform(0, 120)
+            for index, times in enumerate(schedules):
+                url = f"https://feeds.example/{index}"
+                visible = sorted((t for t in times if t <= moment), reverse=True)[:args.items]
+                actual = verify_rss_feeds.score_timestamps(visible, now=moment)
+                state = store.get(url)
+                if store.is_due(state, moment):
+                    fetches += 1
+                    store.record_check(url, visible, state, now=moment)
+                    continue
+                if verify_rss_feeds.score_timestamps(state["entries"], now=moment)[0] != actual[0]:
+                    mismatches += 1
+        elapsed = time.perf_counter() - start
+        store.close()
+    total = args.feeds * sweeps
+    print(f"Фидов: {args.feeds}, почасовых запусков: {sweeps}")
+    print(f"Загрузок: полная проверка - {total}, по расписанию - {fetches} ({fetches / total * 100:.1f}%)")
+    print(f"Расхождений оценки свежести: {mismatches} ({mismatches / total * 100:.2f}% оценок)")
+    print(f"Накладные расходы хранилища состояния: {elapsed / total * 1e6:.0f} мкс на фид")
+
+
+def percentile(values, p):
+    """
+    Перцентиль p (0-100) по методу ближайшего ранга.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def run_daemon_client(base_url, jobs, make_job, latencies, rejected, lock):
+    """
+    Клиент нагрузочного теста: ставит задания по одному и опрашивает их до завершения.
+    """
+    session = requests.Session()
+    for n in range(jobs):
+        start = time.perf_counter()
+        while True:
+            response = session.post(base_url + "/jobs", json=make_job(n))
+            if response.status_code != 503:
+                break
+            with lock:
+                rejected.append(1)
+            time.sleep(float(response.headers.get("Retry-After", 1)))
+        response.raise_for_status()
+        job_url = f"{base_url}/jobs/{response.json()['id']}"
+        while session.get(job_url).json()["status"] not in (feed_daemon.DONE, feed_daemon.FAILED):
+            time.sleep(0.005)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+
+def bench_daemon(args):
+    """
+    Нагрузочный тест демона: --clients клиентов ставят задания verify (или crawl)
+    против сайта-заглушки. Выводит задания в секунду и перцентили задержки
+    (от постановки задания до получения статуса done), а для сравнения - время
+    запуска CLI в новом процессе (запуск Python и импорт модулей).
+    """
+    server, base_url = fake_site.start_server(pages=args.pages, feeds=args.feeds, latency=args.latency)
+    verify_rss_feeds.CACHE_FILE = None
+    verify_rss_feeds.STATE_FILE = None
+    rng = random.Random(fake_site.SEED)
+
+    def make_job(n):
+        if args.type == "crawl":
+            return {"type": "crawl", "url": base_url, "max_depth": 1}
+        sections = rng.sample(range(args.feeds), min(args.feeds_per_job, args.feeds))
+        return {"type": "verify", "feeds": [base_url + fake_site.feed_path(s) for s in sections]}
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import verify_rss_feeds, rss_crawler"], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    cold_start = time.perf_counter() - start
+
+    latencies, rejected, lock = [], [], threading.Lock()
+    per_client = max(1, args.jobs // args.clients)
+    with quiet():
+        daemon, daemon_url = feed_daemon.start_daemon(port=0, job_workers=args.job_workers,
+                                                      max_queued=args.max_queued)
+        try:
+            clients = [threading.Thread(target=run_daemon_client,
+                                        args=(daemon_url, per_client, make_job, latencies, rejected, lock))
+                       for _ in range(args.clients)]
+            start = time.perf_counter()
+            for t in clients:
+                t.start()
+            for t in clients:
+                t.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            feed_daemon.stop_daemon(daemon)
+            server.shutdown()
+
+    print(f"Заданий: {len(latencies)} ({args.type}), клиентов: {args.clients}, "
+          f"заданий одновременно: {args.job_workers}, очередь: {args.max_queued}")
+    print(f"Запуск CLI в новом процессе (Python + импорт модулей): {cold_start:.2f} с")
+    print(f"Заданий в секунду: {len(latencies) / elapsed:.1f}, отклонено (503): {len(rejected)}")
+    print(f"Задержка, мс: p50 {percentile(latencies, 50) * 1000:.0f}, p90 {percentile(latencies, 90) * 1000:.0f}, "
+          f"p99 {percentile(latencies, 99) * 1000:.0f}, max {max(latencies) * 1000:.0f}")
+
+
+def blocked_by_loop(url, words):
+    """
+    Прежняя проверка is_url_blocked: перебор запрещенных слов по строке URL.
+    """
+    lowered = url.lower()
+    return any(word in lowered for word in words)
+
+
+def bench_filter(args):
+    """
+    Сравнивает проверку URL по списку запрещенных слов: перебор слов, одно
+    регулярное выражение-альтернатива, префиксное дерево (url_filter) и оно же
+    с запоминанием результата. Затем обходит сайт-заглушку с картинками на каждой
+    странице с отбрасыванием медиафайлов по расширению и без него.
+    """
+    rng = random.Random(fake_site.SEED)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    words = sorted({"".join(rng.choices(alphabet, k=rng.randint(5, 12))) for _ in range(args.words)})
+    unique = [f"https://example.com/{rng.choice(['news', 'sport', 'tag', 'section'])}/"
+              f"{''.join(rng.choices(alphabet, k=rng.randint(8, 30)))}/{n}.html"
+              for n in range(args.urls // args.repeats)]
+    # Как при обходе: одни и те же ссылки встречаются на многих страницах
+    urls = unique * args.repeats
+    rng.shuffle(urls)
+    alternation = re.compile("|".join(map(re.escape, words)))
+
+    print(f"Запрещенных слов: {len(words)}, URL: {len(urls)} (уникальных {len(unique)})")
+    print(f"{'Способ':<26}{'Секунд':>10}{'URL/сек':>12}{'Отброшено':>11}")
+    compiled = UrlFilter(words, cache_size=0)
+    memoized = UrlFilter(words)
+    methods = [
+        ("перебор слов", lambda url: blocked_by_loop(url, words)),
+        ("регулярное выражение", lambda url: alternation.search(url.lower()) is not None),
+        ("префиксное дерево", lambda url: compiled.check(url) is not None),
+        ("дерево + кэш", lambda url: memoized.check(url) is not None),
+    ]
+    for name, check in methods:
+        start = time.perf_counter()
+        blocked = sum(1 for url in urls if check(url))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<26}{elapsed:>10.3f}{len(urls) / elapsed:>12.0f}{blocked:>11}")
+
+    server, base_url = fake_site.start_server(pages=args.pages, feeds=args.feeds, latency=args.latency,
+                                              media_bytes=args.media_bytes)
+    print(f"\nСайт-заглушка: {base_url}, страниц: {args.pages}, картинка {args.media_bytes} байт на каждой странице")
+    try:
+        print(f"{'Медиафайлы':<26}{'Загрузок':>10}{'Соединений':>12}{'Секунд':>10}{'Фидов':>8}")
+        for name, skip_extensions in (("загружаются", ()), ("отбрасываются", url_filter.SKIP_EXTENSIONS)):
+            result = run_crawl(base_url, args.engine, args.depth, args.workers, args.concurrency,
+                               url_filter=UrlFilter([], skip_extensions=skip_extensions))
+            print(f"{name:<26}{result['fetches']:>10}{result['connections']:>12}"
+                  f"{result['seconds']:>10.2f}{result['feeds']:>8}")
+    finally:
+        server.shutdown()
+
+
+def extract_links_bs4(content):
+    """
+    Прежний способ извлечения ссылок из process_url: дерево BeautifulSoup и два find_all.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    feed_links = [tag.get("href") for tag in soup.find_all("link", {"type": ["application/rss+xml", "application/atom+xml"]})]
+    anchors = [a.get("href") for a in soup.find_all("a")]
+    return [href for href in feed_links if href], [href for href in anchors if href]
+
+
+def load_html_fixtures(args):
+    """
+    Загружает сохраненные HTML-страницы из каталога --fixtures
+    или генерирует страницы сайта-заглушки.
+    """
+    if args.fixtures:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*.htm*"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        return pages
+    return [fake_site.render_page(i, pages=args.count, fanout=args.fanout) for i in range(args.count)]
+
+
+def measure(func, pages, repeat):
+    """
+    Прогоняет func по всем страницам repeat раз.
+    Возвращает (страниц в секунду, пик памяти Python-аллокаций в КБ по tracemalloc).
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages:
+            func(content)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for content in pages:
+        func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(pages) * repeat / elapsed, peak / 1024
+
+
+def bench_links(args):
+    """
+    Сравнивает извлечение ссылок через BeautifulSoup и через link_extractor.
+    """
+    pages = load_html_fixtures(args)
+    if not pages:
+        print("Не найдено HTML-страниц для бенчмарка")
+        return
+    size = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"Страниц: {len(pages)}, средний размер: {size:.1f} КБ")
+
+    mismatches = sum(1 for p in pages if extract_links(p) != extract_links_bs4(p))
+    if mismatches:
+        print(f"Внимание: результаты различаются на {mismatches} страницах")
+
+    print(f"{'Способ':<16}{'Стр/сек':>10}{'Пик памяти, КБ':>16}")
+    for name, func in (("BeautifulSoup", extract_links_bs4), ("link_extractor", extract_links)):
+        rate, peak = measure(func, pages, args.repeat)
+        print(f"{name:<16}{rate:>10.1f}{peak:>16.1f}")
+
+
+def write_feed_list(path, base_url, feeds, aliases=False):
+    """
+    Записывает список фидов сайта-заглушки в формате rss_feeds.csv.
+    При aliases каждый фид записывается еще и под другими своими адресами.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Название", "URL"])
+        for section in range(feeds):
+            paths = [fake_site.feed_path(section)] + (fake_site.feed_alias_paths(section) if aliases else [])
+            for path in paths:
+                writer.writerow([f"Раздел {section}", base_url + path])
+
+
+def run_verify(processes, workers, stream=None, state_file=None, resolver=None, cache_file=None):
+    """
+    Выполняет verify_rss_feeds.main() в текущем каталоге без кэша (если не задан
+    cache_file) и без расписания перепроверки (если не задан state_file).
+    resolver - DnsResolver для проверки. Возвращает время работы в секундах.
+    """
+    verify_rss_feeds.CACHE_FILE = cache_file
+    verify_rss_feeds.STATE_FILE = state_file
+    verify_rss_feeds.PARSE_PROCESSES = processes
+    verify_rss_feeds.MAX_WORKERS = workers
+    with quiet(stream):
+        start = time.perf_counter()
+        verify_rss_feeds.main(resolver)
+        return time.perf_counter() - start
+
+
+def bench_verify(args):
+    """
+    Сравнивает скорость проверки фидов при разном размере пула процессов разбора.
+    """
+    server, base_url = fake_site.start_server(feeds=args.feeds, items_per_feed=args.items, latency=args.latency)
+    print(f"Фидов: {args.feeds}, записей в фиде: {args.items}, потоков загрузки: {args.workers}, ядер: {os.cpu_count()}")
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            write_feed_list(verify_rss_feeds.INPUT_CSV_FILE, base_url, args.feeds)
+            print(f"{'Процессов':<10}{'Секунд':>10}{'Фидов/сек':>12}")
+            for processes in args.processes:
+                elapsed = run_verify(processes, args.workers)
+                print(f"{processes:<10}{elapsed:>10.2f}{args.feeds / elapsed:>12.1f}")
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+
+def bench_dedup(args):
+    """
+    Один фид под разными URL: обход и проверка с распознаванием по отпечатку содержимого и без.
+    """
+    server, base_url = fake_site.start_server(pages=args.pages, feeds=args.feeds, latency=args.latency,
+                                              feed_aliases=True)
+    urls = args.feeds * (1 + len(fake_site.feed_alias_paths(0)))
+    print(f"Сайт-заглушка: {base_url}, страниц: {args.pages}, фидов: {args.feeds}, адресов фидов: {urls}")
+    cwd = os.getcwd()
+    try:
+        print(f"{'Обход':<22}{'Фидов':>8}{'Дубликатов':>12}{'Загрузок':>10}{'Секунд':>10}")
+        for name, dedup in (("без отпечатков", False), ("с отпечатками", True)):
+            result = run_crawl(base_url, "threads", args.depth, args.workers, 0, politeness=False,
+                               dedup_feeds=dedup)
+            print(f"{name:<22}{result['feeds']:>8}{result['aliases']:>12}{result['fetches']:>10}{result['seconds']:>10.2f}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            write_feed_list(verify_rss_feeds.INPUT_CSV_FILE, base_url, args.feeds, aliases=True)
+            state_file = os.path.join(tmp, "feed_state.sqlite")
+            cache_file = os.path.join(tmp, "http_cache.sqlite")
+            print(f"\n{'Проверка':<22}{'Строк OK':>10}{'Дубликатов':>12}{'Ответ 304':>11}{'Запросов':>10}{'Секунд':>10}")
+            runs = (("без отпечатков", False, None), ("с отпечатками", True, None),
+                    ("с отпечатками, 1-й", True, state_file), ("с отпечатками, 2-й", True, state_file))
+            for name, dedup, state in runs:
+                verify_rss_feeds.DEDUP_FEEDS = dedup
+                http_client.reset_stats()
+                elapsed = run_verify(1, args.workers, state_file=state, cache_file=state and cache_file)
+                aliases = verify_rss_feeds.feed_aliases
+                print(f"{name:<22}{verify_rss_feeds.verified_count:>10}{aliases.aliases if aliases else 0:>12}"
+                      f"{aliases.revalidated if aliases else 0:>11}{http_client.stats()['requests']:>10}{elapsed:>10.2f}")
+    finally:
+        verify_rss_feeds.DEDUP_FEEDS = True
+        os.chdir(cwd)
+        server.shutdown()
+
+
+class StubResolve:
+    """
+    Функция разрешения имен для DnsResolver: живые хосты отвечают 127.0.0.1 через
+    latency секунд, dead - NXDOMAIN через latency, hung - отвечают через hang секунд.
+    """
+
+    def __init__(self, dead, hung, latency, hang):
+        self.dead = set(dead)
+        self.hung = set(hung)
+        self.latency = latency
+        self.hang = hang
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, host):
+        with self._lock:
+            self.calls += 1
+        if host in self.hung:
+            time.sleep(self.hang)
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        time.sleep(self.latency)
+        if host in self.dead:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return ["127.0.0.1"], None
+
+
+def bench_dns(args):
+    """
+    Проверка фидов многих хостов, часть которых не разрешается или зависает:
+    разрешение при каждом соединении против кэша и против кэша с preresolve.
+    """
+    server, base_url = fake_site.start_server(feeds=args.per_host, latency=args.latency)
+    port = base_url.rsplit(":", 1)[1]
+    live = [f"site{i}.test" for i in range(args.hosts)]
+    dead = [f"dead{i}.test" for i in range(args.dead)]
+    hung = [f"hung{i}.test" for i in range(args.hung)]
+    hosts = live + dead + hung
+    random.Random(0).shuffle(hosts)
+    total = len(hosts) * args.per_host
+    print(f"Хостов: {len(live)} живых, {len(dead)} несуществующих, {len(hung)} зависающих; "
+          f"фидов: {total}, задержка DNS: {args.dns_latency * 1000:.0f} мс, зависание: {args.hang:g} с")
+    modes = (
+        ("без кэша", dict(ttl=0, negative_ttl=0, timeout=args.hang + 1), False),
+        ("кэш", dict(timeout=args.timeout), False),
+        ("кэш + preresolve", dict(timeout=args.timeout), True),
+    )
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            with open(verify_rss_feeds.INPUT_CSV_FILE, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Название", "URL"])
+                for section in range(args.per_host):
+                    for host in hosts:
+                        writer.writerow([f"{host} {section}", f"http://{host}:{port}{fake_site.feed_path(section)}"])
+            print(f"{'Режим':<20}{'Секунд':>10}{'Прошли':>8}{'Запросов':>10}{'Разрешений':>12}{'Отброшено':>11}")
+            for name, options, preresolve in modes:
+                stub = StubResolve(dead, hung, args.dns_latency, args.hang)
+                resolver = DnsResolver(stub, workers=args.workers * 4, **options)
+                verify_rss_feeds.PRERESOLVE = preresolve
+                verify_rss_feeds.DEDUP_FEEDS = False   # У всех хостов одинаковые фиды
+                http_client.reset_stats()
+                http_client.get_session().close()
+                elapsed = run_verify(1, args.workers, resolver=resolver)
+                print(f"{name:<20}{elapsed:>10.2f}{verify_rss_feeds.verified_count:>8}"
+                      f"{http_client.stats()['requests']:>10}{stub.calls:>12}{resolver.skipped:>11}")
+    finally:
+        verify_rss_feeds.PRERESOLVE = True
+        verify_rss_feeds.DEDUP_FEEDS = True
+        os.chdir(cwd)
+        server.shutdown()
+
+
+MEMORY_MODES = (
+    ("без ограничений", 0, 0),
+    ("с ограничениями", None, None),   # --budget-mb и --frontier
+)
+
+
+def bench_memory_run(args):
+    """
+    Один обход для бенчмарка memory в отдельном процессе: пик памяти по tracemalloc
+    и RSS, наибольшая длина очереди. Результат - последней строкой stdout в JSON.
+    """
+    peak_queue = 0
+    stop = threading.Event()
+
+    def sample_queue():
+        nonlocal peak_queue
+        while not stop.wait(0.02):
+            for value in metrics.snapshot().get("queue_depth", []):
+                peak_queue = max(peak_queue, value["value"])
+
+    sampler = threading.Thread(target=sample_queue, daemon=True)
+    tracemalloc.start()
+    sampler.start()
+    try:
+        result = run_crawl(args.base_url, args.engine, args.depth, args.workers, args.workers, politeness=False,
+                           parse_processes=1, max_in_flight_bytes=int(args.budget_mb * 1024 * 1024),
+                           max_frontier=args.frontier)
+    finally:
+        stop.set()
+        sampler.join()
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(json.dumps({
+        "pages": result["pages"],
+        "fetches": result["fetches"],
+        "seconds": round(result["seconds"], 2),
+        "traced_peak_mb": round(traced_peak / 1024 / 1024, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_queue": peak_queue,
+        "peak_body_mb": round(result["peak_body_mb"], 1),
+        "memory_waits": result["memory_waits"],
+        "deferred": result["deferred"],
+    }))
+
+
+def bench_memory(args):
+    """
+    Память обхода: элементы очереди (кортежи против CompactQueue) и обход большого
+    сайта с тяжелыми страницами без ограничений и с бюджетом памяти и MAX_FRONTIER.
+    """
+    from frontier import CompactQueue
+
+    print(f"Элементов очереди: {args.entries}")
+    print(f"{'Очередь':<22}{'МБ':>10}{'Байт/URL':>10}")
+    for name, factory in (("кортежи (как раньше)", queue.Queue), ("CompactQueue", CompactQueue)):
+        tracemalloc.start()
+        frontier_queue = factory()
+        for i in range(args.entries):
+            frontier_queue.put((f"http://127.0.0.1:8000/page/{i}/?section={i % 50}#comments", 2, "127.0.0.1:8000"))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del frontier_queue
+        print(f"{name:<22}{size / 1024 / 1024:>10.1f}{size / args.entries:>10.0f}")
+
+    server, base_url = fake_site.start_server(pages=args.pages, fanout=args.fanout, feeds=args.feeds,
+                                              latency=args.latency, page_padding=args.padding)
+    print(f"\nСайт-заглушка: {base_url}, страниц: {args.pages}, ссылок на странице: {args.fanout}, "
+          f"размер страницы: ~{args.padding // 1024} КБ, движок: {args.engine}, воркеров: {args.workers}")
+    try:
+        print(f"{'Режим':<18}{'Страниц':>9}{'Загрузок':>10}{'Секунд':>8}{'tracemalloc МБ':>16}{'RSS МБ':>8}{'Очередь':>9}"
+              f"{'Тела МБ':>9}{'Ожиданий':>10}{'Отложено':>10}")
+        for name, budget_mb, frontier_limit in MEMORY_MODES:
+            command = [sys.executable, os.path.abspath(__file__), "memory-run", base_url,
+                       "--engine", args.engine, "--depth", str(args.depth), "--workers", str(args.workers),
+                       "--budget-mb", str(args.budget_mb if budget_mb is None else budget_mb),
+                       "--frontier", str(args.frontier if frontier_limit is None else frontier_limit)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(f"Прогон {name} завершился с ошибкой:\n{completed.stderr}")
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{name:<18}{r['pages']:>9}{r['fetches']:>10}{r['seconds']:>8.1f}{r['traced_peak_mb']:>16.1f}{r['peak_rss_mb']:>8.0f}"
+                  f"{r['peak_queue']:>9}{r['peak_body_mb']:>9.1f}{r['memory_waits']:>10}{r['deferred']:>10}")
+    finally:
+        server.shutdown()
+
+
+def bench_visited(args):
+    """
+    Сравнивает память множества посещенных URL: строки, 64-битные отпечатки, фильтр Блума.
+    """
+    from visited_store import FingerprintSet, ScalableBloomFilter
+
+    stores = (
+        ("set(URL)", set),
+        ("fingerprints", FingerprintSet),
+        ("bloom", lambda: ScalableBloomFilter(error_rate=args.error_rate)),
+    )
+    print(f"URL: {args.count}")
+    print(f"{'Хранилище':<14}{'Память, МБ':>12}{'Байт/URL':>10}")
+    for name, factory in stores:
+        tracemalloc.start()
+        store = factory()
+        # URL строятся внутри замера: в set(URL) память строк входит в результат
+        for i in range(args.count):
+            store.add(f"https://www.example.com/news/section-{i % 97}/article-{i}.html?page={i % 7}")
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<14}{current / 2 ** 20:>12.1f}{current / args.count:>10.1f}")
+        del store
+
+
+SCALING_MODES = {
+    # режим -> (reporter.BACKGROUND, reporter.QUIET)
+    "print": (False, False),
+    "reporter": (True, False),
+    "quiet": (True, True),
+}
+
+
+def bench_scaling(args):
+    """
+    Масштабирование по числу воркеров при разных способах вывода в консоль:
+    print - каждая строка печатается воркером под блокировкой, reporter - строки
+    выводит отдельный поток пачками, quiet - без построчного вывода. Вывод идет
+    в файл с построчной буферизацией, как у терминала.
+    """
+    server, base_url = fake_site.start_server(pages=args.pages, fanout=args.fanout, feeds=args.feeds,
+                                              items_per_feed=args.items, latency=args.latency)
+    print(f"Сайт-заглушка: {base_url}, страниц: {args.pages}, фидов: {args.feeds}, "
+          f"задержка: {args.latency * 1000:.0f} мс, ядер: {os.cpu_count()}")
+    background, quiet_mode = reporter.BACKGROUND, reporter.QUIET
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            write_feed_list(verify_rss_feeds.INPUT_CSV_FILE, base_url, args.feeds)
+            print(f"{'Воркеров':<10}{'Вывод':<10}{'Обход, с':>10}{'Стр/сек':>10}{'Проверка, с':>13}{'Фидов/сек':>11}{'Строк':>8}")
+            for workers in args.workers:
+                for mode in args.modes:
+                    reporter.BACKGROUND, reporter.QUIET = SCALING_MODES[mode]
+                    with open(os.path.join(tmp, "console.log"), "w", buffering=1, encoding="utf-8") as console:
+                        crawl = run_crawl(base_url, "threads", args.depth, workers, 0,
+                                          politeness=False, stream=console)
+                        verify_seconds = run_verify(args.processes, workers, stream=console)
+                    with open(os.path.join(tmp, "console.log"), encoding="utf-8") as console:
+                        lines = sum(1 for _ in console)
+                    print(f"{workers:<10}{mode:<10}{crawl['seconds']:>10.2f}{crawl['pages'] / crawl['seconds']:>10.1f}"
+                          f"{verify_seconds:>13.2f}{args.feeds / verify_seconds:>11.1f}{lines:>8}")
+    finally:
+        reporter.BACKGROUND, reporter.QUIET = background, quiet_mode
+        os.chdir(cwd)
+        server.shutdown()
+
+
+SUITE_SCENARIOS = ("crawl-threads", "crawl-async", "verify")
+
+# Показатели, по которым сравнение с эталоном ищет замедления: ключ -> больше - лучше
+SUITE_CHECKS = {"rate": True, "p50_ms": False, "p90_ms": False, "p99_ms": False,
+                "cpu_seconds": False, "peak_rss_mb": False}
+
+
+def cpu_seconds():
+    """
+    Процессорное время (user + sys) процесса и его завершенных дочерних процессов.
+    """
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """
+    Пиковый RSS в МБ (ru_maxrss в Linux - в КБ, в macOS - в байтах).
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def trace_latencies(path):
+    """
+    Время обработки URL (сек) и количество ошибок по журналу трассировки metrics.TRACE_FILE.
+    """
+    latencies, errors = [], 0
+    if not os.path.exists(path):
+        return latencies, errors
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            latencies.append(record["seconds"])
+            if record["error"] or (record["status"] or 0) >= 400:
+                errors += 1
+    return latencies, errors
+
+
+def bench_scenario(args):
+    """
+    Один прогон сценария набора suite. Запускается отдельным процессом, чтобы
+    пиковый RSS и процессорное время относились только к этому прогону;
+    результат печатается последней строкой stdout в JSON.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics.TRACE_FILE = os.path.join(tmp, "trace.jsonl")
+        cpu_start = cpu_seconds()
+        if args.scenario == "verify":
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                write_feed_list(verify_rss_feeds.INPUT_CSV_FILE, args.base_url, args.feeds)
+                elapsed = run_verify(args.processes, args.workers)
+            finally:
+                os.chdir(cwd)
+            items, found = args.feeds, verify_rss_feeds.verified_count
+        else:
+            result = run_crawl(args.base_url, args.scenario.split("-", 1)[1], args.depth, args.workers,
+                               args.concurrency, parse_processes=args.processes)
+            elapsed, items, found = result["seconds"], result["pages"], result["feeds"]
+        cpu = cpu_seconds() - cpu_start
+        metrics.close()
+        latencies, errors = trace_latencies(metrics.TRACE_FILE)
+
+    print(json.dumps({
+        "items": items,
+        "found": found,
+        "seconds": round(elapsed, 3),
+        "rate": round(items / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "errors": errors,
+        "cpu_seconds": round(cpu, 2),
+        "cpu_percent": round(cpu / elapsed * 100) if elapsed else 0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "children_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }))
+
+
+def run_scenario(scenario, base_url, args):
+    """
+    Запускает сценарий в отдельном процессе и возвращает словарь его результатов.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "scenario", scenario, base_url,
+               "--feeds", str(args.feeds), "--depth", str(args.depth), "--workers", str(args.workers),
+               "--concurrency", str(args.concurrency), "--processes", str(args.processes)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Сценарий {scenario} завершился с ошибкой:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Сравнивает результаты с эталоном и печатает показатели, ухудшившиеся больше
+    чем на tolerance. Возвращает количество таких показателей.
+    """
+    regressions = 0
+    print(f"\nСравнение с эталоном (допуск {tolerance:.0%}):")
+    print(f"{'Сценарий':<15}{'Показатель':<14}{'Эталон':>10}{'Сейчас':>10}{'Изменение':>11}")
+    for scenario, result in results.items():
+        reference = baseline.get(scenario)
+        if reference is None:
+            print(f"{scenario:<15}нет в эталоне")
+            continue
+        for key, higher_is_better in SUITE_CHECKS.items():
+            before, after = reference.get(key), result.get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            mark = ""
+            if worse > tolerance:
+                regressions += 1
+                mark = "  ухудшение"
+            print(f"{scenario:<15}{key:<14}{before:>10}{after:>10}{change:>+11.1%}{mark}")
+    return regressions
+
+
+def bench_suite(args):
+    """
+    Набор офлайн-бенчмарков: обход сайта-заглушки обоими движками и проверка
+    его фидов. Каждый прогон идет в отдельном процессе; по нескольким повторам
+    берется медиана. Результаты можно сохранить (--save) и сравнить с ранее
+    сохраненными (--baseline): при ухудшении больше допуска код выхода 1.
+    """
+    site = {
+        "pages": args.pages, "fanout": args.fanout, "feeds": args.feeds, "items_per_feed": args.items,
+        "latency": args.latency, "error_rate": args.error_rate, "slow_rate": args.slow_rate,
+        "slow_latency": args.slow_latency, "feed_placement": args.feed_placement,
+        "stale_rate": args.stale_rate, "seed": args.seed,
+    }
+    server, base_url = fake_site.start_server(**site)
+    print(f"Сайт-заглушка: {base_url}, страниц: {args.pages}, фидов: {args.feeds}, "
+          f"ошибок: {args.error_rate:.0%}, медленных: {args.slow_rate:.0%}, ядер: {os.cpu_count()}")
+    results = {}
+    try:
+        print(f"{'Сценарий':<15}{'Объектов':>9}{'Найдено':>9}{'Секунд':>8}{'В сек':>8}"
+              f"{'p50 мс':>8}{'p90 мс':>8}{'p99 мс':>8}{'Ошибок':>8}{'CPU с':>7}{'CPU %':>7}{'RSS МБ':>8}")
+        for scenario in args.scenarios:
+            runs = [run_scenario(scenario, base_url, args) for _ in range(args.repeat)]
+            result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            results[scenario] = result
+            print(f"{scenario:<15}{result['items']:>9.0f}{result['found']:>9.0f}{result['seconds']:>8.2f}"
+                  f"{result['rate']:>8.1f}{result['p50_ms']:>8.1f}{result['p90_ms']:>8.1f}{result['p99_ms']:>8.1f}"
+                  f"{result['errors']:>8.0f}{result['cpu_seconds']:>7.2f}{result['cpu_percent']:>7.0f}"
+                  f"{result['peak_rss_mb']:>8.1f}")
+    finally:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"site": site, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["site"] != site:
+            print("Внимание: параметры сайта-заглушки отличаются от эталонных")
+        if compare_with_baseline(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки rss-feed-finder на локальном сайте-заглушке")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    engines = subparsers.add_parser("engines", help="Сравнение движков обхода threads/async")
+    engines.add_argument("--pages", type=int, default=500, help="Количество страниц сайта")
+    engines.add_argument("--fanout", type=int, default=10, help="Ссылок на странице")
+    engines.add_argument("--feeds", type=int, default=20, help="Количество фидов")
+    engines.add_argument("--latency", type=float, default=0.05, help="Задержка ответа сервера, сек")
+    engines.add_argument("--media-bytes", type=int, default=0, help="Размер картинки на каждой странице")
+    engines.add_argument("--tracking-links", action="store_true",
+                         help="Добавлять к ссылкам фрагменты и utm-параметры")
+    engines.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    engines.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков для движка threads")
+    engines.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                         help="Одновременных запросов для движка async")
+    engines.add_argument("--engines", nargs="+", default=["threads", "async"], help="Движки для сравнения")
+    engines.add_argument("--no-politeness", action="store_true",
+                         help="Отключить планировщик вежливости, чтобы мерить предел движков")
+    engines.set_defaults(func=bench_engines)
+
+    polite = subparsers.add_parser("politeness", help="Обход сайта с лимитом частоты с планировщиком вежливости и без")
+    polite.add_argument("--pages", type=int, default=300, help="Количество страниц сайта")
+    polite.add_argument("--fanout", type=int, default=10, help="Ссылок на странице")
+    polite.add_argument("--feeds", type=int, default=20, help="Количество фидов")
+    polite.add_argument("--latency", type=float, default=0.01, help="Задержка ответа сервера, сек")
+    polite.add_argument("--rate-limit", type=float, default=50, help="Лимит сайта, запросов в секунду")
+    polite.add_argument("--crawl-delay", type=float, default=None, help="Crawl-delay в robots.txt сайта")
+    polite.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    polite.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков для движка threads")
+    polite.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                        help="Одновременных запросов для движка async")
+    polite.add_argument("--engines", nargs="+", default=["threads", "async"], help="Движки для сравнения")
+    polite.set_defaults(func=bench_politeness)
+
+    sites = subparsers.add_parser("sites", help="Несколько сайтов: по одному против пакетного режима")
+    sites.add_argument("--sites", type=int, default=20, help="Количество сайтов")
+    sites.add_argument("--pages", type=int, default=30, help="Страниц на сайте")
+    sites.add_argument("--fanout", type=int, default=5, help="Ссылок на странице")
+    sites.add_argument("--feeds", type=int, default=3, help="Фидов на сайте")
+    sites.add_argument("--latency", type=float, default=0.05, help="Задержка ответа сервера, сек")
+    sites.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    sites.add_argument("--engine", default="threads", help="Движок обхода: threads или async")
+    sites.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков для движка threads")
+    sites.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                       help="Одновременных запросов для движка async")
+    sites.add_argument("--active", type=int, default=rss_crawler.MAX_ACTIVE_SITES,
+                       help="Сайтов, обходимых одновременно в пакетном режиме")
+    sites.set_defaults(func=bench_sites)
+
+    probe = subparsers.add_parser("probe", help="Загрузок на фид: обход ссылок против известных адресов")
+    probe.add_argument("--pages", type=int, default=500, help="Количество страниц сайта")
+    probe.add_argument("--fanout", type=int, default=10, help="Ссылок на странице")
+    probe.add_argument("--feeds", type=int, default=20, help="Количество фидов")
+    probe.add_argument("--latency", type=float, default=0.01, help="Задержка ответа сервера, сек")
+    probe.add_argument("--no-sitemaps", dest="sitemaps", action="store_false",
+                       help="Сайт без robots.txt Sitemap и карт сайта")
+    probe.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    probe.add_argument("--engine", default="async", help="Движок обхода: threads или async")
+    probe.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков для движка threads")
+    probe.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                       help="Одновременных запросов для движка async")
+    probe.add_argument("--modes", nargs="+", default=["crawl", "probe", "probe+crawl"],
+                       help="Режимы DISCOVERY для сравнения")
+    probe.set_defaults(func=bench_probe)
+
+    output = subparsers.add_parser("output", help="Потоковая запись и ленивое чтение результатов")
+    output.add_argument("--count", type=int, default=500000, help="Количество строк")
+    output.set_defaults(func=bench_output)
+
+    dates = subparsers.add_parser("dates", help="Оценка свежести: feedparser против feed_dates")
+    dates.add_argument("--fixtures", help="Каталог с сохраненными фидами (*.xml)")
+    dates.add_argument("--count", type=int, default=600, help="Фидов в синтетическом корпусе, если нет --fixtures")
+    dates.add_argument("--items", type=int, default=30, help="Записей в фиде синтетического корпуса")
+    dates.add_argument("--repeat", type=int, default=1, help="Количество повторов замера")
+    dates.set_defaults(func=bench_dates)
+
+    recheck = subparsers.add_parser("recheck", help="Почасовая проверка: все фиды против перепроверки по расписанию")
+    recheck.add_argument("--feeds", type=int, default=400, help="Количество фидов")
+    recheck.add_argument("--days", type=int, default=3, help="Сколько дней моделировать")
+    recheck.add_argument("--items", type=int, default=20, help="Записей, видимых в фиде")
+    recheck.set_defaults(func=bench_recheck)
+
+    daemon = subparsers.add_parser("daemon", help="Нагрузочный тест демона с HTTP API")
+    daemon.add_argument("--type", choices=("verify", "crawl"), default="verify", help="Тип заданий")
+    daemon.add_argument("--jobs", type=int, default=200, help="Всего заданий")
+    daemon.add_argument("--clients", type=int, default=8, help="Одновременных клиентов")
+    daemon.add_argument("--feeds-per-job", type=int, default=5, help="Фидов в задании verify")
+    daemon.add_argument("--job-workers", type=int, default=feed_daemon.JOB_WORKERS, help="Заданий одновременно")
+    daemon.add_argument("--max-queued", type=int, default=feed_daemon.MAX_QUEUED_JOBS, help="Размер очереди заданий")
+    daemon.add_argument("--feeds", type=int, default=50, help="Фидов на сайте-заглушке")
+    daemon.add_argument("--pages", type=int, default=50, help="Страниц на сайте-заглушке (для crawl)")
+    daemon.add_argument("--latency", type=float, default=0.01, help="Задержка ответа сайта-заглушки, секунд")
+    daemon.set_defaults(func=bench_daemon)
+
+    filter_ = subparsers.add_parser("filter", help="Фильтр URL: перебор слов против скомпилированных правил")
+    filter_.add_argument("--words", type=int, default=5000, help="Запрещенных слов")
+    filter_.add_argument("--urls", type=int, default=20000, help="Проверок URL")
+    filter_.add_argument("--repeats", type=int, default=5, help="Сколько раз встречается каждый URL")
+    filter_.add_argument("--pages", type=int, default=300, help="Количество страниц сайта")
+    filter_.add_argument("--feeds", type=int, default=20, help="Количество фидов")
+    filter_.add_argument("--media-bytes", type=int, default=50000, help="Размер картинки на каждой странице")
+    filter_.add_argument("--latency", type=float, default=0.005, help="Задержка ответа сервера, сек")
+    filter_.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    filter_.add_argument("--engine", default="threads", help="Движок обхода: threads или async")
+    filter_.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков для движка threads")
+    filter_.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                         help="Одновременных запросов для движка async")
+    filter_.set_defaults(func=bench_filter)
+
+    links = subparsers.add_parser("links", help="Извлечение ссылок: BeautifulSoup против link_extractor")
+    links.add_argument("--fixtures", help="Каталог с сохраненными HTML-страницами (*.html)")
+    links.add_argument("--count", type=int, default=200, help="Страниц сайта-заглушки, если нет --fixtures")
+    links.add_argument("--fanout", type=int, default=100, help="Ссылок на странице сайта-заглушки")
+    links.add_argument("--repeat", type=int, default=3, help="Количество повторов замера")
+    links.set_defaults(func=bench_links)
+
+    dedup = subparsers.add_parser("dedup", help="Один фид под разными URL: с распознаванием по содержимому и без")
+    dedup.add_argument("--pages", type=int, default=200, help="Страниц на сайте-заглушке")
+    dedup.add_argument("--feeds", type=int, default=20, help="Фидов (у каждого еще два других адреса)")
+    dedup.add_argument("--depth", type=int, default=3, help="Глубина обхода")
+    dedup.add_argument("--latency", type=float, default=0.005, help="Задержка ответа, секунд")
+    dedup.add_argument("--workers", type=int, default=8, help="Воркеров обхода и потоков проверки")
+    dedup.set_defaults(func=bench_dedup)
+
+    dns = subparsers.add_parser("dns", help="Проверка фидов многих хостов: кэш DNS и preresolve против разрешения при каждом соединении")
+    dns.add_argument("--hosts", type=int, default=40, help="Живых хостов")
+    dns.add_argument("--dead", type=int, default=10, help="Несуществующих хостов (NXDOMAIN)")
+    dns.add_argument("--hung", type=int, default=3, help="Хостов, у которых DNS не отвечает")
+    dns.add_argument("--per-host", type=int, default=5, help="Фидов на хост")
+    dns.add_argument("--dns-latency", type=float, default=0.05, help="Задержка ответа DNS, секунд")
+    dns.add_argument("--hang", type=float, default=5.0, help="Через сколько секунд отвечает зависающий DNS")
+    dns.add_argument("--timeout", type=float, default=1.0, help="RESOLVE_TIMEOUT для режимов с кэшем, секунд")
+    dns.add_argument("--latency", type=float, default=0.005, help="Задержка ответа сайта, секунд")
+    dns.add_argument("--workers", type=int, default=8, help="Потоков проверки")
+    dns.set_defaults(func=bench_dns)
+
+    memory = subparsers.add_parser("memory", help="Память обхода: компактная очередь, бюджет байт и MAX_FRONTIER")
+    memory.add_argument("--entries", type=int, default=200000, help="Элементов очереди для сравнения хранения")
+    memory.add_argument("--pages", type=int, default=20000, help="Страниц на сайте-заглушке")
+    memory.add_argument("--fanout", type=int, default=30, help="Ссылок <a> на каждой странице")
+    memory.add_argument("--feeds", type=int, default=20, help="Фидов разделов")
+    memory.add_argument("--padding", type=int, default=256 * 1024, help="Дополнительных байт в каждой странице")
+    memory.add_argument("--depth", type=int, default=2, help="Глубина обхода")
+    memory.add_argument("--latency", type=float, default=0.01, help="Задержка ответа, секунд")
+    memory.add_argument("--engine", choices=["threads", "async"], default="threads", help="Движок обхода")
+    memory.add_argument("--workers", type=int, default=32, help="Воркеров (или корутин для async)")
+    memory.add_argument("--budget-mb", type=float, default=2, help="MAX_IN_FLIGHT_BYTES в режиме с ограничениями, МБ")
+    memory.add_argument("--frontier", type=int, default=500, help="MAX_FRONTIER в режиме с ограничениями")
+    memory.set_defaults(func=bench_memory)
+
+    memory_run = subparsers.add_parser("memory-run")
+    memory_run.add_argument("base_url")
+    memory_run.add_argument("--engine", default="threads")
+    memory_run.add_argument("--depth", type=int, default=2)
+    memory_run.add_argument("--workers", type=int, default=32)
+    memory_run.add_argument("--budget-mb", type=float, default=0)
+    memory_run.add_argument("--frontier", type=int, default=0)
+    memory_run.set_defaults(func=bench_memory_run)
+
+    verify = subparsers.add_parser("verify", help="Проверка фидов при разном размере пула процессов")
+    verify.add_argument("--feeds", type=int, default=500, help="Количество фидов")
+    verify.add_argument("--items", type=int, default=50, help="Записей в каждом фиде")
+    verify.add_argument("--latency", type=float, default=0.0, help="Задержка ответа сервера, сек")
+    verify.add_argument("--workers", type=int, default=32, help="Потоков загрузки")
+    verify.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="Размеры пула процессов для сравнения")
+    verify.set_defaults(func=bench_verify)
+
+    visited = subparsers.add_parser("visited", help="Память множества посещенных URL")
+    visited.add_argument("--count", type=int, default=500000, help="Количество URL")
+    visited.add_argument("--error-rate", type=float, default=0.001, help="Ложные срабатывания фильтра Блума")
+    visited.set_defaults(func=bench_visited)
+
+    scaling = subparsers.add_parser("scaling", help="Масштабирование по числу воркеров при разном выводе в консоль")
+    scaling.add_argument("--pages", type=int, default=1000, help="Количество страниц сайта")
+    scaling.add_argument("--fanout", type=int, default=10, help="Ссылок на странице")
+    scaling.add_argument("--feeds", type=int, default=1000, help="Количество фидов")
+    scaling.add_argument("--items", type=int, default=10, help="Записей в каждом фиде")
+    scaling.add_argument("--latency", type=float, default=0.01, help="Задержка ответа сервера, сек")
+    scaling.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    scaling.add_argument("--processes", type=int, default=1, help="Процессов разбора фидов при проверке")
+    scaling.add_argument("--workers", type=int, nargs="+", default=[6, 32, 128], help="Количества воркеров")
+    scaling.add_argument("--modes", nargs="+", choices=SCALING_MODES, default=list(SCALING_MODES),
+                         help="Способы вывода в консоль")
+    scaling.set_defaults(func=bench_scaling)
+
+    suite = subparsers.add_parser("suite", help="Набор офлайн-бенчмарков: обход и проверка, CPU и память")
+    suite.add_argument("--pages", type=int, default=300, help="Количество страниц сайта")
+    suite.add_argument("--fanout", type=int, default=10, help="Ссылок на странице")
+    suite.add_argument("--feeds", type=int, default=100, help="Количество фидов")
+    suite.add_argument("--items", type=int, default=20, help="Записей в каждом фиде")
+    suite.add_argument("--latency", type=float, default=0.01, help="Задержка ответа сервера, сек")
+    suite.add_argument("--error-rate", type=float, default=0.02, help="Доля страниц и фидов, отвечающих 500")
+    suite.add_argument("--slow-rate", type=float, default=0.02, help="Доля медленных страниц и фидов")
+    suite.add_argument("--slow-latency", type=float, default=0.5, help="Задержка медленных страниц, сек")
+    suite.add_argument("--feed-placement", choices=fake_site.FEED_PLACEMENTS, default="head",
+                       help="Где сайт ссылается на фиды")
+    suite.add_argument("--stale-rate", type=float, default=0.3, help="Доля устаревших фидов")
+    suite.add_argument("--seed", type=int, default=fake_site.SEED, help="Зерно генератора сайта")
+    suite.add_argument("--depth", type=int, default=10, help="Глубина обхода")
+    suite.add_argument("--workers", type=int, default=rss_crawler.WORKERS, help="Потоков загрузки")
+    suite.add_argument("--concurrency", type=int, default=rss_crawler.ASYNC_CONCURRENCY,
+                       help="Одновременных запросов для движка async")
+    suite.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Процессов разбора")
+    suite.add_argument("--scenarios", nargs="+", choices=SUITE_SCENARIOS, default=list(SUITE_SCENARIOS),
+                       help="Сценарии для запуска")
+    suite.add_argument("--repeat", type=int, default=1, help="Повторов каждого сценария (берется медиана)")
+    suite.add_argument("--save", help="Сохранить результаты в JSON")
+    suite.add_argument("--baseline", help="JSON с эталонными результатами для сравнения")
+    suite.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение относительно эталона")
+    suite.set_defaults(func=bench_suite)
+
+    # Служебная команда: один прогон сценария suite в отдельном процессе
+    scenario = subparsers.add_parser("scenario")
+    scenario.add_argument("scenario", choices=SUITE_SCENARIOS)
+    scenario.add_argument("base_url")
+    scenario.add_argument("--feeds", type=int, required=True)
+    scenario.add_argument("--depth", type=int, required=True)
+    scenario.add_argument("--workers", type=int, required=True)
+    scenario.add_argument("--concurrency", type=int, required=True)
+    scenario.add_argument("--processes", type=int, required=True)
+    scenario.set_defaults(func=bench_scenario)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
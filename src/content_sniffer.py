@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Потоковая загрузка с определением типа ответа по первым байтам.
+
+Вместо скачивания всей страницы читаются первые SNIFF_BYTES байт, по ним и
+заголовку Content-Type ответ классифицируется как "rss", "atom", "rdf", "html",
+"sitemap" или "other". Картинки, PDF и прочие ненужные ответы обрываются сразу, а тело
+нужных ответов ограничено MAX_BODY_BYTES. Прочитанные тела учитываются
+в бюджете памяти задачи обхода (memory_budget), если он задан.
+"""
+
+import contextlib
+import re
+import threading
+
+import http_client
+import memory_budget
+import metrics
+
+# ======= Параметры конфигурации =======
+SNIFF_BYTES = 4096                 # Сколько байт читать для определения типа ответа
+MAX_BODY_BYTES = 5 * 1024 * 1024   # Максимальный размер тела страницы или фида
+CHUNK_SIZE = 16 * 1024             # Размер блока при потоковом чтении
+THROTTLE_RETRIES = 2               # Повторов после 429/503 (с паузой от планировщика вежливости)
+# =======================================
+
+FEED_KINDS = ("rss", "atom", "rdf")
+PAGE_KINDS = FEED_KINDS + ("html",)
+SITEMAP_KINDS = ("sitemap",)
+TEXT_KINDS = ("other",)  # robots.txt и прочий текст без разметки
+
+# Типы содержимого, которые точно не являются ни страницей, ни фидом
+BINARY_CONTENT_TYPES = ("image/", "video/", "audio/", "font/", "application/pdf",
+                        "application/zip", "application/octet-stream", "application/x-")
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+_HTML_MARKERS = ("<!doctype html", "<html", "<head", "<body")
+_CHARSET_RE = re.compile(r"""(?:charset|encoding)\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+_stats = {"bytes_read": 0, "aborted": 0, "truncated": 0}
+_stats_lock = threading.Lock()
+# Те же счетчики в metrics
+_METRIC_NAMES = {"bytes_read": "downloaded_bytes_total", "aborted": "aborted_responses_total",
+                 "truncated": "truncated_responses_total"}
+
+
+def count(key, value=1):
+    """
+    Увеличивает счетчик загрузки (используется и асинхронным движком).
+    """
+    with _stats_lock:
+        _stats[key] += value
+    metrics.count(_METRIC_NAMES[key], value)
+
+
+def is_binary_content_type(content_type):
+    """
+    Проверяет, что по заголовку Content-Type ответ не стоит даже начинать читать.
+    """
+    content_type = content_type.lower()
+    return any(content_type.startswith(prefix) for prefix in BINARY_CONTENT_TYPES)
+
+
+def classify(prefix, content_type=""):
+    """
+    Определяет тип ответа по началу тела (str) и заголовку Content-Type.
+    Возвращает "rss", "atom", "rdf", "html", "sitemap" или "other".
+    """
+    head = prefix.lstrip("\ufeff \t\r\n").lower()
+    content_type = content_type.lower()
+
+    # Фиды определяем по корневому элементу: заголовки у фидов часто неверные
+    if head.startswith("<") and not head.startswith(("<!doctype html", "<html")):
+        if "<rss" in head:
+            return "rss"
+        if "<feed" in head and ("<?xml" in head or "xmlns" in head):
+            return "atom"
+        if "<rdf:rdf" in head:
+            return "rdf"
+        if "<urlset" in head or "<sitemapindex" in head:
+            return "sitemap"
+
+    if any(t in content_type for t in HTML_CONTENT_TYPES):
+        return "html"
+    if not content_type and any(marker in head for marker in _HTML_MARKERS):
+        return "html"
+    return "other"
+
+
+def detect_encoding(content_type, prefix):
+    """
+    Кодировка из заголовка Content-Type, затем из XML-пролога или <meta>, иначе UTF-8.
+    """
+    for source in (content_type, prefix[:1024].decode("ascii", errors="ignore")):
+        match = _CHARSET_RE.search(source)
+        if match:
+            return match.group(1)
+    return "utf-8"
+
+
+def decode(body, encoding):
+    """
+    Декодирует тело ответа, не падая на неизвестной кодировке или битых байтах.
+    """
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def fetch(url, timeout=10, wanted=PAGE_KINDS, scheduler=None):
+    """
+    Загружает URL потоково. Возвращает кортеж (kind, text).
+    text равен None, если тип ответа не входит в wanted: такая загрузка
+    обрывается после первых SNIFF_BYTES байт (или сразу по Content-Type).
+    Если передан scheduler (politeness.HostScheduler), запрос ждет свободного
+    слота хоста, а после 429/503 повторяется не более THROTTLE_RETRIES раз;
+    сам HTTP-клиент такие ответы тогда не повторяет и Retry-After не ждет.
+    HTTP-ошибки пробрасываются как requests.HTTPError.
+    """
+    memory_budget.admit()
+    for attempt in range(THROTTLE_RETRIES + 1):
+        with scheduler.slot(url) if scheduler else contextlib.nullcontext(), metrics.request():
+            with metrics.stage("request"):
+                response = http_client.get(url, scheduled=scheduler is not None, timeout=timeout, stream=True)
+            with response:
+                metrics.record_status(response.status_code)
+                if scheduler:
+                    retry = scheduler.report(url, response.status_code, response.headers.get("Retry-After"))
+                    if retry and attempt < THROTTLE_RETRIES:
+                        continue
+                response.raise_for_status()
+                with metrics.stage("download"):
+                    return read_body(response, wanted)
+
+
+def read_body(response, wanted):
+    """
+    Читает тело ответа requests (stream=True) с определением типа по первым байтам.
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if is_binary_content_type(content_type):
+        count("aborted")
+        return "other", None
+
+    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) >= SNIFF_BYTES:
+            break
+    count("bytes_read", len(body))
+
+    kind = classify(bytes(body[:SNIFF_BYTES]).decode("latin-1"), content_type)
+    if kind not in wanted:
+        count("aborted")
+        return kind, None
+
+    for chunk in chunks:
+        body += chunk
+        count("bytes_read", len(chunk))
+        if len(body) >= MAX_BODY_BYTES:
+            # Слишком большой ответ: разбираем только начало
+            count("truncated")
+            del body[MAX_BODY_BYTES:]
+            break
+
+    memory_budget.hold(len(body))
+    return kind, decode(bytes(body), detect_encoding(content_type, bytes(body[:SNIFF_BYTES])))
+
+
+def stats():
+    """
+    Возвращает счетчики: прочитано байт, оборвано и обрезано ответов.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def format_stats():
+    """
+    Строка со счетчиками загрузки для итогового отчета.
+    """
+    current = stats()
+    return (f"Загружено {current['bytes_read'] / 1024:.1f} КБ, оборвано ответов: {current['aborted']}, "
+            f"обрезано по MAX_BODY_BYTES: {current['truncated']}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Кэш разрешения имен хостов для http_client и verify_rss_feeds.
+
+Без кэша каждое новое соединение в потоке-воркере вызывает блокирующий
+getaddrinfo, а несуществующий или не отвечающий домен занимает воркер
+на все время таймаута, и так для каждого фида этого домена. DnsResolver:
+- запоминает адреса хоста на TTL записи (системный getaddrinfo TTL
+  не сообщает, тогда используется DNS_TTL);
+- запоминает и неудачи (NXDOMAIN, таймаут) на NEGATIVE_TTL;
+- после CONNECT_FAILURES неудачных подключений подряд к одному хосту и порту
+  считает недоступным только этот адрес и тоже на NEGATIVE_TTL: единичный отказ
+  или таймаут подключения бывает и у живого сервера;
+- сводит одновременные запросы одного имени в один;
+- ограничивает время разрешения RESOLVE_TIMEOUT секундами;
+- preresolve() разрешает заранее и параллельно все хосты списка, prefetch()
+  начинает разрешение одного хоста в фоне, а failure() по одному кэшу говорит,
+  что хост недоступен, - такой фид можно отбросить, не отдавая воркеру.
+
+Функция разрешения подменяется (resolve=...), например заглушкой с заданными
+адресами и задержками: она принимает имя хоста и возвращает (адреса, TTL
+в секундах или None) либо выбрасывает socket.gaierror.
+"""
+
+import concurrent.futures
+import ipaddress
+import socket
+import threading
+import time
+
+import metrics
+
+# ======= Параметры конфигурации =======
+DNS_TTL = 300             # Сколько помнить адреса хоста, секунд (если функция разрешения не сообщила TTL)
+NEGATIVE_TTL = 60         # Сколько помнить неудачное разрешение (NXDOMAIN, таймаут), секунд
+RESOLVE_TIMEOUT = 5.0     # Сколько ждать ответа на один запрос, секунд
+RESOLVE_WORKERS = 32      # Потоков для разрешения имен (и для параллельного preresolve)
+CONNECT_FAILURES = 3      # Сколько неудачных подключений подряд к хосту и порту, чтобы считать их недоступными
+# =======================================
+
+
+def system_resolve(host):
+    """
+    Разрешение имени через системный getaddrinfo: (адреса без повторов, None - TTL неизвестен).
+    """
+    addresses = []
+    for *_, sockaddr in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM):
+        if sockaddr[0] not in addresses:
+            addresses.append(sockaddr[0])
+    return addresses, None
+
+
+def is_ip_address(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class DnsResolver:
+    """
+    Потокобезопасный кэш разрешения имен с отрицательным кэшированием.
+    lookup(host) возвращает список адресов или выбрасывает socket.gaierror.
+    """
+
+    def __init__(self, resolve=None, ttl=DNS_TTL, negative_ttl=NEGATIVE_TTL, timeout=RESOLVE_TIMEOUT,
+                 workers=RESOLVE_WORKERS, connect_failures=CONNECT_FAILURES):
+        self.resolve = resolve or system_resolve
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.workers = workers
+        self.connect_failures = connect_failures
+        self.lookups = 0          # Запросов разрешения имени (всего)
+        self.hits = 0             # Из них ответов из кэша
+        self.failures = 0         # Неудачных разрешений (без учета кэша)
+        self.skipped = 0          # Сколько раз недоступный хост отброшен через failure()
+        self._cache = {}          # host -> (истекает, адреса или None, ошибка или None)
+        self._pending = {}        # host -> Future разрешения, которое уже идет
+        self._unreachable = {}    # (host, port) -> [неудач подряд, истекает, ошибка]
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _submit(self, host):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers,
+                                                                   thread_name_prefix="dns")
+        started = []
+
+        def resolve():
+            # Таймаут отсчитывается от начала разрешения в потоке, а не от постановки
+            # в очередь: хосты, ждущие свободного потока, время не тратят
+            started.append(time.monotonic())
+            return self.resolve(host)
+
+        future = self._executor.submit(resolve)
+        future.started = started
+        return future
+
+    def _store(self, host, addresses, ttl, error):
+        ttl = self.negative_ttl if error else (self.ttl if ttl is None else ttl)
+        if ttl > 0:
+            self._cache[host] = (time.monotonic() + ttl, addresses, error)
+        else:
+            self._cache.pop(host, None)
+
+    def lookup(self, host):
+        """
+        Адреса хоста из кэша или после разрешения; при неудаче (в том числе
+        запомненной) - socket.gaierror с причиной.
+        """
+        if is_ip_address(host):
+            return [host]
+        host = host.lower().rstrip(".")
+        with self._lock:
+            self.lookups += 1
+            entry, future = self._start(host)
+            if entry:
+                self.hits += 1
+        if entry is None:
+            entry = self._wait(host, future)
+        _, addresses, error = entry
+        if error:
+            raise socket.gaierror(socket.EAI_NONAME, error)
+        return addresses
+
+    def _start(self, host):
+        """
+        (запись кэша, None), если она действительна, иначе (None, Future разрешения),
+        начатого сейчас или раньше. Вызывается под self._lock.
+        """
+        entry = self._cache.get(host)
+        if entry and entry[0] > time.monotonic():
+            return entry, None
+        future = self._pending.get(host)
+        if future is None:
+            future = self._pending[host] = self._submit(host)
+        return None, future
+
+    def prefetch(self, host):
+        """
+        Начинает разрешение имени в фоне, если его нет в кэше; не ждет результата.
+        """
+        if not host or is_ip_address(host):
+            return
+        with self._lock:
+            self._start(host.lower().rstrip("."))
+
+    def settle(self, host):
+        """
+        Дожидается разрешения имени, начатого prefetch(), чтобы failure() видел результат.
+        """
+        if not host or is_ip_address(host):
+            return
+        host = host.lower().rstrip(".")
+        with self._lock:
+            future = self._pending.get(host)
+        if future is not None:
+            self._wait(host, future)
+
+    def _wait(self, host, future):
+        addresses, ttl, error = None, None, None
+        with metrics.stage("dns"):
+            try:
+                while True:
+                    started = future.started[0] if future.started else None
+                    remaining = self.timeout if started is None else started + self.timeout - time.monotonic()
+                    try:
+                        addresses, ttl = future.result(timeout=max(0.0, remaining))
+                        break
+                    except concurrent.futures.TimeoutError:
+                        if started is not None:
+                            raise
+                        # Разрешение еще ждало свободного потока: отсчет начнется, когда он его возьмет
+                if not addresses:
+                    error = f"Нет адресов для {host}"
+            except concurrent.futures.TimeoutError:
+                error = f"Таймаут разрешения имени {host} ({self.timeout:g} с)"
+            except OSError as e:
+                error = f"Не удалось разрешить имя {host}: {e}"
+        with self._lock:
+            if self._pending.get(host) is future:
+                del self._pending[host]
+                if error:
+                    self.failures += 1
+                self._store(host, addresses, ttl, error)
+            # Если запись уже сделал другой поток, ждавший того же ответа, берем ее
+            entry = self._cache.get(host)
+        return entry or (0, addresses, error)
+
+    def preresolve(self, hosts):
+        """
+        Параллельно разрешает все хосты (не больше RESOLVE_WORKERS одновременно),
+        чтобы воркеры брали адреса из кэша. Возвращает число недоступных хостов.
+        """
+        def resolve_one(host):
+            try:
+                self.lookup(host)
+                return False
+            except OSError:
+                return True
+
+        hosts = {host for host in hosts if host}
+        if not hosts:
+            return 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="preresolve") as pool:
+            return sum(pool.map(resolve_one, hosts))
+
+    def failure(self, host, port=None):
+        """
+        Причина, если хост по кэшу недоступен (без нового разрешения): имя не
+        разрешилось или к порту port подряд не удалось подключиться. Иначе None.
+        """
+        if not host:
+            return None
+        host = host.lower().rstrip(".")
+        now = time.monotonic()
+        with self._lock:
+            entry = None if is_ip_address(host) else self._cache.get(host)
+            if entry and entry[2] and entry[0] > now:
+                self.skipped += 1
+                return entry[2]
+            failures = self._unreachable.get((host, port))
+            if failures and failures[0] >= self.connect_failures and failures[1] > now:
+                self.skipped += 1
+                return failures[2]
+        return None
+
+    def mark_unreachable(self, host, port, error):
+        """
+        Учитывает неудачное подключение к host:port. После connect_failures неудач
+        подряд адрес считается недоступным на NEGATIVE_TTL.
+        """
+        if not host:
+            return
+        key = (host.lower().rstrip("."), port)
+        with self._lock:
+            failures = self._unreachable.get(key)
+            if failures is None or failures[1] <= time.monotonic():
+                failures = self._unreachable[key] = [0, 0.0, None]
+            failures[0] += 1
+            failures[1] = time.monotonic() + self.negative_ttl
+            failures[2] = error
+
+    def mark_reachable(self, host, port):
+        """
+        Подключение к host:port удалось: счетчик неудач сбрасывается.
+        """
+        if host and self._unreachable:
+            with self._lock:
+                self._unreachable.pop((host.lower().rstrip("."), port), None)
+
+    def close(self):
+        if self._executor is not None:
+            # Зависшие вызовы getaddrinfo не ждем: их результат уже не нужен
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def summary(self):
+        return (f"DNS: запросов имен {self.lookups}, из кэша {self.hits}, неудачных разрешений {self.failures}, "
+                f"отброшено фидов недоступных хостов {self.skipped}")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Локальный сайт-заглушка для бенчмарков краулера.
+
+Генерирует детерминированный синтетический новостной сайт: HTML-страницы
+со ссылками друг на друга и RSS-фиды разделов. Сервер поднимается на
+127.0.0.1 в фоновом потоке и не требует доступа в сеть.
+
+Доля медленных и отвечающих 500 страниц и фидов, размещение ссылок на фиды
+и доля устаревших фидов настраиваются; какие именно страницы медленные или
+с ошибкой, определяется зерном SEED, поэтому сайт одинаков между запусками.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ======= Параметры сайта по умолчанию =======
+PAGES = 500          # Количество HTML-страниц
+FANOUT = 10          # Количество ссылок <a> на каждой странице
+FEEDS = 20           # Количество RSS-фидов разделов
+ITEMS_PER_FEED = 10  # Количество записей в каждом фиде
+LATENCY = 0.0        # Искусственная задержка ответа в секундах
+MEDIA_BYTES = 0      # Размер картинки, на которую ссылается каждая страница (0 - без картинок)
+TRACKING_LINKS = False  # Добавлять к ссылкам фрагменты и utm-параметры, как на настоящих сайтах
+RATE_LIMIT = 0       # Допустимая частота запросов в секунду, сверх нее - 429 (0 - без ограничения)
+CRAWL_DELAY = None   # Crawl-delay в /robots.txt (None - robots.txt без Crawl-delay)
+SITEMAPS = False     # Индекс карт сайта со страницами и фидами, указанный в robots.txt
+ERROR_RATE = 0.0     # Доля страниц и фидов, отвечающих 500 (главная страница отвечает всегда)
+SLOW_RATE = 0.0      # Доля медленных страниц и фидов...
+SLOW_LATENCY = 1.0   # ...и их дополнительная задержка в секундах
+FEED_PLACEMENT = "head"  # Ссылки на фиды: head - <link> на каждой странице, body - <a> на каждой странице,
+                         # home - <a> на все фиды только на главной, none - только в картах сайта
+STALE_RATE = 0.0     # Доля устаревших фидов: их записи сдвинуты на STALE_DAYS в прошлое
+STALE_DAYS = 30
+FEED_ALIASES = False # Страницы ссылаются на фид раздела еще и по другим адресам (/feeds/N.xml, ?format=rss)
+PAGE_PADDING = 0     # Дополнительные байты в каждой странице (встроенный скрипт), чтобы страницы были тяжелыми
+SEED = 42            # Зерно генератора, чтобы сайт был одинаковым между запусками
+# ============================================
+
+PARAGRAPH = (
+    "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, "
+    "quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo.</p>\n"
+)
+
+
+def page_path(index):
+    """
+    Возвращает путь страницы по её номеру (нулевая страница - главная).
+    """
+    return "/" if index == 0 else f"/page/{index}.html"
+
+
+def feed_path(section):
+    """
+    Возвращает путь RSS-фида раздела.
+    """
+    return f"/rss/section/{section}/"
+
+
+def feed_alias_paths(section):
+    """
+    Другие адреса того же фида раздела: отдают то же содержимое, что feed_path.
+    """
+    return [f"/feeds/{section}.xml", f"/rss/section/{section}?format=rss"]
+
+
+FEED_PLACEMENTS = ("head", "body", "home", "none")
+
+
+def chance(seed, kind, key):
+    """
+    Детерминированное псевдослучайное число [0, 1) для пути key и вида события kind:
+    по нему решается, медленная ли страница, отвечает ли она ошибкой и т. п.
+    """
+    return random.Random(f"{seed}:{kind}:{key}").random()
+
+
+LINK_SUFFIXES = ("", "#comments", "?utm_source=home&utm_medium=web", "?fbclid=abc#top")
+
+
+def render_page(index, pages=PAGES, fanout=FANOUT, feeds=FEEDS, seed=SEED, media=False, tracking=False,
+                placement=FEED_PLACEMENT, aliases=FEED_ALIASES, padding=PAGE_PADDING):
+    """
+    Генерирует HTML-страницу с номером index.
+    Каждая страница ссылается на fanout случайных страниц сайта через <a>,
+    на фид своего раздела - в зависимости от placement (см. FEED_PLACEMENT)
+    и, если media, на картинку. При aliases страница ссылается на фид раздела
+    еще и по другим его адресам (feed_alias_paths).
+    При tracking ссылки получают случайные фрагменты и параметры отслеживания.
+    padding - сколько байт встроенного скрипта добавить в <head>.
+    """
+    rng = random.Random(seed * 1000003 + index)
+    section = index % feeds if feeds else None
+    head = [f"<title>Страница {index}</title>"]
+    if section is not None and placement == "head":
+        head.append(
+            f'<link rel="alternate" type="application/rss+xml" '
+            f'title="Раздел {section}" href="{feed_path(section)}">'
+        )
+    if padding:
+        head.append("<script>/*" + "x" * padding + "*/</script>")
+    links = [
+        f'<li><a href="{page_path(rng.randrange(pages))}{rng.choice(LINK_SUFFIXES) if tracking else ""}">'
+        f'Новость {n}</a></li>'
+        for n in range(fanout)
+    ]
+    if section is not None and placement == "body":
+        links.append(f'<li><a href="{feed_path(section)}">RSS раздела {section}</a></li>')
+    elif placement == "home" and index == 0:
+        links.extend(f'<li><a href="{feed_path(n)}">RSS раздела {n}</a></li>' for n in range(feeds))
+    if section is not None and aliases:
+        links.extend(f'<li><a href="{path}">Лента раздела {section}</a></li>' for path in feed_alias_paths(section))
+    if media:
+        links.append(f'<li><a href="/media/{index}.jpg">Фото</a></li>')
+    body = PARAGRAPH * rng.randint(5, 30)
+    return (
+        "<!DOCTYPE html>\n<html><head>" + "".join(head) + "</head>\n<body>\n"
+        "<nav><ul>" + "".join(links) + "</ul></nav>\n"
+        "<article>" + body + "</article>\n</body></html>\n"
+    )
+
+
+def render_sitemap(paths, base_url, index=False):
+    """
+    Генерирует карту сайта (urlset) или индекс карт (sitemapindex) из списка путей.
+    """
+    root, item = ("sitemapindex", "sitemap") if index else ("urlset", "url")
+    entries = "".join(f"<{item}><loc>{base_url}{path}</loc></{item}>" for path in paths)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<{root} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</{root}>\n'
+    )
+
+
+def render_feed(section, items=ITEMS_PER_FEED, now=None, kind="rss", age=timedelta(0)):
+    """
+    Генерирует фид раздела: RSS 2.0, Atom или RDF (RSS 1.0) по kind. Записи идут
+    с шагом (section + 1) часов, так что у разных разделов разная доля свежих
+    новостей; самая новая запись старше now на age. Время округляется до часа,
+    чтобы в течение часа фид не менялся и отдавался с тем же ETag.
+    """
+    now = now or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    step = timedelta(hours=section + 1)
+    entries = []
+    for n in range(items):
+        published = now - age - step * n
+        if kind == "atom":
+            entries.append(
+                f"<entry><title>Новость {section}-{n}</title>"
+                f'<link href="/news/{section}/{n}.html"/>'
+                f"<id>section-{section}-item-{n}</id>"
+                f"<updated>{published.isoformat()}</updated></entry>"
+            )
+        elif kind == "rdf":
+            entries.append(
+                f'<item rdf:about="/news/{section}/{n}.html"><title>Новость {section}-{n}</title>'
+                f"<link>/news/{section}/{n}.html</link>"
+                f"<dc:date>{published.isoformat()}</dc:date></item>"
+            )
+        else:
+            entries.append(
+                f"<item><title>Новость {section}-{n}</title>"
+                f"<link>/news/{section}/{n}.html</link>"
+                f"<guid>section-{section}-item-{n}</guid>"
+                f"<pubDate>{format_datetime(published)}</pubDate></item>"
+            )
+    if kind == "atom":
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>Раздел {section}</title><id>section-{section}</id>"
+            + "".join(entries)
+            + "</feed>\n"
+        )
+    if kind == "rdf":
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+            'xmlns="http://purl.org/rss/1.0/" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<channel rdf:about="/"><title>Раздел {section}</title><link>/</link></channel>'
+            + "".join(entries)
+            + "</rdf:RDF>\n"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+        f"<title>Раздел {section}</title><link>/</link>"
+        + "".join(entries)
+        + "</channel></rss>\n"
+    )
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов сайта-заглушки. Параметры сайта берутся из атрибутов сервера.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящих сайтов
+
+    def do_GET(self):
+        site = self.server
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        # Медленными и с ошибкой бывают только страницы и фиды, а не главная, robots.txt и карты сайта
+        faulty = path.startswith(("/page/", "/rss/"))
+        delay = site.latency
+        if faulty and site.slow_rate and chance(site.seed, "slow", path) < site.slow_rate:
+            delay += site.slow_latency
+        if delay:
+            time.sleep(delay)
+
+        base_url = "http://" + self.headers.get("Host", "127.0.0.1")
+        if path == "/robots.txt":
+            text = "User-agent: *\nDisallow:\n"
+            if site.crawl_delay is not None:
+                text += f"Crawl-delay: {site.crawl_delay}\n"
+            if site.sitemaps:
+                text += f"Sitemap: {base_url}/sitemap_index.xml\n"
+            self._send(200, "text/plain", text)
+        elif site.sitemaps and path == "/sitemap_index.xml":
+            self._send(200, "application/xml", render_sitemap(["/sitemap-pages.xml", "/sitemap-feeds.xml"], base_url, index=True))
+        elif site.sitemaps and path == "/sitemap-pages.xml":
+            self._send(200, "application/xml", render_sitemap([page_path(i) for i in range(site.pages)], base_url))
+        elif site.sitemaps and path == "/sitemap-feeds.xml":
+            self._send(200, "application/xml", render_sitemap([feed_path(i) for i in range(site.feeds)], base_url))
+        elif not site.admit():
+            site.rejected += 1
+            self._send(429, "text/plain", "too many requests", {"Retry-After": "1"})
+        elif faulty and site.error_rate and chance(site.seed, "error", path) < site.error_rate:
+            self._send(500, "text/plain", "internal server error")
+        elif path == "/":
+            self._send(200, "text/html; charset=utf-8", self._page(0))
+        elif path.startswith("/page/") and path.endswith(".html"):
+            try:
+                index = int(path[len("/page/"):-len(".html")])
+            except ValueError:
+                index = -1
+            if 0 <= index < site.pages:
+                self._send(200, "text/html; charset=utf-8", self._page(index))
+            else:
+                self._send(404, "text/plain", "not found")
+        elif path.startswith(("/rss/section/", "/feeds/")):
+            try:
+                section = int(path.strip("/").split("/")[-1].removesuffix(".xml"))
+            except ValueError:
+                section = -1
+            if 0 <= section < site.feeds:
+                stale = site.stale_rate and chance(site.seed, "stale", section) < site.stale_rate
+                self._send_feed(render_feed(section, site.items_per_feed,
+                                            age=timedelta(days=site.stale_days) if stale else timedelta(0)))
+            else:
+                self._send(404, "text/plain", "not found")
+        elif path.startswith("/media/") and site.media_bytes:
+            self._send_bytes(200, "image/jpeg", b"\xff" * site.media_bytes)
+        else:
+            self._send(404, "text/plain", "not found")
+
+    def _page(self, index):
+        site = self.server
+        return render_page(index, site.pages, site.fanout, site.feeds, site.seed, bool(site.media_bytes),
+                           site.tracking, site.feed_placement, site.feed_aliases, site.page_padding)
+
+    def _send_feed(self, text):
+        """
+        Отдает фид с ETag и поддержкой условного запроса If-None-Match.
+        """
+        etag = '"' + hashlib.md5(text.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send(200, "application/rss+xml; charset=utf-8", text, {"ETag": etag})
+
+    def _send(self, status, content_type, text, headers=None):
+        self._send_bytes(status, content_type, text.encode("utf-8"), headers)
+
+    def _send_bytes(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Не засоряем вывод бенчмарка журналом запросов
+        pass
+
+
+class FakeSiteServer(ThreadingHTTPServer):
+    """
+    Многопоточный HTTP-сервер с увеличенной очередью соединений,
+    чтобы сотни одновременных запросов не отбрасывались на accept.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+    rate_limit = RATE_LIMIT
+    rejected = 0  # Сколько запросов получили 429
+
+    def admit(self):
+        """
+        Token bucket на rate_limit запросов в секунду (с запасом на секунду вперед).
+        Возвращает False, если запрос нужно отклонить.
+        """
+        if not self.rate_limit:
+            return True
+        with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def handle_error(self, request, client_address):
+        # Клиенты обрывают соединения при потоковой загрузке, это не ошибка сервера
+        pass
+
+
+def start_server(pages=PAGES, fanout=FANOUT, feeds=FEEDS, items_per_feed=ITEMS_PER_FEED,
+                 latency=LATENCY, seed=SEED, media_bytes=MEDIA_BYTES, tracking=TRACKING_LINKS,
+                 rate_limit=RATE_LIMIT, crawl_delay=CRAWL_DELAY, sitemaps=SITEMAPS, error_rate=ERROR_RATE,
+                 slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY, feed_placement=FEED_PLACEMENT,
+                 stale_rate=STALE_RATE, stale_days=STALE_DAYS, feed_aliases=FEED_ALIASES, page_padding=PAGE_PADDING,
+                 port=0):
+    """
+    Запускает сайт-заглушку в фоновом потоке.
+    Возвращает кортеж (server, base_url); остановка - server.shutdown().
+    """
+    server = FakeSiteServer(("127.0.0.1", port), FakeSiteHandler)
+    server.pages = pages
+    server.fanout = fanout
+    server.feeds = feeds
+    server.items_per_feed = items_per_feed
+    server.latency = latency
+    server.seed = seed
+    server.media_bytes = media_bytes
+    server.tracking = tracking
+    server.rate_limit = rate_limit
+    server.crawl_delay = crawl_delay
+    server.sitemaps = sitemaps
+    server.error_rate = error_rate
+    server.slow_rate = slow_rate
+    server.slow_latency = slow_latency
+    server.feed_placement = feed_placement
+    server.stale_rate = stale_rate
+    server.stale_days = stale_days
+    server.feed_aliases = feed_aliases
+    server.page_padding = page_padding
+    server._rate_lock = threading.Lock()
+    server._tokens = float(rate_limit)
+    server._updated = time.monotonic()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, bound_port = server.server_address[:2]
+    return server, f"http://{host}:{bound_port}"
+
+
+if __name__ == "__main__":
+    server, base_url = start_server()
+    print(f"Сайт-заглушка запущен: {base_url} (Ctrl+C для остановки)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
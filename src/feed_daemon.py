@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Демон поиска и проверки фидов с локальным HTTP/JSON API.
+
+Процесс запускается один раз и держит прогретыми пул соединений http_client,
+пул процессов разбора parse_pool, кэш условных запросов и состояние фидов,
+так что задание не платит за запуск Python и импорт requests/feedparser/bs4.
+Задания ставятся в ограниченную очередь (MAX_QUEUED_JOBS) и выполняются
+JOB_WORKERS потоками; когда очередь полна, новое задание отклоняется с 503.
+
+API (JSON в UTF-8):
+    POST /jobs                  - поставить задание, ответ 202 {"id": ..., "status": "queued"}
+        {"type": "crawl", "url": "https://example.com", "max_depth": 2, "max_feeds": 200}
+        {"type": "crawl", "urls": [...]}                       - пакетный обход сайтов
+        {"type": "verify", "feeds": [{"title": ..., "url": ...} или "url", ...], "hours": 48}
+    GET  /jobs/<id>             - состояние задания и прогресс
+    GET  /jobs/<id>/results     - результаты (по мере готовности, пока задание выполняется)
+    GET  /stats                 - очередь, задания, статистика соединений
+    GET  /metrics               - метрики в текстовом формате Prometheus (см. metrics.py)
+    GET  /metrics.json          - те же метрики в JSON
+
+Запуск:
+    python feed_daemon.py [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import math
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+import metrics
+import parse_pool
+import rss_crawler
+import verify_rss_feeds
+from feed_state import FeedStateStore
+from http_cache import HttpCache
+
+# ======= Параметры конфигурации =======
+HOST = "127.0.0.1"          # Адрес API (только локальный доступ)
+PORT = 8765                 # Порт API
+JOB_WORKERS = 2             # Сколько заданий выполняется одновременно
+MAX_QUEUED_JOBS = 100       # Максимум заданий в очереди, сверх него POST /jobs отвечает 503
+MAX_JOB_ITEMS = 10000       # Максимум сайтов или фидов в одном задании
+MAX_JOB_DEPTH = 100         # Максимальная глубина обхода (max_depth) в задании crawl
+MAX_JOB_FEEDS = 1000000     # Максимальный max_feeds в задании crawl
+KEEP_FINISHED_JOBS = 1000   # Сколько завершенных заданий хранить для GET /jobs/<id>
+# =======================================
+
+JOB_TYPES = ("crawl", "verify")
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """
+    Задание демона: параметры, состояние, прогресс и накопленные результаты.
+    """
+
+    def __init__(self, job_id, job_type, params):
+        self.id = job_id
+        self.type = job_type
+        self.params = params
+        self.status = QUEUED
+        self.error = None
+        self.total = len(params["items"])   # Сайтов или фидов в задании
+        self.done = 0                       # Из них обработано
+        self.results = []
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.status = RUNNING
+            self.started = time.time()
+
+    def finish(self, error=None):
+        with self._lock:
+            self.status = FAILED if error else DONE
+            self.error = error
+            self.finished = time.time()
+
+    def add_result(self, result, done=0):
+        with self._lock:
+            self.results.append(result)
+            self.done += done
+
+    def advance(self):
+        with self._lock:
+            self.done += 1
+
+    def describe(self):
+        """
+        Состояние задания для GET /jobs/<id>.
+        """
+        with self._lock:
+            return {
+                "id": self.id,
+                "type": self.type,
+                "status": self.status,
+                "error": self.error,
+                "total": self.total,
+                "done": self.done,
+                "results": len(self.results),
+                "submitted": self.submitted,
+                "started": self.started,
+                "finished": self.finished,
+            }
+
+    def snapshot(self):
+        """
+        Результаты для GET /jobs/<id>/results.
+        """
+        with self._lock:
+            return {"id": self.id, "status": self.status, "results": list(self.results)}
+
+
+def parse_job(body):
+    """
+    Проверяет тело POST /jobs. Возвращает (тип, параметры) или выбрасывает ValueError.
+    В параметрах список items - начальные URL сайтов или пары (название, URL) фидов.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("ожидается JSON-объект")
+    job_type = body.get("type")
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"type должен быть одним из: {', '.join(JOB_TYPES)}")
+
+    if job_type == "crawl":
+        urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise ValueError("для crawl нужен url или непустой список urls")
+        items = [url.strip() if "://" in url else "https://" + url.strip() for url in urls]
+        params = {
+            "max_depth": body.get("max_depth", rss_crawler.MAX_DEPTH),
+            "max_feeds": body.get("max_feeds", rss_crawler.MAX_FEEDS),
+        }
+    else:
+        feeds = body.get("feeds")
+        if not isinstance(feeds, list) or not feeds:
+            raise ValueError("для verify нужен непустой список feeds")
+        items = []
+        for feed in feeds:
+            if isinstance(feed, str):
+                items.append(("", feed))
+            elif isinstance(feed, dict) and isinstance(feed.get("url"), str):
+                items.append((str(feed.get("title", "")), feed["url"]))
+            else:
+                raise ValueError("элемент feeds - URL или объект с полями title и url")
+        params = {"hours": body.get("hours")}
+
+    if len(items) > MAX_JOB_ITEMS:
+        raise ValueError(f"не больше {MAX_JOB_ITEMS} сайтов или фидов в задании")
+    if job_type == "crawl":
+        # Глубина и лимит фидов доходят до очереди обхода (frontier.CompactQueue хранит
+        # глубину в 16 битах), поэтому это только целые числа в разумных пределах
+        for name, limit in (("max_depth", MAX_JOB_DEPTH), ("max_feeds", MAX_JOB_FEEDS)):
+            value = params[name]
+            if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= limit:
+                raise ValueError(f"{name} должен быть целым числом от 0 до {limit}")
+    elif params["hours"] is not None:
+        hours = params["hours"]
+        if not isinstance(hours, (int, float)) or isinstance(hours, bool) or not math.isfinite(hours) or hours < 0:
+            raise ValueError("hours должен быть неотрицательным числом")
+    params["items"] = items
+    return job_type, params
+
+
+class JobManager:
+    """
+    Ограниченная очередь заданий и потоки, которые их выполняют.
+    Фиды всех заданий verify проверяются общим пулом из verify_rss_feeds.MAX_WORKERS потоков.
+    """
+
+    def __init__(self, job_workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS, keep_finished=KEEP_FINISHED_JOBS):
+        self.keep_finished = keep_finished
+        self.started = time.time()
+        self.completed = 0   # Завершено заданий (успешно или с ошибкой)
+        self.rejected = 0    # Отклонено заданий из-за переполненной очереди
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = collections.OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._running = 0
+        self._verify_pool = concurrent.futures.ThreadPoolExecutor(max_workers=verify_rss_feeds.MAX_WORKERS)
+        metrics.gauge_set("workers", verify_rss_feeds.MAX_WORKERS, pool="verify")
+        metrics.gauge_set("workers", job_workers, pool="jobs")
+        metrics.register_gauge("queue_depth", self._queue.qsize, pool="jobs")
+        self._threads = []
+        for _ in range(job_workers):
+            t = threading.Thread(target=self._run_jobs, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, job_type, params):
+        """
+        Ставит задание в очередь. Выбрасывает queue.Full, если очередь заполнена.
+        """
+        with self._jobs_lock:
+            job = Job(str(next(self._ids)), job_type, params)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def _forget_finished(self):
+        """
+        Удаляет самые старые завершенные задания сверх keep_finished. Вызывается под _jobs_lock.
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def _run_jobs(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            with self._jobs_lock:
+                self._running += 1
+            job.start()
+            try:
+                with metrics.busy("jobs"):
+                    if job.type == "crawl":
+                        self._crawl(job)
+                    else:
+                        self._verify(job)
+                job.finish()
+            except Exception as e:
+                metrics.record_error("job", e)
+                job.finish(str(e) or type(e).__name__)
+            with self._jobs_lock:
+                self._running -= 1
+                self.completed += 1
+                self._forget_finished()
+            print(f"Задание {job.id} ({job.type}): {job.status}, результатов {len(job.results)}, "
+                  f"{job.finished - job.started:.2f} с")
+
+    def _crawl(self, job):
+        params = job.params
+        crawler = rss_crawler.RssCrawler(
+            max_depth=params["max_depth"], max_feeds=params["max_feeds"],
+            blocked_words=rss_crawler.BLOCKED_WORDS, engine=rss_crawler.ENGINE, workers=rss_crawler.WORKERS,
+            async_concurrency=rss_crawler.ASYNC_CONCURRENCY, parse_processes=rss_crawler.PARSE_PROCESSES,
+            visited_store=rss_crawler.VISITED_STORE, bloom_error_rate=rss_crawler.BLOOM_ERROR_RATE,
+            politeness=rss_crawler.POLITENESS, max_active_sites=rss_crawler.MAX_ACTIVE_SITES,
+            frontier_file=None, discovery=rss_crawler.DISCOVERY,
+            on_site_done=lambda site: job.advance(),
+            on_feed=lambda site, title, url: job.add_result({"title": title, "url": url, "site": site.domain}),
+        )
+        crawler.crawl(params["items"])
+
+    def _verify(self, job):
+        hours = job.params["hours"]
+
+        def check(feed):
+            title, url = feed
+            with metrics.busy("verify"), metrics.trace(url, "verify"):
+                result = verify_rss_feeds.check_feed_freshness(title, url, hours)
+            is_fresh, fresh_count, total_count, percent = result[:4]
+            job.add_result({
+                "title": title,
+                "url": url,
+                "fresh": is_fresh,
+                "fresh_count": fresh_count,
+                "total": total_count,
+                "percent": round(percent, 1),
+                "error": result[4] if len(result) > 4 else None,
+            }, done=1)
+
+        # Фиды задания ставим в общий пул, ошибки отдельных фидов уже учтены в check_feed_freshness
+        for future in [self._verify_pool.submit(check, feed) for feed in job.params["items"]]:
+            future.result()
+
+    def stats(self):
+        """
+        Сводка для GET /stats.
+        """
+        with self._jobs_lock:
+            return {
+                "uptime": round(time.time() - self.started, 1),
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "connections": http_client.stats(),
+            }
+
+    def shutdown(self):
+        """
+        Дожидается заданий, уже стоящих в очереди, и останавливает потоки.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._verify_pool.shutdown(wait=True)
+        metrics.unregister_gauge("queue_depth", pool="jobs")
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик API демона. Менеджер заданий берется из атрибута сервера.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job_type, params = parse_job(json.loads(self.rfile.read(length) or b"null"))
+        except ValueError as e:
+            # json.JSONDecodeError - тоже ValueError
+            self._send_json(400, {"error": str(e)})
+            return
+        try:
+            job = self.server.manager.submit(job_type, params)
+        except queue.Full:
+            self._send_json(503, {"error": "очередь заданий заполнена"}, {"Retry-After": "1"})
+            return
+        self._send_json(202, {"id": job.id, "status": job.status}, {"Location": f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["stats"]:
+            self._send_json(200, self.server.manager.stats())
+            return
+        if parts == ["metrics"]:
+            self._send_bytes(200, "text/plain; version=0.0.4; charset=utf-8", metrics.prometheus_text().encode("utf-8"))
+            return
+        if parts == ["metrics.json"]:
+            self._send_json(200, metrics.snapshot())
+            return
+        job = self.server.manager.get(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is None or (len(parts) == 3 and parts[2] != "results"):
+            self._send_json(404, {"error": "not found"})
+        elif len(parts) == 3:
+            self._send_json(200, job.snapshot())
+        else:
+            self._send_json(200, job.describe())
+
+    def _send_json(self, status, data, headers=None):
+        self._send_bytes(status, "application/json; charset=utf-8",
+                         json.dumps(data, ensure_ascii=False).encode("utf-8"), headers)
+
+    def _send_bytes(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Журнал каждого запроса не нужен: задания и так выводятся по завершении
+        pass
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_daemon(host=HOST, port=PORT, job_workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS):
+    """
+    Прогревает общие ресурсы (пул процессов разбора, кэш и состояние фидов verify_rss_feeds)
+    и запускает API в фоновом потоке. Возвращает кортеж (server, base_url);
+    остановка - stop_daemon(server).
+    """
+    parse_pool.start(max(rss_crawler.PARSE_PROCESSES, verify_rss_feeds.PARSE_PROCESSES))
+    if verify_rss_feeds.CACHE_FILE:
+        verify_rss_feeds.feed_cache = HttpCache(verify_rss_feeds.CACHE_FILE, verify_rss_feeds.CACHE_MAX_BYTES)
+    if verify_rss_feeds.STATE_FILE:
+        verify_rss_feeds.feed_states = FeedStateStore(verify_rss_feeds.STATE_FILE)
+
+    server = DaemonServer((host, port), DaemonHandler)
+    server.manager = JobManager(job_workers, max_queued)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
+
+
+def stop_daemon(server):
+    """
+    Останавливает прием запросов, дожидается поставленных заданий и освобождает ресурсы.
+    """
+    server.shutdown()
+    server.manager.shutdown()
+    server.server_close()
+    if verify_rss_feeds.feed_cache:
+        verify_rss_feeds.feed_cache.close()
+        verify_rss_feeds.feed_cache = None
+    if verify_rss_feeds.feed_states:
+        verify_rss_feeds.feed_states.close()
+        verify_rss_feeds.feed_states = None
+    metrics.close()
+    parse_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Демон поиска и проверки RSS-фидов с HTTP API")
+    parser.add_argument("--host", default=HOST, help="Адрес API (по умолчанию HOST)")
+    parser.add_argument("--port", type=int, default=PORT, help="Порт API (по умолчанию PORT)")
+    args = parser.parse_args()
+
+    server, base_url = start_daemon(args.host, args.port)
+    print(f"Демон запущен: {base_url} (заданий одновременно: {JOB_WORKERS}, очередь: {MAX_QUEUED_JOBS}). "
+          f"Ctrl+C для остановки")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nОстановка: дожидаемся заданий из очереди...")
+        stop_daemon(server)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Быстрое извлечение дат записей фида без полного разбора feedparser.
+
+Для оценки свежести нужны только даты записей, поэтому фид разбирается
+потоково (lxml.etree.iterparse): из каждой записи RSS, RDF или Atom берутся
+pubDate/published/issued, а если их нет - updated/modified/dc:date, после
+чего запись сразу удаляется из дерева. Строки дат разбираются без feedparser
+и кэшируются.
+
+Результат совпадает с verify_rss_feeds.entry_timestamps(feedparser.parse(...)).
+Если фид не удается разобрать так же надежно (битый XML, неизвестный формат
+даты или часового пояса, ни одной записи), feed_timestamps возвращает None,
+и вызывающий код разбирает фид через feedparser.
+"""
+
+import calendar
+import functools
+import io
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_tz
+
+from lxml import etree
+
+import content_sniffer
+
+# ======= Параметры конфигурации =======
+DATE_CACHE_SIZE = 65536   # Сколько разобранных строк дат держать в кэше
+# =======================================
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+ATOM03_NS = "http://purl.org/atom/ns#"
+RSS1_NS = "http://purl.org/rss/1.0/"
+RSS090_NS = "http://my.netscape.com/rdf/simple/0.9/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+DCTERMS_NS = "http://purl.org/dc/terms/"
+
+ENTRY_TAGS = ("item", f"{{{RSS1_NS}}}item", f"{{{RSS090_NS}}}item",
+              f"{{{ATOM_NS}}}entry", f"{{{ATOM03_NS}}}entry")
+
+# Элементы с датой так, как их понимает feedparser: published_parsed и updated_parsed
+PUBLISHED_TAGS = {"pubDate", f"{{{RSS1_NS}}}pubDate", f"{{{ATOM_NS}}}published", f"{{{ATOM_NS}}}issued",
+                  f"{{{ATOM03_NS}}}issued", f"{{{DCTERMS_NS}}}issued"}
+UPDATED_TAGS = {f"{{{ATOM_NS}}}updated", f"{{{ATOM_NS}}}issued", f"{{{ATOM03_NS}}}modified",
+                f"{{{ATOM03_NS}}}issued", f"{{{DC_NS}}}date", f"{{{DCTERMS_NS}}}modified"}
+
+
+class UnsupportedFeed(Exception):
+    """
+    Фид нужно разбирать feedparser.
+    """
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(text):
+    """
+    Unix time (UTC) из даты RFC 822 (RSS) или ISO 8601 (Atom, dc:date).
+    Если дату нельзя разобрать однозначно, выбрасывает UnsupportedFeed.
+    """
+    text = text.strip()
+    if text[:4].isdigit():
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            raise UnsupportedFeed(text)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        # Как и feedparser, отбрасываем доли секунды
+        return math.floor(parsed.timestamp())
+
+    parsed = parsedate_tz(text)
+    # Без часового пояса или с неизвестным поясом результат feedparser не угадать
+    if parsed is None or parsed[9] is None:
+        raise UnsupportedFeed(text)
+    return calendar.timegm(parsed[:9]) - parsed[9]
+
+
+def as_entry_timestamp(epoch):
+    """
+    Переводит Unix time так же, как entry_timestamps: time.mktime от struct_time в UTC.
+    Нужно, чтобы результаты обоих способов (и записи кэша) совпадали.
+    """
+    return time.mktime(time.gmtime(epoch))
+
+
+def entry_timestamp(entry):
+    published = updated = None
+    for child in entry:
+        tag = child.tag
+        if not isinstance(tag, str) or not child.text:
+            continue
+        if published is None and tag in PUBLISHED_TAGS:
+            published = child.text
+        if updated is None and tag in UPDATED_TAGS:
+            updated = child.text
+    text = published if published is not None else updated
+    return None if text is None else as_entry_timestamp(parse_date(text))
+
+
+def iter_entry_timestamps(content):
+    """
+    Потоково разбирает фид и отдает дату каждой записи (None, если даты нет).
+    """
+    for _, entry in etree.iterparse(io.BytesIO(content), events=("end",), tag=ENTRY_TAGS,
+                                    resolve_entities=False, no_network=True, huge_tree=True):
+        yield entry_timestamp(entry)
+        # Разобранные записи больше не нужны: дерево не растет с размером фида
+        entry.clear()
+        while entry.getprevious() is not None:
+            del entry.getparent()[0]
+
+
+def feed_timestamps(content):
+    """
+    Список дат записей фида (Unix time, как в entry_timestamps) или None,
+    если фид нужно разобрать feedparser.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    prefix = content[:content_sniffer.SNIFF_BYTES].decode("latin-1")
+    if content_sniffer.classify(prefix) not in content_sniffer.FEED_KINDS:
+        return None
+    try:
+        timestamps = list(iter_entry_timestamps(content))
+    except (etree.XMLSyntaxError, UnsupportedFeed, OverflowError, ValueError):
+        return None
+    # Пустой результат перепроверяем feedparser: он понимает больше вариантов разметки
+    return timestamps or None
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Отпечаток фида для поиска одного и того же фида под разными URL.
+
+Один фид часто доступен по нескольким адресам: /rss и /rss/, http и https,
+/news?format=rss и /news/feed. Сравнивать такие адреса как строки бесполезно,
+поэтому фид узнается по содержимому: отпечаток - хэш названия, ссылки,
+описания и идентификатора канала (Atom id, rdf:about) после нормализации
+(пробелы, регистр, ссылки - как в feed_alias_key) и идентификаторов первых
+FINGERPRINT_ENTRIES записей (guid/id, иначе ссылка). Без записей разные фиды
+разделов с одинаковым описанием канала (CMS часто называет их все именем сайта)
+сливались бы в один. Отпечаток меняется с новыми публикациями, поэтому
+сохраненный при прошлой проверке (feed_state) - только подсказка: дубликат
+определяется по отпечатку, полученному в этом запуске. Разбор потоковый
+и заканчивается после FINGERPRINT_ENTRIES записей, так что цена не зависит
+от размера фида.
+
+Ссылки rel="self" в отпечаток не входят: многие CMS (например, WordPress) ставят
+в них URL, по которому фид запросили, и разные адреса одного фида различались бы.
+Фид без названия, ссылки и идентификатора канала и без записей отпечатка не получает (None).
+
+feed_alias_key() - более дешевая проверка до загрузки: URL без схемы,
+фрагмента, параметров отслеживания и завершающего слэша. FeedAliases сводит
+фиды с одинаковым отпечатком к URL, заявленному первым.
+"""
+
+import hashlib
+import io
+import threading
+
+from lxml import etree
+
+from url_normalizer import url_key
+
+# ======= Параметры конфигурации =======
+FINGERPRINT_ENTRIES = 5   # Сколько первых записей фида входит в отпечаток
+# =======================================
+
+RDF_ABOUT = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about"
+
+
+def local_name(element):
+    tag = element.tag
+    if not isinstance(tag, str):
+        return None
+    return tag.rsplit("}", 1)[-1]
+
+
+def link_value(element):
+    """
+    Значение ссылки RSS (<link>текст</link>) или Atom (<link href="..."/>);
+    None для rel="self" и прочих ссылок, кроме alternate.
+    """
+    if element.get("rel", "alternate") != "alternate":
+        return None
+    value = element.get("href") or element.text
+    return value.strip() if value else None
+
+
+def normalize_text(text):
+    return " ".join(text.split()).casefold()
+
+
+def entry_id(entry):
+    """
+    Идентификатор записи: guid/id, rdf:about, иначе ссылка; None, если нет ничего.
+    """
+    link = None
+    for child in entry:
+        name = local_name(child)
+        if name in ("guid", "id") and child.text and child.text.strip():
+            return child.text.strip()
+        if name == "link" and link is None:
+            link = link_value(child)
+    if entry.get(RDF_ABOUT):
+        return entry.get(RDF_ABOUT).strip()
+    return feed_alias_key(link) if link else None
+
+
+def feed_fingerprint(content, entries=FINGERPRINT_ENTRIES):
+    """
+    Отпечаток фида (шестнадцатеричная строка) или None, если фид не разобрать
+    или у канала нет ни названия, ни ссылки, ни идентификатора, ни записей.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    fields = {}
+    ids = []
+    in_entries = False
+    try:
+        for event, element in etree.iterparse(io.BytesIO(content), events=("start", "end"), resolve_entities=False,
+                                              no_network=True, huge_tree=True, recover=True):
+            name = local_name(element)
+            if name in ("item", "entry"):
+                in_entries = True
+                if event == "end":
+                    ids.append(entry_id(element) or "")
+                    # Дальше первых записей читать незачем
+                    if len(ids) >= entries:
+                        break
+                continue
+            if event == "start" or in_entries:
+                continue
+            if name == "channel" and element.get(RDF_ABOUT):
+                fields.setdefault("id", feed_alias_key(element.get(RDF_ABOUT)))
+                continue
+            parent = element.getparent()
+            if parent is None or local_name(parent) not in ("channel", "feed"):
+                continue
+            if name == "link":
+                value = link_value(element)
+                if value:
+                    fields.setdefault("link", feed_alias_key(value))
+            elif name in ("title", "description", "subtitle", "id") and element.text and element.text.strip():
+                key = "description" if name == "subtitle" else name
+                fields.setdefault(key, feed_alias_key(element.text) if key == "id" else normalize_text(element.text))
+    except etree.XMLSyntaxError:
+        return None
+    if not fields.keys() & {"title", "link", "id"} and not any(ids):
+        return None
+    parts = [fields.get(key, "") for key in ("title", "link", "description", "id")] + ids
+    digest = hashlib.sha1("\n".join(parts).encode("utf-8"))
+    return digest.hexdigest()[:20]
+
+
+def feed_alias_key(url):
+    """
+    Ключ URL фида без схемы: http://x/rss/ и https://x/rss - один фид.
+    """
+    key = url_key(url)
+    return key.split("://", 1)[-1]
+
+
+class FeedAliases:
+    """
+    Потокобезопасное соответствие отпечаток -> канонический URL фида
+    (первый URL, с которым встретился отпечаток).
+
+    Отпечаток, сохраненный при прошлой проверке, может устареть, поэтому дубликатом
+    URL считается только по отпечатку, полученному при загрузке в этом запуске
+    (или подтвержденному ответом 304). Сохраненный отпечаток лишь закрепляет
+    за URL свободный отпечаток, а совпадение с чужим - повод загрузить фид.
+    """
+
+    def __init__(self):
+        self.aliases = 0          # Сколько URL оказались другим адресом уже известного фида
+        self.revalidated = 0      # Из них подтверждены ответом 304, без скачивания фида
+        self._canonical = {}
+        self._lock = threading.Lock()
+
+    def claim(self, fingerprint, url, confirmed=True, revalidated=False):
+        """
+        Возвращает канонический URL для отпечатка: url, если отпечаток встретился
+        впервые (или уже закреплен за этим url), иначе URL, заявивший его раньше.
+        confirmed=False - отпечаток взят из сохраненного состояния: если он чужой,
+        URL еще не дубликат, фид нужно загрузить и вызвать claim с новым отпечатком.
+        revalidated - отпечаток подтвержден ответом 304 (фид не скачивался).
+        """
+        with self._lock:
+            canonical = self._canonical.setdefault(fingerprint, url)
+            if canonical != url and confirmed:
+                self.aliases += 1
+                if revalidated:
+                    self.revalidated += 1
+            return canonical
+
+    def release(self, fingerprint, url):
+        """
+        Снимает отпечаток с url, если он закреплен за ним (сохраненный отпечаток
+        не подтвердился при загрузке).
+        """
+        with self._lock:
+            if self._canonical.get(fingerprint) == url:
+                del self._canonical[fingerprint]
+
+    def summary(self):
+        return (f"Дубликатов фидов (тот же фид по другому URL): {self.aliases}, "
+                f"из них подтверждено ответом 304 без скачивания: {self.revalidated}")
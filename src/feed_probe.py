@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Поиск фидов по известным адресам до обхода сайта.
+
+Большинство CMS публикуют фиды в предсказуемых местах: <link rel="alternate">
+на главной странице, /feed, /rss.xml, /atom.xml, а также в картах сайта,
+на которые ссылается robots.txt. Эти адреса проверяются параллельно
+в самом начале обхода сайта, а затем по умолчанию (режим "probe+crawl")
+идет обход ссылок <a> на глубину MAX_DEPTH: фиды разделов часто есть только
+на страницах разделов. В режиме "probe" обход пропускается, если главная
+объявляет фиды, а карты сайта прочитаны целиком (SiteCrawl.probe_complete).
+
+Здесь собраны только правила выбора адресов. Загрузку выполняют движки
+обхода (SiteCrawl.probe и async_crawler.probe) через общий пул воркеров.
+"""
+
+from urllib.parse import urlsplit, urlunsplit
+
+# ======= Параметры конфигурации =======
+PROBE_PATHS = ("/feed", "/rss", "/rss.xml", "/atom.xml", "/feeds/", "/index.xml")  # Типичные адреса фидов
+MAX_SITEMAPS = 10            # Сколько карт сайта (включая вложенные в индекс) загружать на сайт
+MAX_SITEMAP_FEEDS = 50       # Сколько похожих на фид адресов из карт сайта проверять на сайт
+FEED_URL_HINTS = ("feed", "rss", "atom")  # Признаки фида в адресе из карты сайта
+# =======================================
+
+# Виды проверок: robots.txt, главная страница, карта сайта, адрес-кандидат в фиды
+ROBOTS, HOME, SITEMAP, FEED = "robots", "home", "sitemap", "feed"
+
+
+def site_root(url):
+    """
+    Корень сайта: схема и хост без пути.
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, "", "", ""))
+
+
+def initial_probes(start_url):
+    """
+    Первые проверки сайта в порядке выполнения: список пар (вид, URL).
+    robots.txt идет первым, чтобы его загрузку не повторил планировщик вежливости.
+    """
+    root = site_root(start_url)
+    probes = [(ROBOTS, root + "/robots.txt"), (HOME, start_url), (SITEMAP, root + "/sitemap.xml")]
+    probes.extend((FEED, root + path) for path in PROBE_PATHS)
+    return probes
+
+
+def robots_sitemaps(robots_text):
+    """
+    Адреса карт сайта из строк Sitemap: в robots.txt.
+    """
+    sitemaps = []
+    for line in robots_text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        field, _, value = line.partition(":")
+        if field.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+
+def is_feed_like(url):
+    """
+    Похож ли адрес из карты сайта на фид.
+    """
+    lowered = url.lower()
+    return any(hint in lowered for hint in FEED_URL_HINTS)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Постоянное состояние фидов и расписание их перепроверки для verify_rss_feeds.
+
+Для каждого URL хранятся даты записей из последней загрузки, дата самой новой
+записи, оценка частоты публикаций, время последней проверки и следующей.
+Фид, у которого срок перепроверки не наступил, не запрашивается: оценка
+свежести строится по сохраненным датам (так свежий фид сам становится
+несвежим, когда его записи устаревают). Часто обновляемые фиды
+перепроверяются раз в MIN_RECHECK_HOURS, замолчавшие - раз в MAX_RECHECK_HOURS,
+остальные - примерно тогда, когда ожидается RECHECK_ENTRIES новых записей.
+
+Новыми считаются записи с датой позже самой новой из уже виденных; по их числу
+между проверками уточняется частота публикаций.
+
+Вместе с датами хранится отпечаток фида (feed_fingerprint): если он совпал
+с отпечатком другого URL, verify_rss_feeds загружает фид вне расписания, чтобы
+проверить совпадение по свежему отпечатку.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+# ======= Параметры конфигурации =======
+MIN_RECHECK_HOURS = 1.0     # Не перепроверять фид чаще, чем раз в N часов
+MAX_RECHECK_HOURS = 24.0    # ...и не реже, чем раз в N часов
+RECHECK_ENTRIES = 1.0       # Перепроверять, когда ожидается столько новых записей
+RATE_SMOOTHING = 0.5        # Вес новой оценки частоты публикаций (экспоненциальное сглаживание)
+RECHECK_SLACK_MINUTES = 10  # Перепроверять чуть раньше срока, чтобы запуск по расписанию не пропускал фид
+# =======================================
+
+
+def estimate_rate(timestamps, now):
+    """
+    Частота публикаций (записей в час) по датам записей фида: сколько записей
+    вышло с самой старой из них до текущего момента.
+    """
+    dated = [ts for ts in timestamps if ts is not None]
+    if not dated:
+        return 0.0
+    hours = max((now - min(dated)) / 3600, MIN_RECHECK_HOURS)
+    return len(dated) / hours
+
+
+def recheck_interval(rate):
+    """
+    Через сколько часов перепроверять фид с частотой публикаций rate записей в час.
+    """
+    if rate <= 0:
+        return MAX_RECHECK_HOURS
+    return min(MAX_RECHECK_HOURS, max(MIN_RECHECK_HOURS, RECHECK_ENTRIES / rate))
+
+
+class FeedStateStore:
+    """
+    Потокобезопасное хранилище состояния фидов поверх SQLite.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.checked = 0       # Фидов загружено в этом запуске
+        self.skipped = 0       # Фидов оценено по сохраненному состоянию без загрузки
+        self.new_entries = 0   # Новых записей найдено в этом запуске
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            " url TEXT PRIMARY KEY,"
+            " entries TEXT NOT NULL,"
+            " newest REAL,"
+            " rate REAL NOT NULL,"
+            " checked_at REAL NOT NULL,"
+            " next_check REAL NOT NULL,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " fingerprint TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(feeds)")}
+        if "fingerprint" not in columns:
+            # Файл состояния от версии без отпечатков
+            self._conn.execute("ALTER TABLE feeds ADD COLUMN fingerprint TEXT")
+
+    def get(self, url):
+        """
+        Возвращает словарь с полями entries, newest, rate, checked_at, next_check,
+        failures, error, fingerprint или None, если фид еще не проверялся.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entries, newest, rate, checked_at, next_check, failures, error, fingerprint"
+                " FROM feeds WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        entries, newest, rate, checked_at, next_check, failures, error, fingerprint = row
+        return {
+            "entries": json.loads(entries),
+            "newest": newest,
+            "rate": rate,
+            "checked_at": checked_at,
+            "next_check": next_check,
+            "failures": failures,
+            "error": error,
+            "fingerprint": fingerprint,
+        }
+
+    def is_due(self, state, now=None):
+        """
+        Наступил ли срок перепроверки фида (для нового фида - всегда).
+        """
+        return state is None or (now or time.time()) + RECHECK_SLACK_MINUTES * 60 >= state["next_check"]
+
+    def record_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def record_check(self, url, timestamps, state=None, now=None, fingerprint=None):
+        """
+        Сохраняет даты записей загруженного фида (и отпечаток содержимого), уточняет
+        частоту публикаций и назначает следующую проверку. state - состояние фида
+        до загрузки (из get()). Возвращает число новых записей.
+        """
+        now = now or time.time()
+        dated = [ts for ts in timestamps if ts is not None]
+        newest = max(dated) if dated else None
+        rate = estimate_rate(timestamps, now)
+        new_entries = len(dated)
+        if state is not None:
+            previous = state["newest"]
+            new_entries = sum(1 for ts in dated if previous is None or ts > previous)
+            if previous is not None and newest is not None:
+                newest = max(newest, previous)
+            elapsed = (now - state["checked_at"]) / 3600
+            if elapsed > 0:
+                # В фиде видно только последние записи: если их вышло больше, чем помещается,
+                # частота по новым записям между проверками точнее оценки по датам фида
+                rate = max(rate, new_entries / elapsed)
+            rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * state["rate"]
+        next_check = now + recheck_interval(rate) * 3600
+        with self._lock:
+            self.checked += 1
+            self.new_entries += new_entries
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, entries, newest, rate, checked_at, next_check, failures, error,"
+                " fingerprint) VALUES (?, ?, ?, ?, ?, ?, 0, NULL, ?)",
+                (url, json.dumps(timestamps), newest, rate, now, next_check,
+                 fingerprint or (state["fingerprint"] if state else None)),
+            )
+        return new_entries
+
+    def record_error(self, url, error, state=None, now=None):
+        """
+        Сохраняет ошибку загрузки. Повторная попытка - через MIN_RECHECK_HOURS,
+        с каждой следующей ошибкой подряд пауза удваивается (до MAX_RECHECK_HOURS).
+        """
+        now = now or time.time()
+        failures = state["failures"] + 1 if state else 1
+        delay = min(MAX_RECHECK_HOURS, MIN_RECHECK_HOURS * 2 ** (failures - 1))
+        with self._lock:
+            self.checked += 1
+            if state is None:
+                self._conn.execute(
+                    "INSERT INTO feeds (url, entries, newest, rate, checked_at, next_check, failures, error)"
+                    " VALUES (?, '[]', NULL, 0, ?, ?, ?, ?)",
+                    (url, now, now + delay * 3600, failures, error),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE feeds SET checked_at = ?, next_check = ?, failures = ?, error = ? WHERE url = ?",
+                    (now, now + delay * 3600, failures, error, url),
+                )
+
+    def summary(self):
+        """
+        Строка со статистикой для итогового отчета.
+        """
+        return (f"Состояние фидов: загружено {self.checked}, "
+                f"оценено без загрузки (срок перепроверки не наступил) {self.skipped}, "
+                f"новых записей {self.new_entries}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Очередь обхода (frontier) краулера: URL к обработке, посещенные URL и найденные фиды.
+
+MemoryFrontier хранит всё в памяти, как раньше глобальные url_queue и visited.
+SqliteFrontier хранит то же самое в файле SQLite: память не растет с размером
+сайта, состояние периодически сохраняется (checkpoint), и прерванный обход
+можно продолжить с того же места.
+
+Оба класса потокобезопасны и имеют одинаковый интерфейс:
+put(), get() -> (task_id, (url, depth, domain)), done(task_id), pending(),
+visit(url, leaf), is_visited(url, leaf), visited_count(), add_feed(), feeds(), deferred(), close().
+Посещенные URL сравниваются по url_normalizer.url_key, то есть без учета
+фрагмента, параметров отслеживания и завершающего слэша. Страница последнего
+уровня (leaf=True, ссылки с нее не добавляются) отмечается отдельно: если тот же
+URL потом встретится на верхнем уровне, он будет обработан еще раз, чтобы
+добавить его ссылки. При обходе по уровням так почти не бывает, а при
+переполнении очереди (см. ниже) это сохраняет полноту обхода. visited_count()
+считает URL, а не обработки: повторная обработка в нем не учитывается.
+
+В памяти элемент очереди хранится одной строкой байт (CompactQueue): глубина
+и номер домена в заголовке, затем URL в UTF-8. Это примерно на треть меньше кортежа
+(url, depth, domain) со строкой URL внутри. URL выдаются по уровням глубины,
+начиная с ближайших к стартовой странице. Если в очереди больше drain_above URL,
+порядок обратный: сначала страницы последних уровней, которые добавляют меньше
+всего новых ссылок, так что очередь сокращается, а обход верхних уровней
+откладывается (обратное давление без остановки воркеров).
+"""
+
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from url_normalizer import url_key
+from visited_store import create_visited_store, url_fingerprint
+
+CHECKPOINT_INTERVAL = 5.0  # Как часто сохранять состояние на диск, секунд
+
+_ENTRY_HEADER = struct.Struct("<hI")  # Глубина и номер домена в начале элемента CompactQueue
+LEAF_SUFFIX = "\x00leaf"               # Добавляется к ключу URL, посещенного на последнем уровне
+
+
+def visited_keys(url):
+    """
+    Ключ URL для множества посещенных и ключ его посещения на последнем уровне.
+    """
+    key = url_key(url)
+    return key, key + LEAF_SUFFIX
+
+
+class CompactQueue(queue.Queue):
+    """
+    queue.Queue для элементов (url, depth, domain), хранящая каждый элемент
+    одним объектом bytes. Домены хранятся один раз в таблице, в элементе - номер.
+    Элементы лежат в отдельной очереди на каждую глубину (см. описание модуля).
+    """
+
+    def __init__(self, drain_above=0):
+        self.drain_above = drain_above   # Больше стольких URL - сначала последние уровни (0 - никогда)
+        self.deferred = 0                # Сколько раз выдан URL последнего уровня вместо верхнего
+        super().__init__()
+
+    def _init(self, maxsize):
+        self.levels = {}        # Оставшаяся глубина -> deque элементов
+        self.size = 0
+        self.domains = []       # Номер -> домен
+        self.domain_ids = {}    # Домен -> номер
+
+    def _qsize(self):
+        return self.size
+
+    def _put(self, item):
+        url, depth, domain = item
+        domain_id = self.domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = self.domain_ids[domain] = len(self.domains)
+            self.domains.append(sys.intern(domain))
+        level = self.levels.get(depth)
+        if level is None:
+            level = self.levels[depth] = deque()
+        level.append(_ENTRY_HEADER.pack(depth, domain_id) + url.encode("utf-8", "surrogatepass"))
+        self.size += 1
+
+    def _get(self):
+        # Чем больше оставшаяся глубина, тем ближе страница к стартовой
+        top = max(self.levels)
+        depth = top
+        if self.drain_above and self.size > self.drain_above:
+            depth = min(self.levels)
+            if depth != top:
+                self.deferred += 1
+        level = self.levels[depth]
+        entry = level.popleft()
+        if not level:
+            del self.levels[depth]
+        self.size -= 1
+        depth, domain_id = _ENTRY_HEADER.unpack_from(entry)
+        return entry[_ENTRY_HEADER.size:].decode("utf-8", "surrogatepass"), depth, self.domains[domain_id]
+
+
+class MemoryFrontier:
+    """
+    Очередь обхода в памяти. Посещенные URL хранятся компактно
+    (см. visited_store): отпечатками или в фильтре Блума.
+    """
+
+    def __init__(self, visited_store="fingerprints", error_rate=0.001, drain_above=0):
+        self._queue = CompactQueue(drain_above)
+        self._visited = create_visited_store(visited_store, error_rate)
+        self._visited_urls = 0   # Посещенных URL: ключи последнего уровня и повторные посещения не в счет
+        self._visited_lock = threading.Lock()
+        self._feeds = []
+
+    def put(self, url, depth, domain):
+        self._queue.put((url, depth, domain))
+
+    def get(self, timeout=None):
+        """
+        Возвращает (task_id, (url, depth, domain)). Если очередь пуста дольше timeout
+        секунд (timeout=0 - не ждать), выбрасывает queue.Empty.
+        """
+        if timeout == 0:
+            return None, self._queue.get(block=False)
+        return None, self._queue.get(timeout=timeout)
+
+    def done(self, task_id):
+        self._queue.task_done()
+
+    def pending(self):
+        """
+        Количество URL в очереди и в обработке.
+        """
+        return self._queue.unfinished_tasks
+
+    def visit(self, url, leaf=False):
+        """
+        Отмечает URL посещенным (leaf - на последнем уровне). Возвращает False,
+        если он уже был посещен: на верхнем уровне, а для leaf - на любом.
+        """
+        key, leaf_key = visited_keys(url)
+        with self._visited_lock:
+            if leaf:
+                added = key not in self._visited and self._visited.add(leaf_key)
+                self._visited_urls += added
+                return added
+            added = self._visited.add(key)
+            if added and leaf_key not in self._visited:
+                self._visited_urls += 1
+            return added
+
+    def is_visited(self, url, leaf=False):
+        key, leaf_key = visited_keys(url)
+        with self._visited_lock:
+            return key in self._visited or (leaf and leaf_key in self._visited)
+
+    def visited_count(self):
+        return self._visited_urls
+
+    def add_feed(self, title, url):
+        self._feeds.append((title, url))
+
+    def feeds(self):
+        return list(self._feeds)
+
+    def deferred(self):
+        """
+        Сколько раз переполненная очередь отложила URL верхнего уровня (см. CompactQueue).
+        """
+        return self._queue.deferred
+
+    def close(self):
+        pass
+
+
+class SqliteFrontier:
+    """
+    Очередь обхода в файле SQLite с периодическим сохранением.
+
+    Изменения копятся в одной транзакции и фиксируются раз в CHECKPOINT_INTERVAL
+    секунд и при close(). После сбоя состояние откатывается к последней
+    контрольной точке; URL, которые в тот момент были в обработке, при
+    возобновлении возвращаются в очередь и снимаются с отметки "посещен".
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT NOT NULL,"
+            " depth INTEGER NOT NULL,"
+            " domain TEXT NOT NULL,"
+            " taken INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS queue_taken ON queue (taken, id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS visited (fingerprint INTEGER PRIMARY KEY,"
+                           " leaf INTEGER NOT NULL DEFAULT 0)")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(visited)")}
+        if "leaf" not in columns:
+            # Файл очереди от версии без отметки последнего уровня
+            self._conn.execute("ALTER TABLE visited ADD COLUMN leaf INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, url TEXT UNIQUE)"
+        )
+
+        if resume:
+            # URL, обработка которых прервалась, обрабатываем заново
+            taken = self._conn.execute("SELECT url FROM queue WHERE taken = 1").fetchall()
+            self._conn.executemany("DELETE FROM visited WHERE fingerprint = ?",
+                                   [(url_fingerprint(url_key(url)),) for url, in taken])
+            self._conn.execute("UPDATE queue SET taken = 0 WHERE taken = 1")
+        else:
+            for table in ("queue", "visited", "feeds"):
+                self._conn.execute(f"DELETE FROM {table}")
+
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+        self._visited = self._conn.execute("SELECT COUNT(*) FROM visited").fetchone()[0]
+        self._conn.execute("BEGIN")
+        self._last_checkpoint = time.monotonic()
+
+    def _maybe_checkpoint(self):
+        if time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        self._conn.execute("COMMIT")
+        self._conn.execute("BEGIN")
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint(self):
+        """
+        Принудительно сохраняет состояние на диск.
+        """
+        with self._lock:
+            self._checkpoint()
+
+    def put(self, url, depth, domain):
+        with self._lock:
+            self._conn.execute("INSERT INTO queue (url, depth, domain) VALUES (?, ?, ?)", (url, depth, domain))
+            self._pending += 1
+            self._maybe_checkpoint()
+            self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """
+        Возвращает (task_id, (url, depth, domain)) для самого старого URL очереди.
+        Если очередь пуста дольше timeout секунд (timeout=0 - не ждать), выбрасывает queue.Empty.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id, url, depth, domain FROM queue WHERE taken = 0 ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE queue SET taken = 1 WHERE id = ?", (row[0],))
+                    return row[0], (row[1], row[2], row[3])
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._not_empty.wait(remaining)
+
+    def done(self, task_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM queue WHERE id = ?", (task_id,))
+            self._pending -= 1
+            self._maybe_checkpoint()
+
+    def pending(self):
+        """
+        Количество URL в очереди и в обработке.
+        """
+        with self._lock:
+            return self._pending
+
+    def _visited_leaf(self, fingerprint):
+        """
+        None, если URL не посещен, иначе отметка leaf его посещения (1 - только на последнем уровне).
+        """
+        row = self._conn.execute("SELECT leaf FROM visited WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def visit(self, url, leaf=False):
+        """
+        Отмечает URL посещенным (leaf - на последнем уровне). Возвращает False,
+        если он уже был посещен: на верхнем уровне, а для leaf - на любом.
+        """
+        fingerprint = url_fingerprint(url_key(url))
+        with self._lock:
+            visited_leaf = self._visited_leaf(fingerprint)
+            if visited_leaf is None:
+                self._conn.execute("INSERT INTO visited (fingerprint, leaf) VALUES (?, ?)", (fingerprint, int(leaf)))
+                self._visited += 1
+                return True
+            if visited_leaf and not leaf:
+                # Повторная обработка страницы, уже посещенной на последнем уровне: URL тот же
+                self._conn.execute("UPDATE visited SET leaf = 0 WHERE fingerprint = ?", (fingerprint,))
+                return True
+            return False
+
+    def is_visited(self, url, leaf=False):
+        fingerprint = url_fingerprint(url_key(url))
+        with self._lock:
+            visited_leaf = self._visited_leaf(fingerprint)
+            return visited_leaf is not None and (leaf or not visited_leaf)
+
+    def visited_count(self):
+        with self._lock:
+            return self._visited
+
+    def add_feed(self, title, url):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO feeds (title, url) VALUES (?, ?)", (title, url))
+
+    def feeds(self):
+        """
+        Найденные фиды в порядке обнаружения (при возобновлении - включая прошлые запуски).
+        """
+        with self._lock:
+            return self._conn.execute("SELECT title, url FROM feeds ORDER BY id").fetchall()
+
+    def deferred(self):
+        """
+        Очередь на диске не переполняет память и выдается в порядке добавления.
+        """
+        return 0
+
+    def close(self):
+        with self._lock:
+            self._conn.execute("COMMIT")
+            self._conn.close()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Постоянный кэш фидов для повторных запусков verify_rss_feeds.
+
+Для каждого URL хранятся ETag, Last-Modified и уже разобранные даты записей
+фида. При следующем запуске запрос отправляется с If-None-Match/If-Modified-Since,
+и на ответ 304 фид оценивается по сохраненным датам без скачивания и разбора.
+Кэш лежит в одном файле SQLite; при превышении max_bytes вытесняются записи,
+к которым дольше всего не обращались.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class HttpCache:
+    """
+    Потокобезопасный кэш условных запросов поверх SQLite.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0          # Найдено записей в кэше (отправлен условный запрос)
+        self.not_modified = 0  # Получено ответов 304
+        self.bytes_saved = 0   # Байт тела фидов, которые не пришлось скачивать
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " entries TEXT NOT NULL,"
+            " body_size INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS feeds_accessed_at ON feeds (accessed_at)")
+
+    def get(self, url):
+        """
+        Возвращает словарь с полями etag, last_modified, entries, body_size
+        или None, если URL нет в кэше.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, entries, body_size FROM feeds WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE feeds SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        etag, last_modified, entries, body_size = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "entries": json.loads(entries),
+            "body_size": body_size,
+        }
+
+    def conditional_headers(self, cached):
+        """
+        Заголовки условного запроса для записи кэша.
+        """
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def record_not_modified(self, cached):
+        """
+        Учитывает ответ 304 для записи кэша в статистике.
+        """
+        with self._lock:
+            self.not_modified += 1
+            self.bytes_saved += cached["body_size"]
+
+    def put(self, url, etag, last_modified, entries, body_size):
+        """
+        Сохраняет валидаторы и разобранные даты записей фида.
+        Без ETag и Last-Modified сервер не ответит 304, поэтому такие фиды не кэшируются.
+        """
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified, entries, body_size, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(entries), body_size, time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        """
+        Удаляет самые давно использованные записи, пока кэш больше max_bytes.
+        Размер записи считается по длине URL и сериализованных данных.
+        """
+        size = self._conn.execute(
+            "SELECT COALESCE(SUM(length(url) + length(entries)"
+            " + COALESCE(length(etag), 0) + COALESCE(length(last_modified), 0)), 0) FROM feeds"
+        ).fetchone()[0]
+        if size <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT url, length(url) + length(entries)"
+            " + COALESCE(length(etag), 0) + COALESCE(length(last_modified), 0)"
+            " FROM feeds ORDER BY accessed_at"
+        )
+        stale = []
+        for url, row_size in rows:
+            if size <= self.max_bytes:
+                break
+            stale.append((url,))
+            size -= row_size
+        self._conn.executemany("DELETE FROM feeds WHERE url = ?", stale)
+
+    def summary(self):
+        """
+        Строка со статистикой кэша для итогового отчета.
+        """
+        return (f"Кэш: найдено в кэше {self.hits}, ответов 304: {self.not_modified}, "
+                f"сэкономлено {self.bytes_saved / 1024:.1f} КБ")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
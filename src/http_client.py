@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Общий HTTP-клиент с пулом соединений для rss_crawler и verify_rss_feeds.
+
+Модульный requests.get открывает новое TCP+TLS соединение на каждый запрос.
+Здесь одна потокобезопасная сессия requests на весь процесс: keep-alive
+соединения к каждому хосту держатся в пуле и переиспользуются всеми потоками,
+ошибки соединения и 5xx повторяются с экспоненциальной задержкой (Retry-After
+не учитывается: urllib3 ждал бы его целиком, сколько бы ни назначил сервер).
+Запросы, которые идут через планировщик вежливости (politeness.HostScheduler),
+отправляются через отдельную сессию (get(..., scheduled=True)): в ней повторяются
+только ошибки соединения, а 429/503 и Retry-After обрабатывает сам планировщик -
+иначе urllib3 повторял бы и ждал внутри слота хоста незаметно для него.
+Счетчики открытых и переиспользованных соединений доступны через stats().
+Если задан резолвер (set_resolver, см. dns_cache.py), адреса хостов для новых
+соединений берутся из его кэша, а не из getaddrinfo в каждом потоке.
+
+HTTP/2 requests/urllib3 не поддерживают, поэтому соединения - HTTP/1.1 keep-alive.
+"""
+
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.retry import Retry
+
+import metrics
+
+# ======= Параметры конфигурации =======
+POOL_CONNECTIONS = 100   # Количество хостов, для которых храним пулы соединений
+POOL_MAXSIZE = 10        # Максимум keep-alive соединений к одному хосту
+RETRIES = 2              # Количество повторов при ошибках соединения и ответах 5xx
+BACKOFF_FACTOR = 0.5     # Задержка между повторами: BACKOFF_FACTOR * 2 ** (номер повтора - 1)
+RETRY_STATUSES = (500, 502, 503, 504)  # Коды ответа, при которых запрос повторяется
+# =======================================
+
+_sessions = {}    # scheduled (bool) -> сессия
+_session_lock = threading.Lock()
+
+_stats = {"requests": 0, "connections_opened": 0}
+_stats_lock = threading.Lock()
+
+_resolver = None   # dns_cache.DnsResolver для новых соединений (None - системный getaddrinfo)
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def set_resolver(resolver):
+    """
+    Задает резолвер (объект с методом lookup(host) -> список адресов) для новых
+    соединений потокового клиента; None - разрешение имен средствами urllib3.
+    """
+    global _resolver
+    _resolver = resolver
+
+
+def _new_conn(conn, new_conn):
+    """
+    Открывает сокет соединения conn по адресам из резолвера, пробуя их по порядку,
+    как это делает socket.create_connection. Имя хоста для TLS (SNI, проверка
+    сертификата) остается прежним: подменяется только адрес подключения.
+    """
+    resolver = _resolver
+    if resolver is None:
+        return new_conn()
+    try:
+        addresses = resolver.lookup(conn.host)
+    except socket.gaierror as e:
+        raise NameResolutionError(conn.host, conn, e) from e
+    for i, address in enumerate(addresses):
+        conn._dns_host = address
+        try:
+            return new_conn()
+        except (NewConnectionError, ConnectTimeoutError):
+            if i == len(addresses) - 1:
+                raise
+
+
+class CountingHTTPConnection(HTTPConnection):
+    """
+    HTTP-соединение, которое учитывает каждое новое подключение к серверу.
+    """
+    def connect(self):
+        _count("connections_opened")
+        with metrics.stage("connect"):
+            super().connect()
+
+    def _new_conn(self):
+        return _new_conn(self, super()._new_conn)
+
+
+class CountingHTTPSConnection(HTTPSConnection):
+    """
+    HTTPS-соединение, которое учитывает каждое новое подключение (TCP + TLS).
+    """
+    def connect(self):
+        _count("connections_opened")
+        with metrics.stage("connect"):
+            super().connect()
+
+    def _new_conn(self):
+        return _new_conn(self, super()._new_conn)
+
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    """
+    Пул HTTP-соединений, который учитывает каждый отправленный запрос.
+    """
+    ConnectionCls = CountingHTTPConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """
+    Пул HTTPS-соединений, который учитывает каждый отправленный запрос.
+    """
+    ConnectionCls = CountingHTTPSConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    Адаптер requests, использующий пулы соединений со счетчиками.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+def create_session(scheduled=False):
+    """
+    Создает сессию requests с пулом соединений и политикой повторов из конфигурации.
+    scheduled=True - сессия для запросов через планировщик вежливости: повторяются
+    только ошибки соединения, ответы (в том числе 429/503) отдаются как есть.
+    """
+    if scheduled:
+        retry = Retry(
+            total=RETRIES,
+            connect=RETRIES,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=(),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+    else:
+        retry = Retry(
+            total=RETRIES,
+            connect=RETRIES,
+            read=RETRIES,
+            status=RETRIES,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            # urllib3 спит весь Retry-After без ограничения и вне таймаута запроса:
+            # Retry-After: 3600 занял бы воркер на час. Повторяем с обычной задержкой
+            respect_retry_after_header=False,
+            raise_on_status=False,  # Последний ответ отдаем как есть, raise_for_status решит сам
+        )
+    adapter = PooledAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(scheduled=False):
+    """
+    Возвращает общую для всех потоков сессию, создавая её при первом обращении.
+    scheduled - сессия для запросов через планировщик вежливости (см. create_session).
+    """
+    session = _sessions.get(scheduled)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(scheduled)
+            if session is None:
+                session = _sessions[scheduled] = create_session(scheduled)
+    return session
+
+
+def close_sessions():
+    """
+    Закрывает общие сессии и их соединения; следующий запрос откроет новые.
+    """
+    with _session_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get(url, scheduled=False, **kwargs):
+    """
+    Замена requests.get, работающая через общий пул соединений.
+    scheduled=True - запрос идет через слот планировщика вежливости, и 429/503
+    он обрабатывает сам (см. create_session).
+    """
+    return get_session(scheduled).get(url, **kwargs)
+
+
+def is_connect_error(error):
+    """
+    True, если до сервера не удалось даже подключиться: имя не разрешилось,
+    соединение отвергнуто или не установлено за таймаут подключения.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+def aiohttp_trace_config():
+    """
+    Возвращает aiohttp.TraceConfig, который ведет те же счетчики для асинхронного движка.
+    aiohttp импортируется здесь, чтобы модуль работал и без него.
+    """
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        _count("requests")
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        _count("connections_opened")
+        metrics.observe_stage("connect", time.perf_counter() - context.connect_start)
+
+    async def on_dns_resolvehost_start(session, context, params):
+        context.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        metrics.observe_stage("dns", time.perf_counter() - context.dns_start)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    return trace_config
+
+
+def stats():
+    """
+    Возвращает счетчики: отправлено запросов, открыто и переиспользовано соединений.
+    """
+    with _stats_lock:
+        requests_sent = _stats["requests"]
+        opened = _stats["connections_opened"]
+    return {
+        "requests": requests_sent,
+        "connections_opened": opened,
+        "connections_reused": max(requests_sent - opened, 0),
+    }
+
+
+def reset_stats():
+    """
+    Обнуляет счетчики соединений.
+    """
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+def format_stats():
+    """
+    Строка со счетчиками соединений для итогового отчета.
+    """
+    current = stats()
+    return (f"Запросов: {current['requests']}, открыто соединений: {current['connections_opened']}, "
+            f"переиспользовано: {current['connections_reused']}")
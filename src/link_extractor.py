@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Однопроходное извлечение ссылок из HTML без построения дерева.
+
+Замена BeautifulSoup(content, "html.parser") + двух find_all в process_url.
+Используется HTML-парсер lxml в режиме target: парсер вызывает start() на
+каждый открывающий тег, а DOM не создается вовсе, поэтому страница
+разбирается быстрее и не держит в памяти дерево целиком.
+Так же, XML-парсером в режиме target, разбираются карты сайта (sitemap).
+"""
+
+from lxml import etree
+
+FEED_LINK_TYPES = ("application/rss+xml", "application/atom+xml")
+
+
+class _LinkCollector:
+    """
+    Target для парсера lxml: собирает href из <link> с типом фида (RSS или Atom) и <a>.
+    """
+
+    def __init__(self):
+        self.feed_links = []
+        self.anchors = []
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            href = attrib.get("href")
+            if href:
+                self.anchors.append(href)
+        elif tag == "link" and attrib.get("type") in FEED_LINK_TYPES:
+            href = attrib.get("href")
+            if href:
+                self.feed_links.append(href)
+
+    def close(self):
+        return self.feed_links, self.anchors
+
+
+def extract_links(content):
+    """
+    Возвращает кортеж (feed_links, anchors) - значения href из
+    <link type="application/rss+xml"> (или atom+xml) и из <a> в порядке следования в документе.
+    Результат совпадает с find_all по дереву BeautifulSoup.
+    """
+    if not content:
+        return [], []
+    parser = etree.HTMLParser(target=_LinkCollector())
+    try:
+        parser.feed(content)
+    except ValueError:
+        # lxml не принимает str с объявлением кодировки - отдаем ему байты
+        parser = etree.HTMLParser(target=_LinkCollector(), encoding="utf-8")
+        parser.feed(content.encode("utf-8"))
+    try:
+        return parser.close()
+    except etree.XMLSyntaxError:
+        return [], []
+
+
+class _SitemapCollector:
+    """
+    Target для XML-парсера lxml: собирает <loc> из <urlset> или <sitemapindex>.
+    """
+
+    def __init__(self):
+        self.is_index = False
+        self.locs = []
+        self._in_loc = False
+        self._text = []
+
+    def start(self, tag, attrib):
+        name = tag.rsplit("}", 1)[-1]  # Пространство имен sitemaps.org не важно
+        if name == "sitemapindex":
+            self.is_index = True
+        elif name == "loc":
+            self._in_loc = True
+            self._text = []
+
+    def data(self, text):
+        if self._in_loc:
+            self._text.append(text)
+
+    def end(self, tag):
+        if self._in_loc and tag.rsplit("}", 1)[-1] == "loc":
+            self._in_loc = False
+            loc = "".join(self._text).strip()
+            if loc:
+                self.locs.append(loc)
+
+    def close(self):
+        return self.is_index, self.locs
+
+
+def extract_sitemap_locs(content):
+    """
+    Возвращает кортеж (is_index, locs): является ли документ индексом карт сайта
+    и адреса из его <loc>. Обрезанный или битый XML разбирается, насколько возможно.
+    """
+    if not content:
+        return False, []
+    collector = _SitemapCollector()
+    parser = etree.XMLParser(target=collector, recover=True)
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        parser.feed(data)
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    return collector.is_index, collector.locs
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Ограничение памяти, которую занимают тела ответов в обработке.
+
+Каждый воркер держит в памяти загруженную страницу, пока ее разбирает, так что
+пик памяти растет с числом воркеров и размером страниц. ByteBudget считает
+байты тел, удерживаемых задачами обхода, и не дает начать новую задачу, пока
+чужие задачи держат больше limit байт.
+
+Задача обхода (обработка одного URL) оборачивается в budget.task(): внутри нее
+content_sniffer.fetch и async_crawler.fetch перед запросом вызывают admit(),
+который резервирует средний размер уже прочитанных тел (иначе все воркеры
+прошли бы проверку разом, пока ничего не прочитано), а после чтения тела -
+hold(), заменяющий резерв настоящим размером. Текущая задача хранится
+в contextvars, поэтому учет работает и в потоках, и в корутинах.
+
+Ждет только задача, которая сейчас ничего не держит: загрузка, начатая, пока
+задача держит тело, идет без ожидания. Удерживаемые байты освобождаются по
+завершении задачи или раньше, через release() (страница, фид или карта сайта
+разобраны). После этого задача снова ничего не держит, и следующие ее загрузки
+(фиды из <link> и ссылок страницы) опять проходят admit() и могут ждать.
+Ожидающие задачи ничего не держат, поэтому не могут заблокировать друг друга.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import threading
+
+_current = contextvars.ContextVar("memory_budget_task", default=None)
+
+
+class ByteBudget:
+    """
+    Потокобезопасный счетчик байт тел ответов в обработке с лимитом limit
+    (0 или None - без ограничения, только учет).
+    """
+
+    def __init__(self, limit):
+        self.limit = limit or 0
+        self.held = 0         # Байт удерживают (или зарезервировали) задачи сейчас
+        self.peak = 0         # Наибольшее значение held
+        self.waits = 0        # Сколько раз задача ждала освобождения памяти
+        self._bodies = 0      # Прочитано тел и их суммарный размер - для резерва в admit()
+        self._body_bytes = 0
+        self._cond = threading.Condition()
+
+    def _over(self, own):
+        return self.limit and own == 0 and self.held >= self.limit
+
+    @contextlib.contextmanager
+    def task(self):
+        """
+        Задача обхода: байты, учтенные в ней через hold(), освобождаются по выходе.
+        """
+        token = _current.set((self, [0, 0]))   # [удерживает байт, из них резерв]
+        try:
+            yield
+        finally:
+            release()
+            _current.reset(token)
+
+    def _reserve(self, holding):
+        """
+        Резервирует за задачей средний размер тела. Вызывается под self._cond.
+        """
+        size = self._body_bytes // self._bodies if self._bodies else 0
+        holding[0] += size
+        holding[1] += size
+        self.held += size
+        self.peak = max(self.peak, self.held)
+
+    def _add(self, holding, size):
+        with self._cond:
+            self._bodies += 1
+            self._body_bytes += size
+            delta = size - holding[1]
+            holding[0] += delta
+            holding[1] = 0
+            self.held += delta
+            self.peak = max(self.peak, self.held)
+            if delta < 0:
+                self._cond.notify_all()
+
+    def _release(self, holding):
+        with self._cond:
+            if holding[0]:
+                self.held -= holding[0]
+                holding[0] = holding[1] = 0
+                self._cond.notify_all()
+
+
+def admit():
+    """
+    Ждет, пока другие задачи держат больше лимита байт (только если текущая ничего
+    не держит), и резервирует место под тело ответа.
+    """
+    budget, holding = _current.get() or (None, None)
+    if budget is None:
+        return
+    with budget._cond:
+        if budget._over(holding[0]):
+            budget.waits += 1
+            while budget._over(holding[0]):
+                budget._cond.wait()
+        if holding[0] == 0:
+            budget._reserve(holding)
+
+
+async def admit_async():
+    """
+    Асинхронный аналог admit(): корутина уступает цикл событий, пока лимит превышен.
+    """
+    budget, holding = _current.get() or (None, None)
+    if budget is None:
+        return
+    if budget._over(holding[0]):
+        budget.waits += 1
+        while budget._over(holding[0]):
+            await asyncio.sleep(0.01)
+    with budget._cond:
+        if holding[0] == 0:
+            budget._reserve(holding)
+
+
+def hold(size):
+    """
+    Учитывает size байт тела ответа за текущей задачей.
+    """
+    current = _current.get()
+    if current is not None:
+        current[0]._add(current[1], size)
+
+
+def release():
+    """
+    Освобождает байты текущей задачи (содержимое уже разобрано и не нужно).
+    """
+    current = _current.get()
+    if current is not None:
+        current[0]._release(current[1])
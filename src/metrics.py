@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Метрики и трассировка горячих путей rss_crawler и verify_rss_feeds.
+
+Счетчики, значения (gauge) и гистограммы времени собираются в памяти процесса
+без внешних зависимостей и выгружаются в текстовом формате Prometheus или
+в JSON: по завершении скрипта в METRICS_FILE, а у демона - через /metrics.
+
+Что собирается:
+- stage_seconds{stage} - время этапов: connect (у потокового движка вместе
+  с DNS), dns (asyncio, а у потокового - при кэше dns_cache), request (до заголовков ответа), download (тело),
+  parse_links, parse_title, parse_sitemap, parse_feed;
+- downloaded_bytes_total, aborted_responses_total, truncated_responses_total;
+- responses_total{code} и errors_total{stage, type};
+- in_flight_requests, in_flight_bytes, queue_depth{pool}, workers{pool}, busy_workers{pool}
+  и worker_busy_seconds_total{pool} - по ним считается загрузка воркеров.
+
+Если задан TRACE_FILE, для каждого обработанного URL туда дописывается строка
+JSON Lines: URL, вид обработки, время этапов, код ответа и ошибка.
+Трасса привязана к contextvars, поэтому работает и в потоках, и в корутинах.
+"""
+
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+# ======= Параметры конфигурации =======
+ENABLED = True        # Собирать метрики (False - все вызовы ничего не делают)
+METRICS_FILE = None   # Куда сохранить метрики по завершении: *.json или *.prom (None - не сохранять)
+TRACE_FILE = None     # Журнал обработки каждого URL в формате JSON Lines (None - не вести)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Границы гистограмм, секунд
+# =======================================
+
+PREFIX = "rss_feed_finder_"
+
+# Известные метрики: имя -> (тип, описание)
+METRICS = {
+    "stage_seconds": ("histogram", "Время этапов обработки, секунд"),
+    "downloaded_bytes_total": ("counter", "Прочитано байт тела ответов"),
+    "aborted_responses_total": ("counter", "Ответов, оборванных после определения типа"),
+    "truncated_responses_total": ("counter", "Ответов, обрезанных по MAX_BODY_BYTES"),
+    "responses_total": ("counter", "Ответов по кодам статуса"),
+    "errors_total": ("counter", "Исключений по этапу и типу"),
+    "in_flight_requests": ("gauge", "Запросов в обработке"),
+    "in_flight_bytes": ("gauge", "Байт тел ответов, которые держат воркеры обхода"),
+    "queue_depth": ("gauge", "Задач в очереди и в обработке"),
+    "workers": ("gauge", "Размер пула воркеров"),
+    "busy_workers": ("gauge", "Воркеров, занятых задачей"),
+    "worker_busy_seconds_total": ("counter", "Суммарное время работы воркеров над задачами, секунд"),
+}
+
+_lock = threading.Lock()
+_values = {}       # (имя, метки) -> число для счетчиков и gauge
+_histograms = {}   # (имя, метки) -> [счетчики корзин..., +Inf, сумма]
+_callbacks = {}    # (имя, метки) -> список функций, значение gauge - сумма их значений при выгрузке
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+_trace_file = None
+_trace_lock = threading.Lock()
+
+
+def _key(name, labels):
+    if name not in METRICS:
+        raise KeyError(f"Неизвестная метрика: {name}")
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def count(name, value=1, **labels):
+    """
+    Увеличивает счетчик.
+    """
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def gauge_add(name, delta, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + delta
+
+
+def gauge_set(name, value, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = value
+
+
+def register_gauge(name, func, **labels):
+    """
+    Gauge, значение которого вычисляет func() в момент выгрузки (например, длина очереди).
+    Если под тем же именем и метками зарегистрировано несколько функций (например,
+    одновременные задания обхода в демоне), значение gauge - их сумма.
+    """
+    key = _key(name, labels)
+    with _lock:
+        _callbacks.setdefault(key, []).append(func)
+
+
+def unregister_gauge(name, func=None, **labels):
+    """
+    Снимает функцию func gauge (None - все функции под этим именем и метками).
+    """
+    key = _key(name, labels)
+    with _lock:
+        funcs = _callbacks.get(key, [])
+        if func is not None and func in funcs:
+            funcs.remove(func)
+        if func is None or not funcs:
+            _callbacks.pop(key, None)
+
+
+def observe(name, value, **labels):
+    """
+    Добавляет наблюдение в гистограмму.
+    """
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        buckets = _histograms.get(key)
+        if buckets is None:
+            buckets = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[len(BUCKETS)] += 1
+        buckets[-1] += value
+
+
+def observe_stage(stage, seconds):
+    """
+    Учитывает время этапа в гистограмме и в трассе текущего URL.
+    """
+    observe("stage_seconds", seconds, stage=stage)
+    record = _trace.get()
+    if record is not None:
+        stages = record["stages"]
+        stages[stage] = round(stages.get(stage, 0.0) + seconds, 6)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Замеряет время блока как этап name.
+    """
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def request():
+    """
+    Учитывает запрос в in_flight_requests на время блока.
+    """
+    gauge_add("in_flight_requests", 1)
+    try:
+        yield
+    finally:
+        gauge_add("in_flight_requests", -1)
+
+
+@contextlib.contextmanager
+def busy(pool):
+    """
+    Отмечает воркер пула pool занятым на время блока.
+    """
+    if not ENABLED:
+        yield
+        return
+    gauge_add("busy_workers", 1, pool=pool)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        count("worker_busy_seconds_total", time.perf_counter() - start, pool=pool)
+        gauge_add("busy_workers", -1, pool=pool)
+
+
+def record_status(code):
+    """
+    Учитывает код ответа в счетчике и в трассе текущего URL.
+    """
+    count("responses_total", code=code)
+    record = _trace.get()
+    if record is not None:
+        record["status"] = code
+
+
+def record_error(stage_name, error):
+    """
+    Учитывает исключение в счетчике и в трассе текущего URL.
+    """
+    count("errors_total", stage=stage_name, type=type(error).__name__)
+    record = _trace.get()
+    if record is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+
+
+@contextlib.contextmanager
+def trace(url, kind):
+    """
+    Трасса обработки одного URL: этапы внутри блока попадают в одну строку TRACE_FILE.
+    Без TRACE_FILE ничего не делает.
+    """
+    if not TRACE_FILE:
+        yield
+        return
+    record = {"url": url, "kind": kind, "start": time.time(), "stages": {}, "status": None, "error": None}
+    token = _trace.set(record)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace.reset(token)
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        _write_trace(record)
+
+
+def _write_trace(record):
+    global _trace_file
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _trace_lock:
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, "a", encoding="utf-8")
+        _trace_file.write(line)
+
+
+def _current():
+    """
+    Копия всех значений: (значения, гистограммы), gauge-функции уже вычислены.
+    """
+    with _lock:
+        values = dict(_values)
+        histograms = {key: list(buckets) for key, buckets in _histograms.items()}
+        callbacks = list(_callbacks.items())
+    for key, funcs in callbacks:
+        try:
+            values[key] = sum(func() for func in list(funcs))
+        except Exception:
+            pass
+    return values, histograms
+
+
+def snapshot():
+    """
+    Все метрики в виде словаря для JSON.
+    """
+    values, histograms = _current()
+    result = {}
+    for (name, labels), value in sorted(values.items()):
+        result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+    for (name, labels), buckets in sorted(histograms.items()):
+        cumulative, total = [], 0
+        for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+            total += bucket
+            cumulative.append(["+Inf" if bound == float("inf") else bound, total])
+        result.setdefault(name, []).append({
+            "labels": dict(labels), "count": total, "sum": round(buckets[-1], 6), "buckets": cumulative,
+        })
+    return result
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text():
+    """
+    Все метрики в текстовом формате Prometheus (version 0.0.4).
+    """
+    values, histograms = _current()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = [(labels, value) for (n, labels), value in sorted(values.items()) if n == name]
+        hists = [(labels, buckets) for (n, labels), buckets in sorted(histograms.items()) if n == name]
+        if not series and not hists:
+            continue
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for labels, value in series:
+            lines.append(f"{PREFIX}{name}{_format_labels(labels)} {value}")
+        for labels, buckets in hists:
+            total = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+                total += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, [('le', le)])} {total}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {buckets[-1]}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {total}")
+    return "\n".join(lines) + "\n"
+
+
+def write(path=None):
+    """
+    Сохраняет метрики в path (по умолчанию METRICS_FILE): JSON, если имя оканчивается
+    на .json, иначе текст Prometheus (например, для node_exporter textfile).
+    """
+    path = path or METRICS_FILE
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            json.dump(snapshot(), f, ensure_ascii=False, indent=1)
+        else:
+            f.write(prometheus_text())
+
+
+def _quantile(buckets, q):
+    """
+    Верхняя граница корзины гистограммы, в которую попадает квантиль q.
+    """
+    total = sum(buckets[:-1])
+    running = 0
+    for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+        running += bucket
+        if running >= q * total:
+            return bound
+    return float("inf")
+
+
+def format_stats(elapsed=None):
+    """
+    Строки итогового отчета: время этапов, коды ответов, ошибки и загрузка воркеров
+    (если передано общее время работы elapsed, секунд).
+    """
+    values, histograms = _current()
+    lines = []
+    stages = sorted(((dict(labels)["stage"], buckets) for (name, labels), buckets in histograms.items()
+                     if name == "stage_seconds"), key=lambda item: -item[1][-1])
+    if stages:
+        lines.append("Время этапов (число, среднее, p95 не больше, всего):")
+        for stage_name, buckets in stages:
+            n = sum(buckets[:-1])
+            p95 = _quantile(buckets, 0.95)
+            p95_text = f"{p95 * 1000:.1f} мс" if p95 != float("inf") else f"> {BUCKETS[-1]:.0f} с"
+            lines.append(f"  {stage_name:<14}{n:>8}  {buckets[-1] / n * 1000:>9.1f} мс  {p95_text:>10}  "
+                         f"{buckets[-1]:>8.1f} с")
+    statuses = sorted((dict(labels)["code"], value) for (name, labels), value in values.items()
+                      if name == "responses_total")
+    if statuses:
+        lines.append("Ответы по кодам: " + ", ".join(f"{code}: {value}" for code, value in statuses))
+    errors = sorted(((dict(labels)["stage"], dict(labels)["type"]), value) for (name, labels), value in values.items()
+                    if name == "errors_total")
+    if errors:
+        lines.append("Ошибки: " + ", ".join(f"{stage_name}/{kind}: {value}" for (stage_name, kind), value in errors))
+    if elapsed:
+        for (name, labels), size in sorted(values.items()):
+            if name != "workers" or not size:
+                continue
+            busy_seconds = values.get(("worker_busy_seconds_total", labels), 0)
+            pool = dict(labels)["pool"]
+            lines.append(f"Загрузка воркеров {pool}: {busy_seconds / (size * elapsed) * 100:.0f}% "
+                         f"(воркеров: {size})")
+    return "\n".join(lines)
+
+
+def reset():
+    """
+    Обнуляет все метрики (gauge-функции остаются зарегистрированными).
+    """
+    with _lock:
+        _values.clear()
+        _histograms.clear()
+
+
+def close():
+    """
+    Закрывает журнал трассировки.
+    """
+    global _trace_file
+    with _trace_lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Пул процессов для разбора HTML и XML.
+
+Загрузка страниц и фидов остается в потоках (или asyncio), а CPU-работа -
+извлечение ссылок, названий фидов, разбор feedparser - отправляется в пул
+процессов, чтобы не упираться в GIL. Задачи из всех потоков собираются в пачки
+до BATCH_SIZE штук (или пока не пройдет BATCH_WAIT секунд) и уходят в процесс
+одним вызовом, так что накладные расходы на передачу между процессами
+делятся на всю пачку.
+
+Пока пул не запущен через start(), run() выполняет функцию в текущем потоке.
+Вызовы start() и shutdown() парные и могут вкладываться (например, задания
+демона поверх пула, запущенного при старте демона): пул останавливается
+последним shutdown().
+"""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+import queue
+import threading
+import time
+
+# ======= Параметры конфигурации =======
+BATCH_SIZE = 32      # Максимум задач в одной пачке
+BATCH_WAIT = 0.005   # Сколько ждать добора пачки, секунд
+# =======================================
+
+_dispatcher = None
+_users = 0                 # Сколько вызовов start() еще не закрыто shutdown()
+_lock = threading.Lock()
+
+
+def _run_batch(calls):
+    """
+    Выполняется в дочернем процессе: вызывает функции пачки по очереди.
+    Возвращает список пар (ok, result или исключение).
+    """
+    results = []
+    for func, arg in calls:
+        try:
+            results.append((True, func(arg)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class BatchDispatcher:
+    """
+    Собирает задачи из разных потоков в пачки и отправляет их в ProcessPoolExecutor.
+    """
+
+    def __init__(self, processes, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        # spawn вместо fork: форк многопоточного процесса может унаследовать захваченные блокировки
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def submit(self, func, arg):
+        """
+        Ставит вызов func(arg) в очередь. Возвращает concurrent.futures.Future.
+        """
+        future = concurrent.futures.Future()
+        self._queue.put((func, arg, future))
+        return future
+
+    def _collect(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        futures = [future for _, _, future in batch]
+        try:
+            pending = self._executor.submit(_run_batch, [(func, arg) for func, arg, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def distribute(done):
+            try:
+                results = done.result()
+            except Exception as e:
+                # Процесс пула упал или аргументы не сериализуются
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, (ok, value) in zip(futures, results):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+        pending.add_done_callback(distribute)
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+
+def start(processes):
+    """
+    Запускает пул из processes процессов. При processes <= 1 разбор
+    остается в вызывающих потоках, как раньше.
+    """
+    global _dispatcher, _users
+    with _lock:
+        _users += 1
+        if _dispatcher is None and processes and processes > 1:
+            _dispatcher = BatchDispatcher(processes)
+
+
+def shutdown():
+    """
+    Останавливает пул, дождавшись уже отправленных задач, если это последний
+    незакрытый start().
+    """
+    global _dispatcher, _users
+    with _lock:
+        _users = max(0, _users - 1)
+        if _users or _dispatcher is None:
+            return
+        dispatcher, _dispatcher = _dispatcher, None
+    dispatcher.shutdown()
+
+
+def run(func, arg):
+    """
+    Выполняет func(arg) в пуле процессов и ждет результат.
+    func должна быть функцией верхнего уровня модуля, чтобы её можно было передать в процесс.
+    """
+    if _dispatcher is None:
+        return func(arg)
+    return _dispatcher.submit(func, arg).result()
+
+
+async def run_async(func, arg):
+    """
+    Асинхронный вариант run() для движка asyncio: цикл событий не блокируется на разборе.
+    """
+    if _dispatcher is None:
+        return func(arg)
+    return await asyncio.wrap_future(_dispatcher.submit(func, arg))
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Планировщик вежливости: ограничение частоты и параллельности запросов к каждому хосту.
+
+Вместо фиксированной паузы после каждого URL у каждого хоста свой token bucket
+и лимит одновременных запросов. Частота подстраивается по схеме AIMD: растет
+на RATE_INCREASE после каждого успешного ответа и падает вдвое на 429/503,
+при этом выдерживается пауза из Retry-After (или экспоненциальная, если
+заголовка нет). Crawl-delay из robots.txt ограничивает частоту сверху.
+
+Один планировщик обслуживает и потоки (slot), и asyncio (slot_async).
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# ======= Параметры конфигурации =======
+HOST_RATE = 10.0          # Начальная частота запросов к одному хосту, в секунду
+HOST_MAX_RATE = 100.0     # Максимальная частота запросов к одному хосту
+HOST_MIN_RATE = 0.2       # Минимальная частота после снижений из-за 429/503
+RATE_INCREASE = 1.0       # Прибавка к частоте после каждого успешного ответа
+HOST_BURST = 5            # Сколько запросов можно отправить подряд без паузы
+HOST_CONCURRENCY = 32     # Максимум одновременных запросов к одному хосту
+BACKOFF_BASE = 1.0        # Пауза после первого 429/503 без Retry-After, секунд
+MAX_BACKOFF = 300.0       # Максимальная пауза, секунд
+RESPECT_CRAWL_DELAY = True  # Учитывать Crawl-delay из robots.txt
+# =======================================
+
+THROTTLE_STATUSES = (429, 503)
+_POLL_INTERVAL = 0.01  # Как часто проверять освобождение слота, секунд
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value):
+    """
+    Retry-After в секундах: число секунд или HTTP-дата. None, если заголовка нет или он некорректен.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_crawl_delay(robots_text):
+    """
+    Crawl-delay для User-agent: * из содержимого robots.txt, либо None.
+    """
+    applies = False
+    in_agents = False
+    for line in robots_text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+        if field == "user-agent":
+            # Подряд идущие User-agent образуют одну группу
+            applies = (applies and in_agents) or value == "*"
+            in_agents = True
+            continue
+        in_agents = False
+        if applies and field == "crawl-delay":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
+
+
+class _HostState:
+    __slots__ = ("rate", "tokens", "updated", "in_flight", "backoff_until",
+                 "failures", "crawl_delay", "robots_checked")
+
+    def __init__(self):
+        self.rate = HOST_RATE
+        self.tokens = float(HOST_BURST)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.crawl_delay = None
+        self.robots_checked = False
+
+
+class HostScheduler:
+    """
+    Потокобезопасный планировщик запросов по хостам.
+
+    robots_fetcher(url) -> str или None загружает robots.txt для потокового движка,
+    robots_fetcher_async - то же для asyncio. Если загрузчик не задан, robots.txt не читается.
+    """
+
+    def __init__(self, robots_fetcher=None, robots_fetcher_async=None):
+        self.robots_fetcher = robots_fetcher
+        self.robots_fetcher_async = robots_fetcher_async
+        self.throttled = 0   # Получено ответов 429/503
+        self.waited = 0.0    # Суммарное время ожидания слотов, секунд
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def _effective_rate(self, state):
+        if state.crawl_delay:
+            return min(state.rate, 1.0 / state.crawl_delay)
+        return state.rate
+
+    def _try_acquire(self, host):
+        """
+        Пытается занять слот. Возвращает 0, если слот занят, иначе сколько секунд подождать.
+        """
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            if now < state.backoff_until:
+                return state.backoff_until - now
+            if state.in_flight >= HOST_CONCURRENCY:
+                return _POLL_INTERVAL
+            rate = self._effective_rate(state)
+            burst = 1 if state.crawl_delay else HOST_BURST
+            state.tokens = min(burst, state.tokens + (now - state.updated) * rate)
+            state.updated = now
+            if state.tokens >= 1:
+                state.tokens -= 1
+                state.in_flight += 1
+                return 0
+            return (1 - state.tokens) / rate
+
+    def _release(self, host):
+        with self._lock:
+            self._hosts[host].in_flight -= 1
+
+    def _needs_robots(self, host):
+        if not RESPECT_CRAWL_DELAY:
+            return False
+        with self._lock:
+            state = self._state(host)
+            if state.robots_checked:
+                return False
+            state.robots_checked = True
+            return True
+
+    def take_robots(self, url):
+        """
+        Для кода, который сам загружает robots.txt (поиск фидов по известным адресам):
+        возвращает True, если планировщик его еще не загружал. Тогда планировщик
+        больше не будет загружать robots.txt хоста, а результат нужно передать в set_robots().
+        """
+        return self._needs_robots(host_of(url))
+
+    def set_robots(self, host, robots_text):
+        """
+        Применяет Crawl-delay из содержимого robots.txt хоста.
+        """
+        delay = parse_crawl_delay(robots_text or "")
+        with self._lock:
+            self._state(host).crawl_delay = delay
+
+    @contextlib.contextmanager
+    def slot(self, url):
+        """
+        Блокирует поток, пока к хосту URL нельзя отправить запрос, и держит слот до выхода из блока.
+        """
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        if self.robots_fetcher and self._needs_robots(host):
+            self.set_robots(host, self.robots_fetcher(f"{parts.scheme}://{parts.netloc}/robots.txt"))
+        while True:
+            wait = self._try_acquire(host)
+            if wait == 0:
+                break
+            with self._lock:
+                self.waited += wait
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, url):
+        """
+        Асинхронный вариант slot(): ожидание не блокирует цикл событий.
+        """
+        parts = urlsplit(url)
+        host = parts.netloc.lower()
+        if self.robots_fetcher_async and self._needs_robots(host):
+            self.set_robots(host, await self.robots_fetcher_async(f"{parts.scheme}://{parts.netloc}/robots.txt"))
+        while True:
+            wait = self._try_acquire(host)
+            if wait == 0:
+                break
+            with self._lock:
+                self.waited += wait
+            await asyncio.sleep(wait)
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def report(self, url, status, retry_after=None):
+        """
+        Учитывает ответ хоста: на 429/503 снижает частоту и назначает паузу,
+        на успешный ответ плавно повышает частоту.
+        Возвращает True, если запрос стоит повторить после паузы.
+        """
+        host = host_of(url)
+        with self._lock:
+            state = self._state(host)
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                state.failures += 1
+                delay = parse_retry_after(retry_after)
+                if delay is None:
+                    delay = BACKOFF_BASE * 2 ** (state.failures - 1)
+                state.backoff_until = time.monotonic() + min(delay, MAX_BACKOFF)
+                state.rate = max(HOST_MIN_RATE, state.rate / 2)
+                state.tokens = 0.0
+                return True
+            if status < 400:
+                state.failures = 0
+                state.rate = min(HOST_MAX_RATE, state.rate + RATE_INCREASE)
+            return False
+
+    def format_stats(self):
+        """
+        Строка со статистикой планировщика для итогового отчета.
+        """
+        return f"Ответов 429/503: {self.throttled}, ожидание слотов: {self.waited:.1f} с (суммарно по воркерам)"
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Вывод в консоль из воркеров без блокировок и без записи в терминал.
+
+Воркеры не пишут в терминал сами: say() только кладет строку в очередь
+(queue.SimpleQueue, реализована на C и не берет блокировок уровня Python),
+а выделенный поток раз в REPORT_INTERVAL секунд выводит накопившиеся строки
+одной записью. За интервал выводится не больше MAX_LINES строк хода работы
+(say: "Обход: ...", пропущенные URL), остальные сводятся в строку
+"... пропущено N сообщений", так что медленный терминал не тормозит воркеры,
+а очередь не растет больше чем на интервал. Строки результатов (result:
+найденные фиды, итоги сайтов и проверки) выводятся всегда: их немного,
+и ради них запускают программу.
+
+В тихом режиме (QUIET) построчный вывод отключен: say() сразу возвращается,
+а поток раз в STATUS_INTERVAL секунд печатает строку состояния, если при
+запуске передана функция status.
+
+Пока поток не запущен через start() (или при BACKGROUND = False), say()
+печатает строку сразу под блокировкой, как делали воркеры раньше. Вызовы
+start() и stop() парные и могут вкладываться, как у parse_pool.
+"""
+
+import queue
+import sys
+import threading
+import time
+
+# ======= Параметры конфигурации =======
+QUIET = False            # Тихий режим: без построчного вывода, только строка состояния
+REPORT_INTERVAL = 0.2    # Как часто выводить накопившиеся строки, секунд
+MAX_LINES = 100          # Сколько строк хода работы выводить за интервал, остальные пропускаются (результаты - всегда)
+STATUS_INTERVAL = 5.0    # Как часто печатать строку состояния в тихом режиме, секунд
+BACKGROUND = True        # Выводить из отдельного потока (False - сразу из вызывающего потока)
+# =======================================
+
+_queue = queue.SimpleQueue()
+_thread = None
+_stop = threading.Event()
+_status = None
+_users = 0                 # Сколько вызовов start() еще не закрыто stop()
+_lock = threading.Lock()   # Только для start()/stop()
+_print_lock = threading.Lock()
+dropped = 0                # Сколько строк пропущено из-за MAX_LINES
+
+
+def say(line, is_result=False):
+    """
+    Выводит строку: в тихом режиме - никуда, при запущенном потоке - через очередь.
+    Строку хода работы поток может пропустить (MAX_LINES), результат (is_result) - нет.
+    """
+    if QUIET:
+        return
+    if _thread is None:
+        with _print_lock:
+            print(line)
+        return
+    _queue.put((line, is_result))
+
+
+def result(line):
+    """
+    Выводит строку результата: в отличие от say(), она не пропускается по MAX_LINES.
+    """
+    say(line, is_result=True)
+
+
+def _flush():
+    global dropped
+    lines = []
+    progress = skipped = 0
+    try:
+        while True:
+            line, is_result = _queue.get_nowait()
+            if is_result:
+                lines.append(line)
+            elif progress < MAX_LINES:
+                lines.append(line)
+                progress += 1
+            else:
+                skipped += 1
+    except queue.Empty:
+        pass
+    if skipped:
+        dropped += skipped
+        lines.append(f"... пропущено {skipped} сообщений")
+    if not lines:
+        return
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def _run():
+    next_status = time.monotonic() + STATUS_INTERVAL
+    while not _stop.wait(REPORT_INTERVAL):
+        _flush()
+        if QUIET and _status and time.monotonic() >= next_status:
+            next_status = time.monotonic() + STATUS_INTERVAL
+            try:
+                sys.stdout.write(_status() + "\n")
+                sys.stdout.flush()
+            except Exception:
+                pass
+    _flush()
+
+
+def start(status=None):
+    """
+    Запускает поток вывода. status - функция без аргументов, возвращающая
+    строку состояния для тихого режима.
+    """
+    global _thread, _status, _users
+    with _lock:
+        _users += 1
+        if status is not None:
+            _status = status
+        if _thread is None and BACKGROUND:
+            _stop.clear()
+            _thread = threading.Thread(target=_run, daemon=True)
+            _thread.start()
+
+
+def stop():
+    """
+    Выводит оставшиеся строки и останавливает поток после последнего stop().
+    """
+    global _thread, _status, _users
+    with _lock:
+        if _users == 0:
+            return
+        _users -= 1
+        if _users or _thread is None:
+            return
+        _stop.set()
+        _thread.join()
+        _thread = None
+        _status = None
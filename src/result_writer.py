@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Потоковая запись результатов в CSV или JSON Lines.
+
+Каждая строка результата дописывается в файл сразу, как только получена,
+а на диск сбрасывается пачками (раз в FLUSH_ROWS строк или FLUSH_INTERVAL
+секунд), поэтому память не растет с размером входных данных. Запись идет во
+временный файл <имя>.part, который по завершении атомарно переименовывается
+в итоговый: читатель никогда не видит наполовину записанный файл, а после
+сбоя в .part остается все, что успело сброситься на диск.
+
+Формат выбирается по расширению: .jsonl - JSON Lines, иначе CSV.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+
+# ======= Параметры конфигурации =======
+FLUSH_ROWS = 500        # Сбрасывать на диск каждые N строк
+FLUSH_INTERVAL = 5.0    # ...или не реже, чем раз в N секунд
+# =======================================
+
+PART_SUFFIX = ".part"
+
+
+def is_jsonl(path):
+    return path.lower().endswith((".jsonl", ".ndjson"))
+
+
+class ResultWriter:
+    """
+    Потокобезопасный построчный писатель результатов.
+
+    fields - ключи записей JSON Lines, header - заголовок CSV (по умолчанию fields).
+    Использование: with ResultWriter(path, fields, header) as writer: writer.write(row).
+    """
+
+    def __init__(self, path, fields, header=None):
+        self.path = path
+        self.fields = list(fields)
+        self.jsonl = is_jsonl(path)
+        self.count = 0   # Записано строк
+        self._part_path = path + PART_SUFFIX
+        self._file = open(self._part_path, "w", newline="", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        if not self.jsonl:
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(header or self.fields)
+
+    def write(self, row):
+        """
+        Дописывает строку: последовательность значений в порядке fields.
+        """
+        with self._lock:
+            if self.jsonl:
+                self._file.write(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) + "\n")
+            else:
+                self._csv.writerow(row)
+            self.count += 1
+            self._unflushed += 1
+            if self._unflushed >= FLUSH_ROWS or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        Сбрасывает остаток на диск и атомарно заменяет итоговый файл временным.
+        """
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._part_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Даже при ошибке или Ctrl+C сохраняем то, что успели получить
+        self.close()
+
+
+def iter_rows(path):
+    """
+    Лениво читает строки результатов из CSV (без заголовка) или JSON Lines.
+    Для JSON Lines возвращает словари, для CSV - списки значений.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if is_jsonl(path):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            reader = csv.reader(f)
+            next(reader, None)  # Пропускаем заголовок
+            yield from reader
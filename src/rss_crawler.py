@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
 from urllib.parse import urljoin, urlparse
 import warnings
@@ -6,9 +5,27 @@ import time
 import concurrent.futures
 import queue
 import threading
-import csv
 import os
 import signal
+import argparse
+import asyncio
+import contextlib
+from collections import deque
+
+import http_client
+import content_sniffer
+import metrics
+import parse_pool
+import memory_budget
+import reporter
+import feed_probe
+from politeness import HostScheduler, host_of
+from link_extractor import extract_links, extract_sitemap_locs
+from frontier import MemoryFrontier, SqliteFrontier
+from url_normalizer import canonical_link, normalize_url
+from url_filter import UrlFilter, REASONS
+from feed_fingerprint import feed_alias_key, feed_fingerprint
+from result_writer import ResultWriter
 
 # ======= Параметры конфигурации =======
 START_URL = "https://www.lne.es"  # Задайте здесь нужный URL
@@ -16,54 +33,57 @@ MAX_DEPTH = 2                     # Глубина обхода сайта (мо
 MAX_FEEDS = 200                   # Максимальное количество RSS-ссылок
 BLOCKED_WORDS = ["tag"]          # Список запрещенных слов в URL (например, ["tag", "category"])
 WORKERS = 6                      # Количество параллельных обработчиков
-CSV_FILE = "rss_feeds.csv"       # Имя файла для сохранения результатов
+CSV_FILE = "rss_feeds.csv"       # Файл результатов (.csv или .jsonl - JSON Lines), пишется по мере нахождения
+ENGINE = "threads"               # Движок обхода: "threads" (потоки) или "async" (asyncio + aiohttp)
+ASYNC_CONCURRENCY = 200          # Количество одновременных запросов для движка "async"
+PARSE_PROCESSES = os.cpu_count() or 1  # Процессов для разбора HTML/XML (1 - разбор в потоках воркеров)
+FRONTIER_FILE = None             # Файл SQLite для очереди обхода (None - очередь в памяти, без --resume)
+VISITED_STORE = "fingerprints"   # Хранение посещенных URL в памяти: "fingerprints" (64-бит) или "bloom"
+BLOOM_ERROR_RATE = 0.001         # Допустимая доля ложных срабатываний фильтра Блума
+POLITENESS = True                # Ограничивать частоту запросов к каждому хосту (см. politeness.py)
+MAX_ACTIVE_SITES = 50            # Пакетный режим (--sites): сколько сайтов обходить одновременно
+DISCOVERY = "probe+crawl"        # "probe+crawl" - сначала известные адреса фидов (см. feed_probe.py), затем
+                                 # обход ссылок; "probe" - обход ссылок, только если известные адреса дали
+                                 # неполный результат (см. SiteCrawl.probe_complete); "crawl" - только обход
+MAX_IN_FLIGHT_BYTES = 64 * 1024 * 1024  # Сколько байт тел ответов могут держать воркеры одновременно (0 - без ограничения)
+MAX_FRONTIER = 100000            # Пока в очереди сайта больше URL, сначала обходятся страницы последних уровней (0 - строго по уровням)
+DEDUP_FEEDS = True               # Не сохранять фид, если его содержимое уже найдено по другому URL (см. feed_fingerprint.py)
 # =======================================
 
 # Отключаем предупреждения по использованию HTML-парсера для XML, если возникнут
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
+PROBE = "probe"  # task_id проверок по известным адресам: они идут мимо очереди frontier
+
 GREEN = "\033[92m"
 RESET = "\033[0m"
 CHECK_MARK = "\u2714"
 
-# Глобальные переменные для многопоточной работы
-FOUND_FEEDS = []  # Список найденных фидов: [(title, url), ...]
-url_queue = queue.Queue()   # Очередь URL для обработки
-visited = set()             # Множество посещенных URL
-found_feed_urls = set()     # Множество URL найденных фидов для проверки дубликатов
-skipped_duplicates = 0      # Счетчик пропущенных дубликатов
-found_feeds_lock = threading.Lock()  # Блокировка для безопасного обновления FOUND_FEEDS
-visited_lock = threading.Lock()      # Блокировка для безопасного обновления visited
-print_lock = threading.Lock()        # Блокировка для безопасного вывода в консоль
-exit_flag = threading.Event()        # Флаг для сигнала о завершении работы всем потокам
-
-def is_url_blocked(url):
+def fetch_robots(url):
     """
-    Проверяет, содержит ли URL запрещенные слова из списка BLOCKED_WORDS
+    Загружает robots.txt для планировщика вежливости. None, если файла нет.
     """
-    if not BLOCKED_WORDS:  # Если список пуст, ничего не блокируем
-        return False
-    
-    for word in BLOCKED_WORDS:
-        if word.lower() in url.lower():
-            print(f"URL проигнорирован (содержит '{word}'): {url}")
-            return True
-    return False
+    try:
+        response = http_client.get(url, timeout=10)
+        return response.text if response.status_code == 200 else None
+    except Exception:
+        return None
 
 def is_rss_content(content):
     """
-    Простейшая проверка: если контент начинается с XML-пролога и содержит тег <rss>.
+    Проверяет по началу содержимого, что это фид (RSS, Atom или RDF).
     """
-    return content.strip().startswith("<?xml") and "<rss" in content
+    return content_sniffer.classify(content[:content_sniffer.SNIFF_BYTES]) in content_sniffer.FEED_KINDS
 
 def extract_feed_title(content):
     """
-    Извлекает название фида из RSS-содержимого.
+    Извлекает название фида из RSS-, RDF- или Atom-содержимого.
     """
     try:
         soup = BeautifulSoup(content, "xml")
-        # Пробуем получить название из тега <title> внутри <channel>
-        channel_title = soup.find("channel").find("title")
+        # Пробуем получить название из тега <title> внутри <channel> (RSS, RDF) или <feed> (Atom)
+        channel = soup.find("channel") or soup.find("feed")
+        channel_title = channel.find("title")
         if channel_title:
             return channel_title.text.strip()
         return "Без названия"
@@ -71,287 +91,824 @@ def extract_feed_title(content):
         # Если не удалось извлечь название, возвращаем заглушку
         return "Без названия"
 
-def check_rss(url):
+def extract_feed_info(content):
     """
-    Пытается получить контент по URL и определить, является ли он RSS-фидом.
-    Если да – извлекает название и добавляет в список найденных фидов.
-    Пропускает дубликаты URL.
+    Название и отпечаток содержимого фида (см. feed_fingerprint) за один вызов пула разбора.
     """
-    global skipped_duplicates
-    
-    # Проверяем, не содержит ли URL запрещенных слов
-    if is_url_blocked(url):
-        return False
-    
-    # Проверяем, нужно ли завершать работу
-    if exit_flag.is_set():
-        return False
-    
-    # Проверяем, не обрабатывали ли мы уже этот URL фида
-    with found_feeds_lock:
-        if url in found_feed_urls:
-            # Увеличиваем счетчик пропущенных дубликатов
-            skipped_duplicates += 1
-            return False
-        
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content = response.text.strip()
-        if is_rss_content(content):
-            # Извлекаем название фида
-            title = extract_feed_title(content)
-            
-            with found_feeds_lock:
-                # Еще раз проверяем, нет ли уже такого URL (на случай гонки условий)
-                if url in found_feed_urls:
-                    # Увеличиваем счетчик пропущенных дубликатов
-                    skipped_duplicates += 1
-                    return False
-                    
-                if len(FOUND_FEEDS) >= MAX_FEEDS:
-                    with print_lock:
-                        print(f"{GREEN}Достигнуто ограничение в {MAX_FEEDS} RSS-фидов. Завершаем.{RESET}")
-                    # Устанавливаем флаг выхода, чтобы остальные потоки знали, что надо завершаться
-                    exit_flag.set()
-                    return True
-                
-                # Добавляем URL в множество найденных фидов
-                found_feed_urls.add(url)
-                # Добавляем пару (название, URL) в список результатов
-                FOUND_FEEDS.append((title, url))
-                
-            with print_lock:
-                print(f"{GREEN}{CHECK_MARK} RSS фид найден: {title} - {url}{RESET}")
-            return True
-    except Exception as e:
-        # Можно раскомментировать следующую строку для отладки ошибок
-        # with print_lock:
-        #     print(f"Ошибка при проверке {url}: {e}")
-        pass
-    return False
-
-def process_url(url_depth_pair):
+    return extract_feed_title(content), feed_fingerprint(content)
+
+def read_start_urls(path):
     """
-    Обрабатывает URL, извлекает ссылки и проверяет на RSS.
-    Эта функция будет запускаться в отдельных воркерах.
+    Лениво читает начальные URL из файла: по одному в строке, пустые строки
+    и строки с # пропускаются. Домен без схемы дополняется до https://.
     """
-    # Проверяем, не нужно ли завершаться
-    if exit_flag.is_set():
-        return
-        
-    url, depth, domain = url_depth_pair
-    
-    # Проверяем глубину и количество найденных фидов
-    with found_feeds_lock:
-        if len(FOUND_FEEDS) >= MAX_FEEDS:
-            exit_flag.set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.split("#", 1)[0].strip()
+            if not url:
+                continue
+            if "://" not in url:
+                url = "https://" + url
+            yield url
+
+class SiteCrawl:
+    """
+    Состояние обхода одного сайта: очередь и посещенные URL (frontier),
+    найденные фиды и счетчики. Ограничение MAX_FEEDS действует на каждый
+    сайт отдельно: достигший его сайт останавливается, остальные продолжают.
+    """
+
+    def __init__(self, crawler, start_url, frontier):
+        self.crawler = crawler
+        self.start_url = start_url
+        self.domain = urlparse(start_url).netloc
+        self.frontier = frontier
+        self.feeds = []                  # Найденные фиды: [(title, url), ...]
+        self.feed_urls = set()           # Ключи URL найденных фидов (feed_alias_key) для проверки дубликатов
+        self.feed_fingerprints = {}      # Отпечаток содержимого -> URL фида, найденного первым
+        self.skipped_duplicates = 0      # Счетчик пропущенных дубликатов
+        self.feed_aliases = 0            # Фидов, пропущенных как другой URL уже найденного фида
+        self.normalized_duplicates = 0   # Сколько загрузок сэкономила нормализация URL
+        self.visited = 0                 # Проверено URL (заполняется по завершении сайта)
+        self.deferred = 0                # URL верхних уровней, отложенных переполненной очередью (там же)
+        self.in_flight = 0               # URL сайта, которые сейчас обрабатывают воркеры
+        self.fetches = 0                 # Загрузок страниц, фидов, robots.txt и карт сайта
+        self.probe_fetches = 0           # Из них на этапе проверки известных адресов
+        self.probe_feeds = 0             # Фидов, найденных на этом этапе
+        self.probing = False             # Идет проверка известных адресов (feed_probe)
+        self.probe_queue = deque()       # Проверки (вид, URL), ожидающие воркера
+        self.probed = set()              # Уже поставленные в очередь проверки
+        self.sitemaps = 0
+        self.sitemap_feeds = 0
+        self.sitemap_lists = 0           # Прочитано карт сайта со списком адресов (не индексов)
+        self.sitemaps_truncated = False  # Карты сайта или адреса из них отброшены по лимитам feed_probe
+        self.home_feed_links = 0         # Фидов, объявленных в <link rel="alternate"> на главной
+        self.home_anchors = None         # Ссылки главной [(URL, переписан ли), ...], если проверка HOME ее разобрала
+        self.stopped = threading.Event()  # Достигнуто ограничение MAX_FEEDS
+        self.lock = threading.Lock()      # Блокировка для фидов и счетчиков
+
+        # Восстанавливаем фиды, найденные в прошлых запусках
+        for title, url in frontier.feeds():
+            if feed_alias_key(url) not in self.feed_urls:
+                self.feed_urls.add(feed_alias_key(url))
+                self.feeds.append((title, url))
+                if crawler.on_feed:
+                    crawler.on_feed(self, title, url)
+
+    def should_stop(self):
+        return self.stopped.is_set() or self.crawler.exit_flag.is_set()
+
+    def count_fetch(self):
+        with self.lock:
+            self.fetches += 1
+
+    def fetch(self, url, wanted=content_sniffer.PAGE_KINDS, scheduler=True):
+        """
+        content_sniffer.fetch с учетом загрузки в счетчике сайта.
+        """
+        self.count_fetch()
+        return content_sniffer.fetch(url, timeout=10, wanted=wanted,
+                                     scheduler=self.crawler.scheduler if scheduler else None)
+
+    def start_probing(self):
+        """
+        Ставит в очередь первые проверки известных адресов фидов.
+        """
+        self.probing = True
+        for kind, url in feed_probe.initial_probes(self.start_url):
+            self.add_probe(kind, url)
+
+    def add_probe(self, kind, url):
+        """
+        Ставит проверку в очередь, если такой еще не было и не исчерпаны лимиты карт сайта.
+        """
+        with self.lock:
+            if url in self.probed:
+                return
+            if kind == feed_probe.SITEMAP:
+                if self.sitemaps >= feed_probe.MAX_SITEMAPS:
+                    self.sitemaps_truncated = True
+                    return
+                self.sitemaps += 1
+            self.probed.add(url)
+            self.probe_queue.append((kind, url))
+
+    def probe_complete(self):
+        """
+        Можно ли в режиме "probe" обойтись без обхода ссылок: фиды найдены, главная
+        объявляет фиды в <link rel="alternate">, и карта сайта прочитана целиком
+        (без отброшенных по лимитам адресов). Фид из одного <link> на главной - обычно
+        только общий фид сайта, а фиды разделов находит лишь обход ссылок.
+        """
+        return bool(self.feeds and self.home_feed_links and self.sitemap_lists and not self.sitemaps_truncated)
+
+    def end_probing(self, max_depth):
+        """
+        Завершает проверку известных адресов. Обход ссылок не начинается только в режиме
+        "probe" при полном результате проверки (probe_complete). Вызывается, когда проверок в работе нет.
+        """
+        self.probing = False
+        with self.lock:
+            self.probe_fetches = self.fetches
+            self.probe_feeds = len(self.feeds)
+        home_anchors, self.home_anchors = self.home_anchors, None
+        if self.crawler.discovery == "probe" and self.probe_complete():
+            reporter.result(f"{self.domain}: найдено фидов по известным адресам: {len(self.feeds)}, обход ссылок не нужен")
             return
-    
-    if depth < 0:
-        return
-        
-    # Проверяем был ли URL уже посещен
-    with visited_lock:
-        if url in visited:
+        if home_anchors is None:
+            # Главную загрузить не удалось - обход начнется с нее, как без проверки
+            self.frontier.put(self.start_url, max_depth, self.domain)
             return
-        visited.add(url)
-    
-    # Проверяем, не содержит ли URL запрещенных слов
-    if is_url_blocked(url):
-        return
-    
-    with print_lock:
-        print(f"Обход: {url} (глубина: {depth})")
-    
-    try:
-        # Еще раз проверяем флаг выхода перед запросом
-        if exit_flag.is_set():
+        # Главная уже загружена и разобрана проверкой HOME: отмечаем ее посещенной
+        # и ставим в очередь ее ссылки, не загружая страницу второй раз
+        if not self.frontier.visit(self.start_url, leaf=max_depth == 0) or max_depth == 0:
+            return
+        for full_url, rewritten in home_anchors:
+            if not self.is_already_visited(full_url, rewritten, leaf=max_depth == 1):
+                self.frontier.put(full_url, max_depth - 1, self.domain)
+
+    def handle_robots(self, robots_text):
+        for sitemap in feed_probe.robots_sitemaps(robots_text or ""):
+            self.add_probe(feed_probe.SITEMAP, sitemap)
+
+    def handle_home_links(self, url, feed_links):
+        with self.lock:
+            self.home_feed_links += len(feed_links)
+        for href in feed_links:
+            self.add_probe(feed_probe.FEED, normalize_url(urljoin(url, href)))
+
+    def handle_home_anchors(self, url, anchors):
+        """
+        Запоминает ссылки <a> главной для обхода после проверки (end_probing). Ссылки
+        с "feed" или "rss" в URL проверяются сразу, как это сделал бы обход главной.
+        """
+        home_anchors = []
+        for href in anchors:
+            full_url, rewritten = canonical_link(url, href)
+            if not self.crawler.url_filter.in_scope(full_url, self.domain) or self.crawler.is_url_blocked(full_url):
+                continue
+            if "feed" in full_url.lower() or "rss" in full_url.lower():
+                self.add_probe(feed_probe.FEED, full_url)
+            home_anchors.append((full_url, rewritten))
+        self.home_anchors = home_anchors
+
+    def handle_sitemap(self, is_index, locs):
+        """
+        Вложенные карты из индекса ставит в очередь, из обычной карты - адреса, похожие на фиды.
+        """
+        if not is_index:
+            with self.lock:
+                self.sitemap_lists += 1
+        for loc in locs:
+            if is_index:
+                self.add_probe(feed_probe.SITEMAP, loc)
+            elif feed_probe.is_feed_like(loc):
+                with self.lock:
+                    if self.sitemap_feeds >= feed_probe.MAX_SITEMAP_FEEDS:
+                        self.sitemaps_truncated = True
+                        return
+                    self.sitemap_feeds += 1
+                self.add_probe(feed_probe.FEED, normalize_url(loc))
+
+    def probe(self, kind, url):
+        """
+        Выполняет одну проверку известного адреса (см. feed_probe).
+        """
+        if self.should_stop():
+            return
+        if kind == feed_probe.FEED:
+            self.check_rss(url)
+            return
+
+        scheduler = self.crawler.scheduler
+        with metrics.trace(url, kind):
+            try:
+                if kind == feed_probe.ROBOTS:
+                    # robots.txt загружаем сами и отдаем планировщику, чтобы он не загружал его второй раз
+                    claimed = scheduler is not None and scheduler.take_robots(url)
+                    text = None
+                    try:
+                        _, text = self.fetch(url, wanted=content_sniffer.TEXT_KINDS, scheduler=False)
+                    finally:
+                        if claimed:
+                            scheduler.set_robots(host_of(url), text)
+                    self.handle_robots(text)
+                elif kind == feed_probe.HOME:
+                    page_kind, content = self.fetch(url)
+                    if page_kind in content_sniffer.FEED_KINDS:
+                        self.home_anchors = []
+                        self.check_rss(url, content)
+                    elif page_kind == "html":
+                        with metrics.stage("parse_links"):
+                            feed_links, anchors = parse_pool.run(extract_links, content)
+                        content = None
+                        memory_budget.release()
+                        self.handle_home_links(url, feed_links)
+                        self.handle_home_anchors(url, anchors)
+                    else:
+                        self.home_anchors = []
+                elif kind == feed_probe.SITEMAP:
+                    _, content = self.fetch(url, wanted=content_sniffer.SITEMAP_KINDS)
+                    if content is not None:
+                        with metrics.stage("parse_sitemap"):
+                            is_index, locs = parse_pool.run(extract_sitemap_locs, content)
+                        content = None
+                        memory_budget.release()
+                        self.handle_sitemap(is_index, locs)
+            except Exception as e:
+                # Большинства известных адресов на сайте нет - это не ошибка, только учитываем в метриках
+                metrics.record_error("probe", e)
+
+    def is_already_visited(self, full_url, rewritten, leaf=False):
+        """
+        Проверяет, посещен ли уже URL (leaf - ссылка ведет на последний уровень),
+        и учитывает загрузки, сэкономленные нормализацией.
+        """
+        if not self.frontier.is_visited(full_url, leaf):
+            return False
+        if rewritten:
+            with self.lock:
+                self.normalized_duplicates += 1
+        return True
+
+    def is_duplicate_feed(self, url):
+        """
+        Проверяет, найден ли уже фид с таким URL (с точностью до схемы и завершающего
+        слэша), и считает пропущенные дубликаты. Проверка множества идет без блокировки
+        (чтение set атомарно под GIL): блокировка нужна только для счетчика
+        и окончательной проверки в add_feed.
+        """
+        if feed_alias_key(url) not in self.feed_urls:
+            return False
+        with self.lock:
+            self.skipped_duplicates += 1
+        return True
+
+    def add_feed(self, title, url, fingerprint=None):
+        """
+        Регистрирует найденный фид. Фид с тем же отпечатком содержимого, что у уже
+        найденного, - это другой URL того же фида: он не сохраняется.
+        При достижении MAX_FEEDS останавливает обход сайта.
+        Возвращает True, если фид добавлен или достигнут лимит.
+        """
+        crawler = self.crawler
+        key = feed_alias_key(url)
+        with self.lock:
+            # Еще раз проверяем, нет ли уже такого URL (на случай гонки условий)
+            if key in self.feed_urls:
+                self.skipped_duplicates += 1
+                return False
+
+            if not crawler.dedup_feeds:
+                fingerprint = None
+            canonical = self.feed_fingerprints.get(fingerprint) if fingerprint else None
+            if canonical is not None:
+                # Запоминаем ключ, чтобы этот URL больше не загружать
+                self.feed_urls.add(key)
+                self.feed_aliases += 1
+                reporter.say(f"Фид {url} - тот же, что {canonical}, пропущен")
+                return False
+
+            if len(self.feeds) >= crawler.max_feeds:
+                if not self.stopped.is_set():
+                    reporter.result(f"{GREEN}Достигнуто ограничение в {crawler.max_feeds} RSS-фидов для {self.domain}. Завершаем.{RESET}")
+                self.stopped.set()
+                return True
+
+            self.feed_urls.add(key)
+            if fingerprint:
+                self.feed_fingerprints[fingerprint] = url
+            self.feeds.append((title, url))
+            self.frontier.add_feed(title, url)
+
+        # Запись результата - вне блокировки сайта: у писателя своя
+        if crawler.on_feed:
+            crawler.on_feed(self, title, url)
+        reporter.result(f"{GREEN}{CHECK_MARK} RSS фид найден: {title} - {url}{RESET}")
+        return True
+
+    def check_rss(self, url, content=None):
+        """
+        Пытается получить контент по URL и определить, является ли он RSS-фидом.
+        Если да – извлекает название и добавляет в список найденных фидов.
+        Пропускает дубликаты URL. Если содержимое уже загружено (content),
+        повторный запрос не выполняется.
+        """
+        # Проверяем, не содержит ли URL запрещенных слов
+        if self.crawler.is_url_blocked(url):
+            return False
+
+        # Проверяем, нужно ли завершать работу
+        if self.should_stop():
+            return False
+
+        # Проверяем, не обрабатывали ли мы уже этот URL фида
+        if self.is_duplicate_feed(url):
+            return False
+
+        # Загрузка фида - отдельная строка журнала трассировки (metrics.TRACE_FILE)
+        with metrics.trace(url, "feed") if content is None else contextlib.nullcontext():
+            try:
+                if content is None:
+                    # Читаем только начало ответа: не-фиды обрываются после SNIFF_BYTES байт
+                    _, content = self.fetch(url, wanted=content_sniffer.FEED_KINDS)
+                if content is not None and is_rss_content(content):
+                    # Извлекаем название фида
+                    with metrics.stage("parse_title"):
+                        title, fingerprint = parse_pool.run(extract_feed_info, content.strip())
+                    # Фид разобран: его содержимое больше не держим
+                    content = None
+                    memory_budget.release()
+                    return self.add_feed(title, url, fingerprint)
+            except Exception as e:
+                # Ошибки учитываются в метриках и журнале трассировки
+                metrics.record_error("check_rss", e)
+        # Ответ не фид или не загрузился: прочитанное начало тоже не держим
+        memory_budget.release()
+        return False
+
+    def process_url(self, url_depth_pair):
+        """
+        Обрабатывает URL, извлекает ссылки и проверяет на RSS.
+        Эта функция будет запускаться в отдельных воркерах.
+        """
+        # Проверяем, не нужно ли завершаться
+        if self.should_stop():
+            return
+
+        url, depth, domain = url_depth_pair
+
+        if depth < 0:
+            return
+
+        # Проверяем был ли URL уже посещен (и отмечаем его посещенным)
+        if not self.frontier.visit(url, leaf=depth == 0):
             return
-            
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        content = response.text
-        content_type = response.headers.get("Content-Type", "")
-    except Exception as e:
-        # Если страницу получить не удалось, пропускаем её
-        # with print_lock:
-        #     print(f"Ошибка получения {url}: {e}")
-        return
-
-    # Если нужно завершаться, не продолжаем обработку
-    if exit_flag.is_set():
-        return
-        
-    # Если страница сама выглядит как RSS
-    if "application/rss+xml" in content_type or "application/xml" in content_type or is_rss_content(content):
-        check_rss(url)
-        return
-
-    # Если страница является HTML, ищем в ней потенциальные ссылки на фид
-    if "text/html" in content_type and not exit_flag.is_set():
-        soup = BeautifulSoup(content, "html.parser")
-
-        # 1. Проверяем <link> теги в <head>
-        link_tags = soup.find_all("link", {"type": "application/rss+xml"})
-        for tag in link_tags:
-            if exit_flag.is_set():
+
+        # Проверяем, не содержит ли URL запрещенных слов
+        if self.crawler.is_url_blocked(url):
+            return
+
+        reporter.say(f"Обход: {url} (глубина: {depth})")
+
+        with metrics.trace(url, "page"):
+            try:
+                # Тип ответа определяется по первым байтам, медиа и прочие файлы не скачиваются
+                kind, content = self.fetch(url)
+            except Exception as e:
+                # Если страницу получить не удалось, пропускаем её (ошибка - в метриках)
+                metrics.record_error("process_url", e)
                 return
-                
-            href = tag.get("href")
-            if href:
-                rss_url = urljoin(url, href)
-                check_rss(rss_url)
-
-        # 2. Ищем все ссылки <a> и добавляем их в очередь для обработки
-        a_tags = soup.find_all("a")
-        for a in a_tags:
-            if exit_flag.is_set():
+
+            # Если нужно завершаться, не продолжаем обработку
+            if self.should_stop():
                 return
-                
-            href = a.get("href")
-            if not href:
-                continue
-            full_url = urljoin(url, href)
-            parsed = urlparse(full_url)
-            # Ограничиваемся ссылками внутри того же домена
-            if domain not in parsed.netloc:
-                continue
 
-            # Если в URL присутствуют ключевые слова "feed" или "rss", проверяем сразу
-            if "feed" in full_url.lower() or "rss" in full_url.lower():
-                check_rss(full_url)
+            # Если страница сама является фидом, регистрируем её без повторной загрузки
+            if kind in content_sniffer.FEED_KINDS:
+                self.check_rss(url, content)
+                return
+
+            # Если страница является HTML, ищем в ней потенциальные ссылки на фид
+            if kind == "html":
+                # Один проход по странице без построения дерева, в пуле процессов
+                with metrics.stage("parse_links"):
+                    feed_links, anchors = parse_pool.run(extract_links, content)
+                # Страница разобрана: ее содержимое больше не держим
+                content = None
+                memory_budget.release()
+
+                # 1. Проверяем <link> теги в <head>
+                for href in feed_links:
+                    if self.should_stop():
+                        return
+                    self.check_rss(normalize_url(urljoin(url, href)))
+
+                # 2. Добавляем ссылки <a> в очередь для обработки
+                for href in anchors:
+                    if self.should_stop():
+                        return
+
+                    full_url, rewritten = canonical_link(url, href)
+                    # Ограничиваемся ссылками внутри того же сайта и отбрасываем
+                    # отфильтрованные URL (медиафайлы, запрещенные слова) до очереди
+                    if not self.crawler.url_filter.in_scope(full_url, domain) or self.crawler.is_url_blocked(full_url):
+                        continue
+
+                    # Если в URL присутствуют ключевые слова "feed" или "rss", проверяем сразу
+                    if "feed" in full_url.lower() or "rss" in full_url.lower():
+                        self.check_rss(full_url)
+
+                    # Ссылки со страниц последнего уровня в очередь не ставим: они были бы
+                    # отброшены по глубине. Уже посещенные URL (в том числе после нормализации) тоже
+                    if depth == 0 or self.is_already_visited(full_url, rewritten, leaf=depth == 1):
+                        continue
 
-            # Добавляем URL в очередь для дальнейшей обработки, если не надо завершаться
-            if not exit_flag.is_set():
-                url_queue.put((full_url, depth - 1, domain))
+                    self.frontier.put(full_url, depth - 1, domain)
 
-def worker():
+class RssCrawler:
     """
-    Функция воркера, которая обрабатывает URL из очереди.
+    Поиск RSS-фидов на одном или нескольких сайтах в одном процессе.
+
+    Сайты берутся из итератора начальных URL по мере освобождения мест: одновременно
+    обходятся не более max_active_sites сайтов, а общий пул воркеров (WORKERS потоков
+    или ASYNC_CONCURRENCY корутин) берет URL из их очередей по кругу. У каждого сайта
+    свое состояние (SiteCrawl); каждый найденный фид сразу передается в
+    on_feed(site, title, url), а завершенный сайт - в on_site_done(site),
+    после чего его очередь и посещенные URL освобождаются.
+    frontier_file (очередь на диске, --resume) поддерживается только для одного сайта.
     """
-    while not exit_flag.is_set():
-        try:
-            # Получаем URL из очереди с таймаутом
-            url_depth_pair = url_queue.get(timeout=1)
-            
-            # Проверяем, не установлен ли флаг выхода
-            if exit_flag.is_set():
-                url_queue.task_done()
-                break
-                
-            process_url(url_depth_pair)
-            url_queue.task_done()
-            
-            # Небольшая задержка, чтобы не перегружать сервер
-            time.sleep(0.1)
-            
-        except queue.Empty:
-            # Проверяем, не пуста ли очередь и не установлен ли флаг выхода
-            if url_queue.empty() or exit_flag.is_set():
+
+    PROBE = PROBE
+    is_rss_content = staticmethod(is_rss_content)
+    extract_feed_title = staticmethod(extract_feed_title)
+    extract_feed_info = staticmethod(extract_feed_info)
+
+    def __init__(self, max_depth=MAX_DEPTH, max_feeds=MAX_FEEDS, blocked_words=BLOCKED_WORDS,
+                 engine=ENGINE, workers=WORKERS, async_concurrency=ASYNC_CONCURRENCY,
+                 parse_processes=PARSE_PROCESSES, visited_store=VISITED_STORE,
+                 bloom_error_rate=BLOOM_ERROR_RATE, politeness=POLITENESS,
+                 max_active_sites=MAX_ACTIVE_SITES, frontier_file=FRONTIER_FILE, discovery=DISCOVERY,
+                 on_site_done=None, on_feed=None, url_filter=None, dedup_feeds=DEDUP_FEEDS,
+                 max_in_flight_bytes=MAX_IN_FLIGHT_BYTES, max_frontier=MAX_FRONTIER):
+        self.max_depth = max_depth
+        self.max_feeds = max_feeds
+        # Правила отбора URL (url_filter.py); по умолчанию - BLOCKED_WORDS и настройки модуля
+        self.url_filter = url_filter or UrlFilter(blocked_words, on_reject=self._report_rejected)
+        self.engine = engine
+        self.workers = workers
+        self.async_concurrency = async_concurrency
+        self.parse_processes = parse_processes
+        self.visited_store = visited_store
+        self.bloom_error_rate = bloom_error_rate
+        self.max_active_sites = max_active_sites
+        self.frontier_file = frontier_file
+        self.discovery = discovery
+        self.dedup_feeds = dedup_feeds
+        # Ограничения памяти: байты тел ответов в обработке и размер очереди сайта
+        self.memory_budget = memory_budget.ByteBudget(max_in_flight_bytes)
+        self.max_frontier = max_frontier
+        self.deferred = 0                    # Сколько раз переполненная очередь отложила URL верхнего уровня
+        self.on_site_done = on_site_done
+        self.on_feed = on_feed
+        # Планировщик общий для всех сайтов: лимиты ведутся по хостам
+        self.scheduler = HostScheduler(robots_fetcher=fetch_robots) if politeness else None
+
+        self.exit_flag = threading.Event()   # Прерывание всего обхода (Ctrl+C)
+
+        # Итоги по завершенным сайтам
+        self.sites_done = 0
+        self.visited = 0
+        self.feeds_found = 0
+        self.skipped_duplicates = 0
+        self.feed_aliases = 0
+        self.normalized_duplicates = 0
+        self.fetches = 0
+        self.probe_fetches = 0
+        self.probe_feeds = 0
+
+        self._sites_lock = threading.Lock()
+        self._start_urls = iter(())
+        self._exhausted = True
+        self._started_domains = set()
+        self._active = []
+        self._cursor = 0
+        self._resume = False
+
+    def is_url_blocked(self, url):
+        """
+        Проверяет URL по правилам url_filter: запрещенные слова из BLOCKED_WORDS,
+        расширения, хосты, пути и параметры запроса. Результат запоминается.
+        """
+        return self.url_filter.check(url) is not None
+
+    @staticmethod
+    def _report_rejected(url, reason):
+        # Вызывается один раз на URL: повторные проверки берутся из кэша фильтра
+        if reason.startswith("word:"):
+            reporter.say(f"URL проигнорирован (содержит '{reason[5:]}'): {url}")
+        else:
+            reporter.say(f"URL проигнорирован ({REASONS[reason]}): {url}")
+
+    def _open_site(self, start_url):
+        if self.frontier_file:
+            frontier = SqliteFrontier(self.frontier_file, resume=self._resume)
+        else:
+            frontier = MemoryFrontier(self.visited_store, self.bloom_error_rate, self.max_frontier)
+        site = SiteCrawl(self, start_url, frontier)
+        # Начинаем сайт, если обход начинается с нуля (при --resume очередь уже есть)
+        if frontier.pending() == 0 and frontier.visited_count() == 0:
+            if self.discovery == "crawl":
+                frontier.put(start_url, self.max_depth, site.domain)
+            else:
+                site.start_probing()
+        return site
+
+    def _fill_active(self):
+        """
+        Открывает следующие сайты из списка, пока есть свободные места. Вызывается под _sites_lock.
+        """
+        while not self._exhausted and len(self._active) < self.max_active_sites and not self.exit_flag.is_set():
+            try:
+                start_url = normalize_url(next(self._start_urls))
+            except StopIteration:
+                self._exhausted = True
                 break
-        except Exception as e:
-            with print_lock:
-                print(f"Ошибка в воркере: {e}")
-            url_queue.task_done()
+            domain = urlparse(start_url).netloc
+            if domain in self._started_domains:
+                continue
+            self._started_domains.add(domain)
+            self._active.append(self._open_site(start_url))
+
+    def _finish(self, site):
+        """
+        Закрывает очередь сайта, учитывает его итоги и отдает в on_site_done. Вызывается под _sites_lock.
+        """
+        self._active.remove(site)
+        site.visited = site.frontier.visited_count()
+        site.deferred = site.frontier.deferred()
+        # Сохраняем очередь обхода, чтобы его можно было продолжить
+        site.frontier.close()
+        site.frontier = None
+        self.sites_done += 1
+        self.visited += site.visited
+        self.feeds_found += len(site.feeds)
+        self.skipped_duplicates += site.skipped_duplicates
+        self.feed_aliases += site.feed_aliases
+        self.normalized_duplicates += site.normalized_duplicates
+        self.deferred += site.deferred
+        self.fetches += site.fetches
+        self.probe_fetches += site.probe_fetches
+        self.probe_feeds += site.probe_feeds
+        if self.on_site_done:
+            self.on_site_done(site)
 
-def save_to_csv(feeds, csv_file):
+    def next_task(self):
+        """
+        Берет следующий URL из очередей активных сайтов по кругу.
+        Возвращает (site, task_id, (url, depth, domain)) или None, если все очереди сейчас пусты.
+        Пока у сайта идет проверка известных адресов, возвращается (site, PROBE, (вид, URL)).
+        Попутно закрывает завершенные сайты и открывает новые на их место.
+        """
+        with self._sites_lock:
+            self._fill_active()
+            checked = 0
+            while checked < len(self._active):
+                self._cursor %= len(self._active)
+                site = self._active[self._cursor]
+                if site.probing and not site.probe_queue and site.in_flight == 0:
+                    site.end_probing(self.max_depth)
+                if site.in_flight == 0 and (site.should_stop() or (not site.probing and site.frontier.pending() == 0)):
+                    self._finish(site)
+                    self._fill_active()
+                    continue
+                self._cursor += 1
+                checked += 1
+                if site.should_stop():
+                    continue
+                if site.probing:
+                    if site.probe_queue:
+                        site.in_flight += 1
+                        return site, PROBE, site.probe_queue.popleft()
+                    continue
+                try:
+                    task_id, url_depth_pair = site.frontier.get(timeout=0)
+                except queue.Empty:
+                    continue
+                site.in_flight += 1
+                return site, task_id, url_depth_pair
+            return None
+
+    def task_done(self, site, task_id):
+        """
+        Отмечает URL, полученный из next_task, обработанным.
+        """
+        with self._sites_lock:
+            # Прерванную обработку не засчитываем, чтобы при --resume URL обработался заново
+            if task_id != PROBE and not site.should_stop():
+                site.frontier.done(task_id)
+            site.in_flight -= 1
+
+    def queue_depth(self):
+        """
+        URL и проверок известных адресов в очередях активных сайтов (для metrics).
+        """
+        with self._sites_lock:
+            return sum(site.frontier.pending() + len(site.probe_queue) for site in self._active)
+
+    def status_line(self):
+        """
+        Строка состояния для тихого режима reporter.
+        """
+        with self._sites_lock:
+            active = list(self._active)
+            visited, feeds = self.visited, self.feeds_found
+        visited += sum(site.frontier.visited_count() for site in active)
+        feeds += sum(len(site.feeds) for site in active)
+        return f"Проверено URL: {visited}, найдено RSS-фидов: {feeds}, в очереди: {self.queue_depth()}"
+
+    def finished(self):
+        """
+        True, если обход прерван или все сайты из списка обработаны.
+        """
+        with self._sites_lock:
+            return self.exit_flag.is_set() or (self._exhausted and not self._active)
+
+    def _worker(self):
+        """
+        Поток-воркер: обрабатывает URL из очередей сайтов, пока обход не завершен.
+        """
+        while not self.exit_flag.is_set():
+            task = self.next_task()
+            if task is None:
+                if self.finished():
+                    break
+                # Очереди пусты, но другие воркеры еще обрабатывают страницы
+                time.sleep(0.01)
+                continue
+
+            site, task_id, url_depth_pair = task
+            try:
+                with metrics.busy("crawl"), self.memory_budget.task():
+                    if task_id == PROBE:
+                        site.probe(*url_depth_pair)
+                    else:
+                        site.process_url(url_depth_pair)
+            except Exception as e:
+                metrics.record_error("worker", e)
+                reporter.say(f"Ошибка в воркере: {e}")
+            finally:
+                self.task_done(site, task_id)
+
+    def _crawl_with_threads(self):
+        """
+        Обходит сайты пулом из WORKERS потоков.
+        """
+        workers = []
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._worker)
+            t.daemon = True  # Потоки будут автоматически завершены при выходе из основной программы
+            t.start()
+            workers.append(t)
+
+        try:
+            # Ждем с таймаутом, чтобы главный поток оставался отзывчивым к Ctrl+C
+            for t in workers:
+                while t.is_alive():
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            self.exit_flag.set()
+            # Воркеры доделывают текущие страницы, после этого очереди сайтов можно закрыть
+            for t in workers:
+                t.join()
+            raise
+
+    def crawl(self, start_urls, resume=False):
+        """
+        Обходит сайты из start_urls (любой итерируемый объект, читается лениво)
+        выбранным движком. Возвращает после завершения всех сайтов или прерывания.
+        """
+        self._start_urls = iter(start_urls)
+        self._exhausted = False
+        self._resume = resume
+        self.exit_flag.clear()
+
+        parse_pool.start(self.parse_processes)
+        reporter.start(status=self.status_line)
+        metrics.gauge_set("workers", self.async_concurrency if self.engine == "async" else self.workers, pool="crawl")
+        # Функции gauge свои у каждого краулера: у одновременных обходов (демон) значения складываются
+        in_flight_bytes = lambda: self.memory_budget.held
+        metrics.register_gauge("queue_depth", self.queue_depth, pool="crawl")
+        metrics.register_gauge("in_flight_bytes", in_flight_bytes)
+
+        try:
+            if self.engine == "async":
+                # aiohttp нужен только асинхронному движку, поэтому импортируем его лениво
+                from async_crawler import crawl_async
+                asyncio.run(crawl_async(self))
+            else:
+                self._crawl_with_threads()
+
+        except KeyboardInterrupt:
+            reporter.result("\nПрерывание выполнения пользователем.")
+            self.exit_flag.set()
+
+        finally:
+            parse_pool.shutdown()
+            reporter.stop()
+            metrics.unregister_gauge("queue_depth", self.queue_depth, pool="crawl")
+            metrics.unregister_gauge("in_flight_bytes", in_flight_bytes)
+            # После прерывания закрываем сайты, которые не успели завершиться
+            with self._sites_lock:
+                for site in list(self._active):
+                    self._finish(site)
+
+def crawl_for_rss(start_url, max_depth=MAX_DEPTH, resume=False, output_file=None, **options):
     """
-    Сохраняет найденные RSS-фиды в CSV файл с двумя колонками: название и URL.
+    Обходит один сайт, дописывая найденные фиды в output_file (по умолчанию CSV_FILE)
+    по мере нахождения. Возвращает краулер (итоги) и состояние сайта.
     """
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Название', 'URL'])
-        for title, url in feeds:
-            writer.writerow([title, url])
-    
-    with print_lock:
-        print(f"Результаты сохранены в файл: {csv_file}")
-        print(f"Всего уникальных RSS-фидов: {len(feeds)}")
-
-def crawl_for_rss(start_url, domain, max_depth):
+    sites = []
+    with ResultWriter(output_file or CSV_FILE, ("title", "url"), ["Название", "URL"]) as writer:
+        crawler = RssCrawler(max_depth=max_depth, on_site_done=sites.append,
+                             on_feed=lambda site, title, url: writer.write((title, url)), **options)
+        crawler.crawl([start_url], resume=resume)
+    print(f"Результаты сохранены в файл: {writer.path}")
+    print(f"Всего уникальных RSS-фидов: {writer.count}")
+    return crawler, sites[0] if sites else None
+
+def crawl_sites(start_urls, output_file, **options):
     """
-    Запускает обход сайта с использованием пула воркеров.
+    Пакетный режим: обходит сайты из start_urls общим пулом воркеров и дописывает
+    найденные фиды в output_file (колонки: название, URL, сайт) по мере нахождения.
     """
-    # Сбрасываем флаг выхода перед началом работы
-    exit_flag.clear()
-    
-    # Добавляем начальный URL в очередь
-    url_queue.put((start_url, max_depth, domain))
-    
-    # Создаем и запускаем воркеры
-    workers = []
-    for _ in range(WORKERS):
-        t = threading.Thread(target=worker)
-        t.daemon = True  # Потоки будут автоматически завершены при выходе из основной программы
-        t.start()
-        workers.append(t)
-    
-    try:
-        # Ждем завершения обработки очереди или прерывания
-        while not exit_flag.is_set():
-            # Если очередь пуста и все задачи выполнены, выходим из цикла
-            if url_queue.empty() and url_queue.unfinished_tasks == 0:
-                break
-            time.sleep(0.5)
-        
-        # Если дошли сюда, значит либо достигли лимита, либо обработали все URL
-        # В любом случае устанавливаем флаг выхода, чтобы все потоки завершились
-        exit_flag.set()
-        
-        # Короткая задержка, чтобы потоки успели заметить флаг выхода
-        time.sleep(1)
-        
-    except KeyboardInterrupt:
-        with print_lock:
-            print("\nПрерывание выполнения пользователем.")
-        exit_flag.set()
-        
-    finally:
-        # Ожидаем завершения всех рабочих потоков (с таймаутом)
-        for t in workers:
-            t.join(1)
-        
-        # Если были найдены фиды, сохраняем их в CSV
-        if FOUND_FEEDS:
-            save_to_csv(FOUND_FEEDS, CSV_FILE)
+    def report_site(site):
+        reporter.result(f"{GREEN}Сайт {site.domain} завершен: RSS-фидов {len(site.feeds)}, "
+                        f"проверено URL {site.visited} (сайтов готово: {crawler.sites_done}){RESET}")
+
+    with ResultWriter(output_file, ("title", "url", "site"), ["Название", "URL", "Сайт"]) as writer:
+        crawler = RssCrawler(on_site_done=report_site,
+                             on_feed=lambda site, title, url: writer.write((title, url, site.domain)),
+                             **options)
+        crawler.crawl(start_urls)
+    return crawler
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Поиск RSS-фидов на сайте")
+    parser.add_argument("--sites",
+                        help="Файл со списком начальных URL (по одному в строке) для пакетного обхода")
+    parser.add_argument("--frontier", default=FRONTIER_FILE,
+                        help="Файл SQLite для очереди обхода (по умолчанию FRONTIER_FILE)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Продолжить прерванный обход из файла очереди")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Без построчного вывода, только периодическая строка состояния")
+    args = parser.parse_args()
+    reporter.QUIET = reporter.QUIET or args.quiet
+    FRONTIER_FILE = args.frontier
+    if args.resume and not FRONTIER_FILE:
+        parser.error("для --resume нужен файл очереди: --frontier или FRONTIER_FILE")
+    if args.sites and FRONTIER_FILE:
+        parser.error("очередь на диске (--frontier) поддерживается только для одного сайта")
+
+    options = dict(
+        blocked_words=BLOCKED_WORDS, engine=ENGINE, workers=WORKERS, async_concurrency=ASYNC_CONCURRENCY,
+        parse_processes=PARSE_PROCESSES, visited_store=VISITED_STORE, bloom_error_rate=BLOOM_ERROR_RATE,
+        politeness=POLITENESS, max_active_sites=MAX_ACTIVE_SITES, frontier_file=FRONTIER_FILE,
+        discovery=DISCOVERY,
+    )
+    crawler = None
+
     # Обработчик сигнала SIGINT (Ctrl+C)
     def signal_handler(sig, frame):
         print("\nПолучен сигнал прерывания. Завершение работы...")
-        exit_flag.set()
-        time.sleep(2)  # Даем время на корректное завершение
-    
+        raise KeyboardInterrupt
+
     # Установка обработчика сигнала
     signal.signal(signal.SIGINT, signal_handler)
-    
-    try:
-        print(f"Запуск обхода сайта с {WORKERS} параллельными воркерами...")
-        print(f"Максимальное количество RSS-фидов: {MAX_FEEDS}")
-        print(f"Результаты будут сохранены в файл: {CSV_FILE}")
-        
-        if BLOCKED_WORDS:
-            print(f"Игнорируются URL, содержащие: {', '.join(BLOCKED_WORDS)}")
-        
-        parsed_start = urlparse(START_URL)
-        domain = parsed_start.netloc
-        
-        # Запускаем обход с пулом воркеров
-        start_time = time.time()
-        crawl_for_rss(START_URL, domain, MAX_DEPTH)
-        end_time = time.time()
-        
-        total_time = end_time - start_time
-        with print_lock:
-            print(f"\nОбход завершен за {total_time:.2f} секунд.")
-            print(f"Проверено URL: {len(visited)}")
-            print(f"Найдено уникальных RSS-фидов: {len(FOUND_FEEDS)}")
-            print(f"Пропущено дубликатов RSS-фидов: {skipped_duplicates}")
-            print(f"Результаты сохранены в {CSV_FILE}")
-        
-    except Exception as e:
-        print(f"Ошибка: {e}")
-        # В случае ошибки всё равно пытаемся сохранить то, что нашли
-        if FOUND_FEEDS:
-            save_to_csv(FOUND_FEEDS, CSV_FILE)
+
+    if ENGINE == "async":
+        print(f"Запуск асинхронного обхода с {ASYNC_CONCURRENCY} одновременными запросами...")
+    else:
+        print(f"Запуск обхода с {WORKERS} параллельными воркерами...")
+    print(f"Максимальное количество RSS-фидов на сайт: {MAX_FEEDS}")
+    print(f"Результаты будут сохранены в файл: {CSV_FILE}")
+
+    if BLOCKED_WORDS:
+        print(f"Игнорируются URL, содержащие: {', '.join(BLOCKED_WORDS)}")
+
+    # Запускаем обход с пулом воркеров
+    start_time = time.time()
+    if args.sites:
+        print(f"Пакетный обход сайтов из {args.sites}, одновременно до {MAX_ACTIVE_SITES} сайтов")
+        crawler = crawl_sites(read_start_urls(args.sites), CSV_FILE, max_depth=MAX_DEPTH,
+                              max_feeds=MAX_FEEDS, **options)
+    else:
+        crawler, _ = crawl_for_rss(START_URL, MAX_DEPTH, resume=args.resume, max_feeds=MAX_FEEDS, **options)
+    end_time = time.time()
+
+    total_time = end_time - start_time
+    print(f"\nОбход завершен за {total_time:.2f} секунд.")
+    if args.sites:
+        print(f"Обработано сайтов: {crawler.sites_done}")
+    print(f"Проверено URL: {crawler.visited}")
+    print(f"Найдено уникальных RSS-фидов: {crawler.feeds_found}")
+    print(f"Пропущено дубликатов RSS-фидов: {crawler.skipped_duplicates}")
+    print(f"Пропущено фидов, доступных по другому URL (то же содержимое): {crawler.feed_aliases}")
+    print(f"Загрузок сэкономлено нормализацией URL: {crawler.normalized_duplicates}")
+    if crawler.feeds_found:
+        print(f"Загрузок на найденный фид: {crawler.fetches / crawler.feeds_found:.1f} "
+              f"(всего загрузок: {crawler.fetches})")
+    if DISCOVERY != "crawl":
+        print(f"Проверка известных адресов: загрузок {crawler.probe_fetches}, найдено фидов {crawler.probe_feeds}")
+    print(http_client.format_stats())
+    print(content_sniffer.format_stats())
+    print(crawler.url_filter.format_stats())
+    print(f"Пик памяти тел ответов в обработке: {crawler.memory_budget.peak / 1024 / 1024:.1f} МБ, "
+          f"ожиданий памяти: {crawler.memory_budget.waits}, отложено страниц при переполнении очереди: {crawler.deferred}")
+    if crawler.scheduler:
+        print(crawler.scheduler.format_stats())
+    print(metrics.format_stats(total_time))
+    metrics.write()
+    metrics.close()
+    print(f"Результаты сохранены в {CSV_FILE}")
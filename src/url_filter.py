@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Правила отбора URL для обхода, собранные в один предкомпилированный фильтр.
+
+Фильтр проверяет URL по порядку: хосты, расширения файлов (картинки, PDF
+и прочее отбрасываются до загрузки), префиксы путей, параметры запроса и,
+наконец, запрещенные слова. Все запрещенные слова сведены в одно регулярное
+выражение в виде префиксного дерева (общие начала слов не повторяются),
+поэтому проверка не замедляется пропорционально длине списка.
+Отдельно in_scope() проверяет границы сайта: хост совпадает с доменом сайта
+или является его поддоменом (а не просто содержит его как подстроку).
+
+Результат проверки запоминается (LRU-кэш на CACHE_SIZE URL), так что URL,
+встреченный на многих страницах, разбирается один раз.
+"""
+
+import functools
+import os
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+# ======= Параметры конфигурации =======
+SKIP_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".bmp", ".tiff",
+                   ".mp3", ".mp4", ".m4a", ".avi", ".mov", ".webm", ".ogg", ".wav", ".flv",
+                   ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip", ".rar",
+                   ".gz", ".tar", ".7z", ".exe", ".dmg", ".apk", ".iso",
+                   ".css", ".js", ".woff", ".woff2", ".ttf", ".eot")  # Не загружать URL с этими расширениями
+INCLUDE_HOSTS = ()    # Обходить только эти хосты и их поддомены (пусто - любые в пределах сайта)
+EXCLUDE_HOSTS = ()    # Не обходить эти хосты и их поддомены
+INCLUDE_PATHS = ()    # Обходить только пути с этими префиксами (главная страница "/" разрешена всегда)
+EXCLUDE_PATHS = ()    # Не обходить пути с этими префиксами, например ("/search", "/login")
+EXCLUDE_PARAMS = ()   # Не обходить URL с этими параметрами запроса, например ("replytocom", "share")
+CACHE_SIZE = 65536    # Сколько результатов проверки URL запоминать
+# =======================================
+
+# Причины отказа, как они показываются в статистике
+REASONS = {
+    "host": "по хосту",
+    "extension": "по расширению",
+    "path": "по пути",
+    "param": "по параметру запроса",
+    "word": "по запрещенному слову",
+}
+
+
+def trie_pattern(words):
+    """
+    Регулярное выражение, находящее любое из слов, в виде префиксного дерева:
+    ["feed", "feeds", "ferry"] -> "fe(?:ed|rry)". Если одно слово - начало другого,
+    достаточно короткого: найдя его, длинное уже не нужно.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            if "" in node:
+                break
+            node = node.setdefault(char, {})
+        else:
+            node.clear()
+            node[""] = True
+    return _node_pattern(trie)
+
+
+def _node_pattern(node):
+    if "" in node:
+        return ""
+    alternatives = [re.escape(char) + _node_pattern(child) for char, child in sorted(node.items())]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+def host_matches(host, hosts):
+    """
+    True, если host совпадает с одним из hosts или является его поддоменом.
+    """
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+class UrlFilter:
+    """
+    Потокобезопасный фильтр URL. check(url) возвращает None, если URL можно
+    обходить, или причину отказа (ключ REASONS; для слов - "word:<слово>").
+    """
+
+    def __init__(self, blocked_words=(), include_hosts=INCLUDE_HOSTS, exclude_hosts=EXCLUDE_HOSTS,
+                 include_paths=INCLUDE_PATHS, exclude_paths=EXCLUDE_PATHS, skip_extensions=SKIP_EXTENSIONS,
+                 exclude_params=EXCLUDE_PARAMS, cache_size=CACHE_SIZE, on_reject=None):
+        words = sorted({word.lower() for word in blocked_words if word})
+        self.words = re.compile(trie_pattern(words)) if words else None
+        self.include_hosts = tuple(h.lower() for h in include_hosts)
+        self.exclude_hosts = tuple(h.lower() for h in exclude_hosts)
+        self.include_paths = tuple(include_paths)
+        self.exclude_paths = tuple(exclude_paths)
+        self.skip_extensions = frozenset(ext.lower() for ext in skip_extensions)
+        self.exclude_params = frozenset(param.lower() for param in exclude_params)
+        self.on_reject = on_reject           # Вызывается для каждого нового отвергнутого URL: (url, причина)
+        self.rejected = Counter()            # Уникальных URL, отвергнутых по каждой причине
+        self._lock = threading.Lock()
+        self.check = functools.lru_cache(maxsize=cache_size)(self._check)
+
+    @staticmethod
+    def in_scope(url, domain):
+        """
+        True, если URL ведет на хост domain или его поддомен.
+        """
+        try:
+            return host_matches(urlsplit(url).netloc.lower(), (domain.lower(),))
+        except ValueError:
+            return False
+
+    def _check(self, url):
+        reason = self._reason(url)
+        if reason is not None:
+            with self._lock:
+                self.rejected[reason.split(":", 1)[0]] += 1
+            if self.on_reject:
+                self.on_reject(url, reason)
+        return reason
+
+    def _reason(self, url):
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return "host"
+        host = parts.netloc.lower()
+        if self.include_hosts and not host_matches(host, self.include_hosts):
+            return "host"
+        if self.exclude_hosts and host_matches(host, self.exclude_hosts):
+            return "host"
+        path = parts.path or "/"
+        if self.skip_extensions and os.path.splitext(path)[1].lower() in self.skip_extensions:
+            return "extension"
+        if self.include_paths and path != "/" and not path.startswith(self.include_paths):
+            return "path"
+        if self.exclude_paths and path.startswith(self.exclude_paths):
+            return "path"
+        if self.exclude_params and parts.query:
+            for pair in parts.query.split("&"):
+                if pair.split("=", 1)[0].lower() in self.exclude_params:
+                    return "param"
+        if self.words is not None:
+            match = self.words.search(url.lower())
+            if match:
+                return "word:" + match.group(0)
+        return None
+
+    def format_stats(self):
+        """
+        Строка со статистикой отвергнутых URL для итогового отчета.
+        """
+        if not self.rejected:
+            return "Отфильтровано URL: 0"
+        details = ", ".join(f"{REASONS[reason]} {count}" for reason, count in self.rejected.most_common())
+        return f"Отфильтровано URL: {sum(self.rejected.values())} ({details})"
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Нормализация URL перед добавлением в очередь обхода.
+
+normalize_url() делает только безопасные для загрузки преобразования:
+схема и хост в нижнем регистре, без порта по умолчанию, без фрагмента (#...)
+и без параметров отслеживания (utm_*, fbclid, ...). url_key() дополнительно
+отбрасывает завершающий слэш пути и служит ключом для множества посещенных URL,
+так что https://x/a, https://x/a/, https://x/a#top и https://x/a?utm_source=...
+загружаются один раз.
+"""
+
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# ======= Параметры конфигурации =======
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "dclid", "msclkid", "mc_cid", "mc_eid",
+                   "_ga", "_gl", "igshid", "_hsenc", "_hsmi"}
+TRACKING_PREFIXES = ("utm_",)
+# =======================================
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    """
+    Приводит URL к каноническому виду, пригодному для загрузки.
+    Некорректные URL возвращаются без изменений.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        host = f"{userinfo}@{host}"
+
+    query = "&".join(
+        pair for pair in parts.query.split("&")
+        if pair and not is_tracking_param(pair.split("=", 1)[0])
+    )
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def strip_trailing_slash(url):
+    """
+    URL без завершающего слэша пути (корень "/" остается).
+    """
+    parts = urlsplit(url)
+    if len(parts.path) > 1 and parts.path.endswith("/"):
+        return urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip("/") or "/", parts.query, parts.fragment))
+    return url
+
+
+def url_key(url):
+    """
+    Ключ URL для множества посещенных: нормализованный URL без завершающего слэша пути.
+    """
+    return strip_trailing_slash(normalize_url(url))
+
+
+def canonical_link(base_url, href):
+    """
+    Абсолютный нормализованный URL ссылки и признак того, что нормализация
+    изменила его ключ (фрагмент, utm_*, регистр, порт и т.п.). Ключи сравниваются
+    в одной форме - без завершающего слэша, - поэтому обычная ссылка вида
+    /section/ не считается переписанной: без нормализации она совпала бы сама
+    с собой. Слияние /a и /a/ тоже не считается, так что счетчик сэкономленных
+    загрузок - оценка снизу.
+    """
+    raw_url = urljoin(base_url, href)
+    full_url = normalize_url(raw_url)
+    return full_url, url_key(full_url) != strip_trailing_slash(raw_url)
@@ -1,27 +1,52 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import requests
 import feedparser
 from datetime import datetime, timedelta
-import csv
 import time
 from tqdm import tqdm
 import concurrent.futures
-import threading
+import os
+from collections import deque
 import pytz
+from urllib.parse import urlsplit
+
+import feed_dates
+import http_client
+import metrics
+import parse_pool
+import reporter
+from dns_cache import DnsResolver
+from feed_fingerprint import FeedAliases, feed_fingerprint
+from feed_state import FeedStateStore
+from http_cache import HttpCache
+from result_writer import ResultWriter, iter_rows
 
 # ======= Параметры конфигурации =======
-INPUT_CSV_FILE = "rss_feeds.csv"          # Файл с исходными RSS-фидами
-OUTPUT_CSV_FILE = "verified_feeds.csv"    # Файл для сохранения проверенных фидов
+INPUT_CSV_FILE = "rss_feeds.csv"          # Файл с исходными RSS-фидами (.csv или .jsonl), читается лениво
+OUTPUT_CSV_FILE = "verified_feeds.csv"    # Файл для проверенных фидов (.csv или .jsonl), пишется по мере проверки
 HOURS_THRESHOLD = 48                      # Проверять новости за последние X часов
 MAX_WORKERS = 6                           # Количество параллельных обработчиков
+CACHE_FILE = "http_cache.sqlite"          # Файл кэша условных запросов (None - не использовать кэш)
+CACHE_MAX_BYTES = 50 * 1024 * 1024        # Максимальный размер данных в кэше
+PARSE_PROCESSES = os.cpu_count() or 1     # Процессов для разбора фидов (1 - разбор в потоках)
+MAX_PENDING = None                        # Сколько фидов входного файла держать в очереди на проверку (None - по 4 на обработчик)
+FAST_PARSER = True                        # Извлекать даты потоково (feed_dates), feedparser - только для сложных фидов
+STATE_FILE = "feed_state.sqlite"          # Состояние фидов и расписание перепроверки (None - проверять все фиды каждый раз)
+DEDUP_FEEDS = True                        # Проверять один фид, доступный по разным URL, один раз (по отпечатку содержимого)
+DNS_CACHE = True                          # Кэш разрешения имен и отбрасывание фидов недоступных хостов (см. dns_cache.py)
+PRERESOLVE = True                         # Разрешать имена хостов заранее и параллельно, пока фиды ждут в очереди
+PRERESOLVE_AHEAD = 1000                   # На сколько фидов входного файла вперед разрешать имена
+CONNECT_TIMEOUT = 5                       # Таймаут подключения к серверу, секунд (таймаут чтения - 15)
 # =======================================
 
-# Глобальные переменные для многопоточной работы
-verified_feeds = []              # Список проверенных фидов: [(title, url, count), ...]
-failed_feeds = []                # Список фидов, которые не удалось проверить
-verified_feeds_lock = threading.Lock()    # Блокировка для безопасного обновления списков
+# Глобальные переменные; счетчики и файлы результатов меняет только главный поток
+verified_count = 0               # Сколько фидов прошло проверку
+failed_count = 0                 # Сколько фидов не прошло проверку
+feed_cache = None                # Кэш условных запросов (HttpCache), открывается в main()
+feed_states = None               # Состояние фидов (FeedStateStore), открывается в main()
+feed_aliases = None              # Отпечатки уже проверенных фидов (FeedAliases), создается в main()
+dns_resolver = None              # Кэш разрешения имен (DnsResolver), создается в main()
 
 # Цвета для вывода в консоль
 GREEN = "\033[92m"
@@ -31,72 +56,188 @@ RESET = "\033[0m"
 CHECK_MARK = "\u2714"
 CROSS_MARK = "\u2718"
 
-def check_feed_freshness(title, url):
+DUPLICATE_REASON = "Дубликат фида: "   # Причина в файле неудачных фидов, дальше - канонический URL
+
+def entry_timestamps(feed):
+    """
+    Возвращает список дат публикации записей фида (Unix time) в порядке записей.
+    Для записей без даты в списке стоит None.
+    """
+    timestamps = []
+    for entry in feed.entries:
+        # Пытаемся получить дату публикации
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            timestamps.append(time.mktime(entry.published_parsed))
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            timestamps.append(time.mktime(entry.updated_parsed))
+        else:
+            timestamps.append(None)
+    return timestamps
+
+def parse_feed_timestamps(content):
+    """
+    Разбирает фид через feedparser и возвращает даты записей (см. entry_timestamps).
+    Выполняется в пуле процессов parse_pool.
+    """
+    return entry_timestamps(feedparser.parse(content))
+
+def fast_feed_timestamps(content):
+    """
+    То же, что parse_feed_timestamps, но даты извлекаются потоково без feedparser;
+    битые и нестандартные фиды по-прежнему разбирает feedparser.
+    """
+    timestamps = feed_dates.feed_timestamps(content)
+    if timestamps is None:
+        return parse_feed_timestamps(content)
+    return timestamps
+
+def parse_feed(args):
+    """
+    Даты записей фида и, если нужно, отпечаток содержимого за один вызов пула разбора.
+    args - кортеж (content, fast, fingerprint): fast - извлекать даты через feed_dates.
+    """
+    content, fast, fingerprint = args
+    timestamps = fast_feed_timestamps(content) if fast else parse_feed_timestamps(content)
+    return timestamps, feed_fingerprint(content) if fingerprint else None
+
+def score_timestamps(timestamps, now=None, hours=None):
+    """
+    Считает свежие записи по списку дат из entry_timestamps на момент now (Unix time, по умолчанию - сейчас).
+    Свежими считаются записи за последние hours часов (по умолчанию HOURS_THRESHOLD).
+    Возвращает кортеж (is_fresh, fresh_count, total_count, percent).
+    """
+    # Определяем порог времени (текущее время минус HOURS_THRESHOLD часов)
+    now = datetime.fromtimestamp(now, pytz.UTC) if now else datetime.now(pytz.UTC)
+    threshold = (now - timedelta(hours=HOURS_THRESHOLD if hours is None else hours)).timestamp()
+    
+    total_entries = len(timestamps)
+    
+    # Если фид пустой, возвращаем 0%
+    if total_entries == 0:
+        return (False, 0, 0, 0.0)
+    
+    # Записи без даты пропускаем, остальные сравниваем с порогом
+    fresh_news_count = sum(1 for ts in timestamps if ts is not None and ts > threshold)
+    
+    # Вычисляем процент свежих новостей
+    freshness_percent = (fresh_news_count / total_entries) * 100
+    
+    return (fresh_news_count > 0, fresh_news_count, total_entries, freshness_percent)
+
+def fetch_feed_timestamps(url, known_fingerprint=None):
+    """
+    Загружает фид и возвращает кортеж (даты его записей (см. entry_timestamps),
+    отпечаток содержимого или None, ответ 304). Если фид есть в кэше, отправляется
+    условный запрос, и при ответе 304 возвращаются сохраненные даты без скачивания
+    и разбора, а отпечатком - known_fingerprint, сохраненный при той загрузке.
+    """
+    cached = feed_cache.get(url) if feed_cache else None
+    headers = feed_cache.conditional_headers(cached) if cached else {}
+    
+    # Получаем содержимое фида: заголовки и тело замеряются отдельно
+    with metrics.request():
+        with metrics.stage("request"):
+            response = http_client.get(url, timeout=(CONNECT_TIMEOUT, 15), headers=headers, stream=True)
+        metrics.record_status(response.status_code)
+        
+        if response.status_code == 304 and cached:
+            response.close()
+            feed_cache.record_not_modified(cached)
+            return cached["entries"], known_fingerprint, True
+        
+        response.raise_for_status()
+        with metrics.stage("download"):
+            content = response.content
+    metrics.count("downloaded_bytes_total", len(content))
+    
+    # Извлекаем даты записей (и отпечаток, если ищем дубликаты) в пуле процессов
+    with metrics.stage("parse_feed"):
+        timestamps, fingerprint = parse_pool.run(parse_feed, (content, FAST_PARSER, feed_aliases is not None))
+    
+    if feed_cache:
+        feed_cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                       timestamps, len(content))
+    
+    return timestamps, fingerprint, False
+
+def check_feed_freshness(title, url, hours=None):
     """
-    Проверяет, содержит ли RSS-фид новости за последние HOURS_THRESHOLD часов.
+    Проверяет, содержит ли RSS-фид новости за последние hours (по умолчанию HOURS_THRESHOLD) часов.
     Возвращает кортеж (is_fresh, fresh_count, total_count, percent), где:
     - is_fresh: булево значение, True если есть свежие новости
     - fresh_count: количество свежих новостей
     - total_count: общее количество новостей в фиде
     - percent: процент свежих новостей от общего количества
+    Если срок перепроверки фида (feed_state) не наступил, фид не загружается:
+    оценка строится по датам записей, сохраненным при прошлой проверке.
+    Если тот же фид (по отпечатку) в этом запуске уже проверен под другим URL,
+    возвращается ошибка DUPLICATE_REASON с этим URL. Дубликатом фид признается
+    только по отпечатку, полученному при загрузке: если сохраненный с прошлого
+    запуска отпечаток принадлежит другому URL, фид загружается вне расписания
+    (при неизмененном фиде это дешевый ответ 304).
     """
-    try:
-        # Получаем содержимое фида
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        
-        # Используем feedparser для парсинга фида
-        feed = feedparser.parse(response.content)
-        
-        # Определяем порог времени (текущее время минус HOURS_THRESHOLD часов)
-        now = datetime.now(pytz.UTC)
-        threshold = now - timedelta(hours=HOURS_THRESHOLD)
-        
-        # Счетчик свежих новостей
-        fresh_news_count = 0
-        total_entries = len(feed.entries)
-        
-        # Если фид пустой, возвращаем 0%
-        if total_entries == 0:
-            return (False, 0, 0, 0.0)
-        
-        # Проверяем каждую запись в фиде
-        for entry in feed.entries:
-            # Пытаемся получить дату публикации
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                # Преобразуем в datetime и добавляем часовой пояс UTC
-                pub_date = datetime.fromtimestamp(time.mktime(entry.published_parsed), pytz.UTC)
-            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                pub_date = datetime.fromtimestamp(time.mktime(entry.updated_parsed), pytz.UTC)
-            else:
-                # Если дата не найдена, пропускаем запись
-                continue
-                
-            # Если дата публикации новее порога, увеличиваем счетчик
-            if pub_date > threshold:
-                fresh_news_count += 1
-        
-        # Вычисляем процент свежих новостей
-        if total_entries > 0:
-            freshness_percent = (fresh_news_count / total_entries) * 100
-        else:
-            freshness_percent = 0.0
-            
-        return (fresh_news_count > 0, fresh_news_count, total_entries, freshness_percent)
+    state = feed_states.get(url) if feed_states else None
+    known = state["fingerprint"] if state else None
+    suspected = bool(feed_aliases and known and feed_aliases.claim(known, url, confirmed=False) != url)
+    
+    if feed_states and not suspected and not feed_states.is_due(state):
+        feed_states.record_skipped()
+        if state["error"]:
+            return (False, 0, 0, 0.0, state["error"])
+        return score_timestamps(state["entries"], hours=hours)
     
+    try:
+        timestamps, fingerprint, not_modified = fetch_feed_timestamps(url, known)
     except Exception as e:
+        metrics.record_error("verify", e)
+        if dns_resolver and http_client.is_connect_error(e):
+            # После нескольких неудач подряд остальные фиды этого хоста и порта отбросим, не отдавая воркерам
+            dns_resolver.mark_unreachable(url_host(url), url_port(url), str(e))
+        elif dns_resolver:
+            # Сервер ответил (ошибка HTTP или чтения) - подключение к нему работает
+            dns_resolver.mark_reachable(url_host(url), url_port(url))
+        if feed_states:
+            feed_states.record_error(url, str(e), state)
         # Если произошла ошибка, возвращаем (False, 0, 0, 0.0, error)
         return (False, 0, 0, 0.0, str(e))
+    
+    if dns_resolver:
+        dns_resolver.mark_reachable(url_host(url), url_port(url))
+    if feed_states:
+        feed_states.record_check(url, timestamps, state, fingerprint=fingerprint)
+    if feed_aliases and known and fingerprint != known:
+        # Сохраненный отпечаток не подтвердился - не держим его за этим URL
+        feed_aliases.release(known, url)
+    if feed_aliases and fingerprint:
+        canonical = feed_aliases.claim(fingerprint, url, revalidated=not_modified)
+        if canonical != url:
+            return (False, 0, 0, 0.0, DUPLICATE_REASON + canonical)
+    return score_timestamps(timestamps, hours=hours)
+
+def record_verified(title, url, fresh_count, total_count, percent):
+    """
+    Результат для фида, прошедшего проверку: (True, строка файла, строка для консоли).
+    """
+    return (True, (title, url, fresh_count, total_count, f"{percent:.1f}%"),
+            f"{GREEN}{CHECK_MARK} {title} - {fresh_count}/{total_count} ({percent:.1f}%) свежих новостей{RESET}")
+
+def record_failed(title, url, reason, message=None, color=RED):
+    """
+    Результат для фида, не прошедшего проверку: (False, строка файла с причиной, строка для консоли).
+    """
+    return (False, (title, url, reason), f"{color}{CROSS_MARK} {title} - {message or 'ошибка: ' + reason}{RESET}")
 
 def process_feed(feed_data):
     """
-    Обрабатывает отдельный RSS-фид.
+    Обрабатывает отдельный RSS-фид. Ничего не пишет сам: возвращает результат
+    record_verified или record_failed, который записывает главный поток.
     """
     title, url = feed_data
     
     try:
         # Проверяем фид на свежесть
-        result = check_feed_freshness(title, url)
+        with metrics.busy("verify"), metrics.trace(url, "verify"):
+            result = check_feed_freshness(title, url)
         
         if len(result) == 4:
             is_fresh, fresh_count, total_count, percent = result
@@ -104,108 +245,193 @@ def process_feed(feed_data):
         else:
             is_fresh, fresh_count, total_count, percent, error_msg = result
         
-        with verified_feeds_lock:
-            if is_fresh:
-                # Если фид содержит свежие новости, добавляем его в список проверенных
-                verified_feeds.append((title, url, fresh_count, total_count, percent))
-                print(f"{GREEN}{CHECK_MARK} {title} - {fresh_count}/{total_count} ({percent:.1f}%) свежих новостей{RESET}")
-            else:
-                if error_msg:
-                    # Если произошла ошибка, добавляем фид в список неудачных
-                    failed_feeds.append((title, url, error_msg))
-                    print(f"{RED}{CROSS_MARK} {title} - ошибка: {error_msg}{RESET}")
-                else:
-                    # Если фид не содержит свежих новостей, добавляем его в список неудачных
-                    failed_feeds.append((title, url, f"Нет свежих новостей (всего: {total_count})"))
-                    print(f"{YELLOW}{CROSS_MARK} {title} - нет свежих новостей (всего: {total_count}){RESET}")
+        if is_fresh:
+            # Если фид содержит свежие новости, записываем его в проверенные
+            return record_verified(title, url, fresh_count, total_count, percent)
+        elif error_msg and error_msg.startswith(DUPLICATE_REASON):
+            # Тот же фид уже проверен под другим URL
+            return record_failed(title, url, error_msg, error_msg[0].lower() + error_msg[1:], YELLOW)
+        elif error_msg:
+            # Если произошла ошибка, записываем фид в неудачные
+            return record_failed(title, url, error_msg)
+        else:
+            # Если фид не содержит свежих новостей, записываем его в неудачные
+            return record_failed(title, url, f"Нет свежих новостей (всего: {total_count})",
+                                 f"нет свежих новостей (всего: {total_count})", YELLOW)
         
     except Exception as e:
-        with verified_feeds_lock:
-            failed_feeds.append((title, url, str(e)))
-            print(f"{RED}{CROSS_MARK} {title} - ошибка: {str(e)}{RESET}")
+        return record_failed(title, url, str(e))
 
-def read_feeds_from_csv(file_path):
+def iter_feeds(file_path):
     """
-    Читает RSS-фиды из CSV-файла.
-    Возвращает список кортежей (title, url).
+    Лениво читает RSS-фиды из CSV-файла (или JSON Lines) по одному.
+    Возвращает генератор кортежей (title, url).
     """
-    feeds = []
     try:
-        with open(file_path, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader)  # Пропускаем заголовок
-            for row in reader:
-                if len(row) >= 2:
-                    title, url = row[0], row[1]
-                    feeds.append((title, url))
+        for row in iter_rows(file_path):
+            if isinstance(row, dict):
+                if row.get("url"):
+                    yield row.get("title", ""), row["url"]
+            elif len(row) >= 2:
+                yield row[0], row[1]
     except Exception as e:
         print(f"Ошибка при чтении файла {file_path}: {e}")
-    return feeds
 
-def save_verified_feeds_to_csv(file_path, feeds):
+def url_host(url):
     """
-    Сохраняет проверенные RSS-фиды в CSV-файл.
+    Имя хоста из URL (None, если URL не разобрать).
     """
     try:
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Название', 'URL', 'Свежих новостей', 'Всего новостей', 'Процент свежих'])
-            for title, url, fresh_count, total_count, percent in feeds:
-                writer.writerow([title, url, fresh_count, total_count, f"{percent:.1f}%"])
-        print(f"Проверенные фиды сохранены в файл: {file_path}")
-    except Exception as e:
-        print(f"Ошибка при сохранении файла {file_path}: {e}")
+        return urlsplit(url).hostname
+    except ValueError:
+        return None
 
-def save_failed_feeds_to_csv(file_path, feeds):
+def url_port(url):
     """
-    Сохраняет не прошедшие проверку RSS-фиды в CSV-файл.
+    Порт из URL, для http и https без явного порта - порт по умолчанию (None, если URL не разобрать).
     """
     try:
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Название', 'URL', 'Причина'])
-            for title, url, reason in feeds:
-                writer.writerow([title, url, reason])
-        print(f"Неудачные фиды сохранены в файл: {file_path}")
-    except Exception as e:
-        print(f"Ошибка при сохранении файла {file_path}: {e}")
+        parts = urlsplit(url)
+        return parts.port or {"http": 80, "https": 443}.get(parts.scheme)
+    except ValueError:
+        return None
 
-def main():
+def preresolved(feeds, ahead):
+    """
+    Пропускает фиды из итератора через очередь из ahead фидов: имя хоста начинает
+    разрешаться в фоне, когда фид попадает в очередь, а фид отдается дальше, когда
+    разрешение закончено. Так имена разрешаются параллельно и заранее, а входной
+    файл читается один раз и не целиком.
+    """
+    ahead = max(ahead, 1)
+    queued = deque()
+    for feed in feeds:
+        dns_resolver.prefetch(url_host(feed[1]))
+        queued.append(feed)
+        if len(queued) >= ahead:
+            feed = queued.popleft()
+            dns_resolver.settle(url_host(feed[1]))
+            yield feed
+    while queued:
+        feed = queued.popleft()
+        dns_resolver.settle(url_host(feed[1]))
+        yield feed
+
+def check_feeds(feeds, workers):
+    """
+    Проверяет фиды из итератора пулом потоков. Из входного файла читается не больше
+    MAX_PENDING фидов вперед, так что память не зависит от его размера.
+    Генератор: отдает результат process_feed для каждого проверенного фида в порядке
+    завершения. Воркеры не берут общих блокировок: результаты собирает тот, кто
+    читает генератор. Фиды хостов, недоступных по кэшу dns_resolver, отбрасываются
+    сразу, не занимая воркер.
+    """
+    max_pending = MAX_PENDING or workers * 4
+    metrics.gauge_set("workers", workers, pool="verify")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        queue_depth = lambda: sum(1 for f in list(pending) if not f.done())
+        metrics.register_gauge("queue_depth", queue_depth, pool="verify")
+        try:
+            for feed in feeds:
+                reason = dns_resolver.failure(url_host(feed[1]), url_port(feed[1])) if dns_resolver else None
+                if reason:
+                    yield record_failed(feed[0], feed[1], reason, f"хост недоступен: {reason}")
+                    continue
+                pending.add(executor.submit(process_feed, feed))
+                if len(pending) >= max_pending:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+        finally:
+            metrics.unregister_gauge("queue_depth", queue_depth, pool="verify")
+
+def main(resolver=None):
+    """
+    Проверяет фиды из INPUT_CSV_FILE. resolver - DnsResolver вместо создаваемого
+    по DNS_CACHE (например, с функцией разрешения-заглушкой).
+    """
+    global feed_cache, feed_states, feed_aliases, dns_resolver, verified_count, failed_count
+    
     print(f"Проверка RSS-фидов на наличие новостей за последние {HOURS_THRESHOLD} часов...")
     
-    # Читаем фиды из CSV-файла
-    feeds = read_feeds_from_csv(INPUT_CSV_FILE)
-    if not feeds:
+    # Фиды читаются из файла лениво и один раз (файл может быть и каналом),
+    # поэтому их общее число заранее неизвестно
+    if not os.path.exists(INPUT_CSV_FILE):
         print(f"Не удалось прочитать фиды из файла {INPUT_CSV_FILE}")
         return
     
-    print(f"Загружено {len(feeds)} RSS-фидов из {INPUT_CSV_FILE}")
-    print(f"Начинаем проверку с использованием {MAX_WORKERS} параллельных обработчиков...")
+    print(f"Начинаем проверку фидов из {INPUT_CSV_FILE} с использованием {MAX_WORKERS} параллельных обработчиков...")
+    
+    feed_cache = HttpCache(CACHE_FILE, CACHE_MAX_BYTES) if CACHE_FILE else None
+    feed_states = FeedStateStore(STATE_FILE) if STATE_FILE else None
+    feed_aliases = FeedAliases() if DEDUP_FEEDS else None
+    dns_resolver = resolver or (DnsResolver() if DNS_CACHE else None)
+    http_client.set_resolver(dns_resolver)
     
+    verified_count = failed_count = 0
+    metrics.reset()
+    failed_file = "failed_" + OUTPUT_CSV_FILE
     start_time = time.time()
     
-    # Используем ThreadPoolExecutor для параллельной обработки
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Показываем прогресс-бар
-        list(tqdm(executor.map(process_feed, feeds), total=len(feeds), desc="Проверка фидов"))
+    feeds = iter_feeds(INPUT_CSV_FILE)
+    if dns_resolver and PRERESOLVE:
+        # Имена хостов разрешаются параллельно, пока фиды ждут в очереди: воркеры
+        # берут адреса из кэша, а фиды недоступных хостов отбрасываются сразу
+        feeds = preresolved(feeds, PRERESOLVE_AHEAD)
+    
+    # Загрузка идет в потоках, разбор фидов - в пуле процессов;
+    # результаты дописываются в файлы по мере проверки
+    parse_pool.start(PARSE_PROCESSES)
+    reporter.start()
+    try:
+        with ResultWriter(OUTPUT_CSV_FILE, ("title", "url", "fresh", "total", "percent"),
+                          ['Название', 'URL', 'Свежих новостей', 'Всего новостей', 'Процент свежих']) as verified_writer, \
+             ResultWriter(failed_file, ("title", "url", "reason"), ['Название', 'URL', 'Причина']) as failed_writer:
+            # Показываем прогресс-бар; строки результатов выводит поток reporter
+            for ok, row, line in tqdm(check_feeds(feeds, MAX_WORKERS), desc="Проверка фидов"):
+                if ok:
+                    verified_writer.write(row)
+                    verified_count += 1
+                else:
+                    failed_writer.write(row)
+                    failed_count += 1
+                reporter.result(line)
+    finally:
+        parse_pool.shutdown()
+        reporter.stop()
+        http_client.set_resolver(None)
+        if dns_resolver:
+            dns_resolver.close()
     
     end_time = time.time()
     total_time = end_time - start_time
     
-    # Сортируем проверенные фиды сначала по проценту свежих новостей, затем по количеству
-    verified_feeds.sort(key=lambda x: (x[4], x[2]), reverse=True)
-    
-    # Сохраняем результаты в CSV-файлы
-    save_verified_feeds_to_csv(OUTPUT_CSV_FILE, verified_feeds)
-    save_failed_feeds_to_csv("failed_" + OUTPUT_CSV_FILE, failed_feeds)
-    
+    if not verified_count + failed_count:
+        print(f"Не удалось прочитать фиды из файла {INPUT_CSV_FILE}")
     print(f"\nПроверка завершена за {total_time:.2f} секунд.")
-    print(f"Проверено фидов: {len(feeds)}")
-    print(f"Прошли проверку: {len(verified_feeds)} фидов")
-    print(f"Не прошли проверку: {len(failed_feeds)} фидов")
+    print(f"Проверено фидов: {verified_count + failed_count}")
+    print(f"Прошли проверку: {verified_count} фидов")
+    print(f"Не прошли проверку: {failed_count} фидов")
+    print(http_client.format_stats())
+    print(metrics.format_stats(total_time))
+    metrics.write()
+    metrics.close()
+    if feed_cache:
+        print(feed_cache.summary())
+        feed_cache.close()
+    if feed_states:
+        print(feed_states.summary())
+        feed_states.close()
+    if feed_aliases:
+        print(feed_aliases.summary())
+    if dns_resolver:
+        print(dns_resolver.summary())
     print(f"Результаты сохранены в:")
     print(f"  - {OUTPUT_CSV_FILE} (проверенные фиды)")
-    print(f"  - failed_{OUTPUT_CSV_FILE} (неудачные фиды)")
+    print(f"  - {failed_file} (неудачные фиды)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Компактные множества посещенных URL.
+
+FingerprintSet хранит 64-битные отпечатки вместо строк URL: вероятность
+коллизии пренебрежимо мала, а памяти уходит в несколько раз меньше.
+ScalableBloomFilter хранит биты в bytearray и растет цепочкой фильтров,
+удерживая суммарную вероятность ложного срабатывания не выше error_rate;
+ложное срабатывание означает лишь пропуск одного непосещенного URL.
+"""
+
+import hashlib
+import math
+
+
+def url_fingerprint(url):
+    """
+    64-битный отпечаток URL (знаковое целое, чтобы помещался в INTEGER SQLite).
+    """
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class FingerprintSet:
+    """
+    Множество 64-битных отпечатков URL.
+    """
+
+    def __init__(self):
+        self._fingerprints = set()
+
+    def add(self, url):
+        """
+        Добавляет URL. Возвращает False, если он уже был в множестве.
+        """
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self._fingerprints:
+            return False
+        self._fingerprints.add(fingerprint)
+        return True
+
+    def __contains__(self, url):
+        return url_fingerprint(url) in self._fingerprints
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+
+class _BloomFilter:
+    """
+    Фильтр Блума фиксированной емкости.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h1, h2):
+        # Двойное хеширование: k позиций из двух 64-битных хешей
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hashes)]
+
+    def contains(self, h1, h2):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(h1, h2))
+
+    def add(self, h1, h2):
+        bits = self.bits
+        for p in self._positions(h1, h2):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    Масштабируемый фильтр Блума: когда текущий фильтр заполнен, добавляется
+    новый вдвое большей емкости с вдвое меньшей вероятностью ошибки.
+    """
+
+    def __init__(self, initial_capacity=100000, error_rate=0.001):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        # При удвоении точности каждого следующего фильтра сумма ошибок не превысит error_rate
+        self._filters = [_BloomFilter(initial_capacity, error_rate / 2)]
+        self._count = 0
+
+    @staticmethod
+    def _hashes(url):
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+
+    def add(self, url):
+        """
+        Добавляет URL. Возвращает False, если он (вероятно) уже был в множестве.
+        """
+        h1, h2 = self._hashes(url)
+        if any(f.contains(h1, h2) for f in self._filters):
+            return False
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            current = _BloomFilter(current.capacity * 2, self.error_rate / 2 ** (len(self._filters) + 1))
+            self._filters.append(current)
+        current.add(h1, h2)
+        self._count += 1
+        return True
+
+    def __contains__(self, url):
+        h1, h2 = self._hashes(url)
+        return any(f.contains(h1, h2) for f in self._filters)
+
+    def __len__(self):
+        return self._count
+
+
+def create_visited_store(kind, error_rate=0.001):
+    """
+    Создает множество посещенных URL: "fingerprints" или "bloom".
+    """
+    if kind == "bloom":
+        return ScalableBloomFilter(error_rate=error_rate)
+    return FingerprintSet()